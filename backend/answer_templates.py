@@ -0,0 +1,107 @@
+import re
+from typing import List, Dict, Optional
+from common_parser import extract_brand_name, extract_ingredient_names
+
+# 모든 답변에 포함되어야 하는 안전 문구 (LLM 프롬프트 규칙 4번과 동일)
+DISCLAIMER = "⚠️ 이 정보는 의료진 상담을 대체할 수 없습니다."
+
+SUMMARY_FIELDS = ['효과', '복용법', '주의사항', '상호작용', '부작용', '보관법']
+
+
+def render_document_summary(search_results: List[Dict], max_documents: int = 2) -> str:
+    """LLM 없이 상위 문서의 필드를 그대로 요약한 응답 (시간 예산 부족/LLM 장애 시)"""
+    parts = []
+
+    for result in search_results[:max_documents]:
+        name = result.get('product_name') or result.get('drug_name', '')
+        lines = [f"💊 약물명 : {name}"]
+
+        for field in SUMMARY_FIELDS:
+            value = result.get(field, '')
+            if value:
+                lines.append(f"    - {field}: {value}")
+
+        parts.append("\n".join(lines))
+
+    body = "\n\n".join(parts) if parts else "관련된 의료 정보를 찾을 수 없습니다."
+    return f"{body}\n\n(검색된 식약처 정보를 요약했습니다.)\n{DISCLAIMER}"
+
+
+# 단일 필드 질문 감지용 키워드 (필드 → 질문 표현)
+FIELD_KEYWORDS = {
+    '보관법': ['보관법', '보관 방법', '보관', '냉장'],
+    '복용법': ['복용법', '용법', '용량', '몇 번', '몇번', '몇 알', '몇알', '몇 정', '몇정', '하루에',
+             '얼마나 먹', '먹는 법', '먹는법', '먹는 방법', '사용법', '바르는', '몇 시간마다'],
+    '부작용': ['부작용'],
+    '주의사항': ['주의사항', '주의할', '주의 사항', '금기'],
+    '상호작용': ['상호작용'],
+    '효과': ['효능', '효과', '어디에 좋', '어디에 써'],
+}
+
+# 추천/비교 등 열린 질문은 LLM 사용
+OPEN_ENDED_MARKERS = ['추천', '뭐 먹', '뭘 먹', '무엇을 먹', '어떤 약', '무슨 약', '차이', '비교', '대신', '괜찮을까', '왜', '전체', '모든 정보']
+
+# 병용 질문 표현 ('A랑 B 같이 먹어도 돼?'는 두 약 문서가 필요하므로 단일 문서 템플릿 대상 아님)
+INTERACTION_MARKERS = ['같이', '함께', '병용', '동시에', '섞어']
+
+FIELD_LABELS = {
+    '보관법': '보관법',
+    '복용법': '용법/용량',
+    '부작용': '부작용',
+    '주의사항': '복용 시 주의사항',
+    '상호작용': '병용 시 주의사항',
+    '효과': '효능',
+}
+
+def detect_field_intent(query: str) -> Optional[str]:
+    """질문이 하나의 필드만 묻는지 판단 → 필드명 (열린/병용/여러 문장 질문이거나 여러 필드면 None)"""
+    if any(marker in query for marker in OPEN_ENDED_MARKERS + INTERACTION_MARKERS):
+        return None
+
+    # '몇 번 먹어요? 술 마셔도 돼?'처럼 질문이 둘 이상이면 뒷부분이 빠지지 않도록 LLM 사용
+    sentences = [s for s in re.split(r'[?？!\n]|\.\s', query) if s.strip()]
+    if len(sentences) > 1:
+        return None
+
+    matched = [field for field, keywords in FIELD_KEYWORDS.items() if any(k in query for k in keywords)]
+    return matched[0] if len(matched) == 1 else None
+
+
+def document_named_in_query(document: Dict, query: str) -> bool:
+    """질문에 문서의 제품명(브랜드) 또는 성분명이 직접 등장하는지"""
+    compact_query = query.replace(" ", "")
+    product_name = document.get('product_name', '')
+
+    brand = extract_brand_name(product_name)
+    if len(brand) >= 2 and brand in compact_query:
+        return True
+
+    return any(len(part) >= 2 and part in compact_query for part in extract_ingredient_names(product_name))
+
+
+def render_interaction_answer(first: str, second: str, findings: List, documents: Dict[int, Dict]) -> str:
+    """상호작용 그래프 조회 결과로 병용 응답 생성 (findings: InteractionFinding 목록)"""
+    lines = [f"💊 {first} + {second} 함께 복용 시 참고 정보\n"]
+
+    for finding in findings:
+        doc = documents.get(finding.doc_ids[0], {}) if finding.doc_ids else {}
+        product = doc.get('product_name', finding.subject)
+        if finding.kind == 'interaction':
+            lines.append(f"⚠️ {product}: {finding.target}와(과) 함께 복용 시 주의 ({doc.get('상호작용', '')})")
+        elif finding.kind == 'same_ingredient':
+            lines.append(f"⚠️ 두 약 모두 '{finding.target}' 성분이 들어 있어 함께 복용하면 과다 복용 위험이 있습니다.")
+        elif finding.kind == 'general_caution':
+            lines.append(f"💡 {product}: {doc.get('상호작용', '')} - 함께 복용 전 약사와 상의하세요.")
+
+    return "\n".join(lines) + f"\n\n{DISCLAIMER}"
+
+
+def render_field_answer(document: Dict, field: str) -> str:
+    """상위 문서의 단일 필드로 템플릿 응답 생성"""
+    name = document.get('product_name') or document.get('drug_name', '')
+    label = FIELD_LABELS.get(field, field)
+    return (
+        f"💊 약물명 : {name}\n"
+        f"💡 {label} : {document[field]}\n\n"
+        f"{DISCLAIMER}"
+    )
@@ -0,0 +1,55 @@
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+from metrics import count_event
+
+# /api/chat/batch 요청 공유 상태
+# 질문별 파이프라인은 그대로 두고, 미리 계산한 임베딩/FAISS 결과와 식약처 호출을 배치 안에서 공유
+
+
+class BatchContext:
+    """배치 요청 하나의 공유 상태"""
+
+    def __init__(self):
+        self.embeddings: Dict[str, object] = {}                  # 질문 → 정규화된 쿼리 벡터
+        self.searches: Dict[Tuple[bytes, int], List[Dict]] = {}  # (쿼리 벡터 bytes, top_k) → FAISS 결과
+        self._calls: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+    def shared_call(self, key: Hashable, fn: Callable):
+        """같은 key 호출은 배치 안에서 한 번만 실행하고 결과 공유 (동시에 들어와도 한 번)"""
+        with self._lock:
+            future = self._calls.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._calls[key] = future
+
+        if not owner:
+            count_event("batch_call_shared")
+            return future.result()
+
+        try:
+            future.set_result(fn())
+        except Exception as e:
+            future.set_exception(e)
+        return future.result()
+
+
+_current_batch: ContextVar[Optional[BatchContext]] = ContextVar("medimate_batch", default=None)
+
+
+def current_batch() -> Optional[BatchContext]:
+    return _current_batch.get()
+
+
+@contextmanager
+def batch_scope(batch: BatchContext):
+    """현재 스레드/코루틴에서 batch 공유 상태 사용"""
+    token = _current_batch.set(batch)
+    try:
+        yield batch
+    finally:
+        _current_batch.reset(token)
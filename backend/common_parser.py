@@ -53,11 +53,11 @@ def clean_text(text: str) -> str:
 
     return text.strip()
 
-def extract_core_effects(text: str) -> str:
-    """효능에서 핵심 질환/증상 패턴만 추출"""
-    if not text or len(text.strip()) < 5:
-        return ""
-    
+def extract_effect_terms(text: str) -> List[str]:
+    """효능 텍스트에서 질환/증상 용어 목록 추출 (중복 제거, 등장 순서)"""
+    if not text:
+        return []
+
     # 질환/증상 패턴들을 정규식으로 추출
     patterns = [
         r'[가-힣]{2,}증',          # ~증 (기능무력증, 결핍증 등)
@@ -81,10 +81,19 @@ def extract_core_effects(text: str) -> str:
     for pattern in patterns:
         matches = re.findall(pattern, text)
         found_terms.extend(matches)
+
+    return list(dict.fromkeys(found_terms))
+
+def extract_core_effects(text: str) -> str:
+    """효능에서 핵심 질환/증상 패턴만 추출"""
+    if not text or len(text.strip()) < 5:
+        return ""
+    
+    found_terms = extract_effect_terms(text)
     
     if found_terms:
-        # 중복 제거하고 최대 5개
-        unique_terms = list(dict.fromkeys(found_terms))[:5]
+        # 최대 5개
+        unique_terms = found_terms[:5]
         return ", ".join(unique_terms)
     else:
         # 패턴 매칭 실패시 첫 문장의 핵심 부분만
@@ -416,6 +425,61 @@ def extract_all_core_info(document: Dict) -> Dict:
     
     return core_document
 
+# 제품명 파싱 (성분명/브랜드명)
+DOSAGE_FORM_SUFFIXES = ['연질캡슐', '서방정', '장용정', '캡슐', '시럽', '현탁액', '내복액', '연고', '크림', '겔', '액', '정']
+
+def extract_ingredient(product_name: str) -> str:
+    """제품명 괄호 안의 성분명 ('타이레놀정500밀리그람(아세트아미노펜)' → '아세트아미노펜')"""
+    if '(' in product_name and ')' in product_name:
+        return product_name.split('(')[1].split(')')[0]
+    return ""
+
+def extract_ingredient_names(product_name: str) -> List[str]:
+    """복합 성분을 개별 성분명 리스트로 분리"""
+    ingredient = extract_ingredient(product_name)
+    return [part.strip() for part in ingredient.split(',') if part.strip()]
+
+def extract_brand_name(product_name: str) -> str:
+    """함량/성분/제형을 뗀 브랜드명 ('타이레놀정500밀리그람(아세트아미노펜)' → '타이레놀')"""
+    name = re.split(r'[\d(\s]', product_name, maxsplit=1)[0]
+    for suffix in DOSAGE_FORM_SUFFIXES:
+        if name.endswith(suffix) and len(name) > len(suffix) + 1:
+            return name[:-len(suffix)]
+    return name
+
+# 제형 (긴 것부터 매칭)
+DOSAGE_FORMS = sorted([
+    '연질캡슐', '경질캡슐', '서방정', '장용정', '필름코팅정', '츄어블정', '발포정', '트로키', '캡슐', '정',
+    '건조시럽', '시럽', '현탁액', '내복액', '점안액', '액', '연고', '크림', '겔', '플라스타', '패치', '과립', '산',
+], key=len, reverse=True)
+
+def extract_dosage_form(product_name: str) -> str:
+    """제품명에서 제형 추출 ('타이레놀정500밀리그람(아세트아미노펜)' → '정', 없으면 빈 문자열)"""
+    head = product_name.split('(')[0].strip().split(' ')[0]
+    # 함량 표기 제거 후 재시도 ('타이레놀정500밀리그람' → '타이레놀정')
+    for name in (head, re.sub(r'\d[\d.,]*[가-힣A-Za-z%/]*$', '', head)):
+        for form in DOSAGE_FORMS:
+            if name.endswith(form) and len(name) > len(form):
+                return form
+    return ""
+
+def normalize_drug_name(text: str) -> str:
+    """약물명 비교용 정규화 (공백/구분기호 제거, 영문 소문자)"""
+    return re.sub(r'[\s\-_·.]', '', text or '').lower()
+
+def product_key(document: Dict) -> str:
+    """제품 식별 키 (제품명 + 제조사, 정규화)"""
+    return f"{normalize_drug_name(document.get('product_name', ''))}_{normalize_drug_name(document.get('company_name', ''))}"
+
+def document_source(product_name: str) -> str:
+    """출처 표기"""
+    return f"식약처 의약품개요정보 - {product_name}"
+
+def document_url(product_name: str) -> str:
+    """의약품안전나라 검색 URL - 성분명 우선, 없으면 제품명"""
+    search_keyword = extract_ingredient(product_name) or product_name
+    return f"https://nedrug.mfds.go.kr/search?keyword={urllib.parse.quote(search_keyword)}"
+
 # 임베딩용 텍스트 생성 함수 
 def create_embedding_content(document: Dict) -> str:
     """문서에서 임베딩용 텍스트 동적 생성"""
@@ -423,8 +487,8 @@ def create_embedding_content(document: Dict) -> str:
     content_parts = [f"약물: {product_name}"]
 
     # 성분명 추출 (괄호 안의 내용)
-    if '(' in product_name and ')' in product_name:
-        ingredient = product_name.split('(')[1].split(')')[0]
+    ingredient = extract_ingredient(product_name)
+    if ingredient:
         content_parts.append(f"성분: {ingredient}")
 
     # 약물 정보 필드들 추가 (순서 중요)
@@ -452,22 +516,13 @@ def item_to_documents(item: Dict, search_drug: str = None) -> List[Dict]:
     if not product_name:
         return []
     
-    # 성분명 추출 (URL용)
-    ingredient_name = ""
-    if '(' in product_name and ')' in product_name:
-        ingredient_name = product_name.split('(')[1].split(')')[0]
-    
-    # URL 생성 - 성분명 우선, 없으면 제품명
-    search_keyword = ingredient_name if ingredient_name else product_name
-    drug_url = f"https://nedrug.mfds.go.kr/search?keyword={urllib.parse.quote(search_keyword)}"
-
     # 기본 문서 구조
     document = {
         "drug_name": search_drug or product_name,
         "product_name": product_name,
         "company_name": company_name,
-        "source": f"식약처 의약품개요정보 - {product_name}",
-        "url": drug_url,
+        "source": document_source(product_name),
+        "url": document_url(product_name),
         "category": "통합약물정보"
     }
     
@@ -9,6 +9,96 @@ class Settings:
     UPSTAGE_API_KEY = os.getenv("UPSTAGE_API_KEY")
     ENVIRONMENT = os.getenv("ENVIRONMENT", "development")
     FRONTEND_URL = os.getenv("FRONTEND_URL", "http://localhost:5173")
+
+    # 임베딩 백엔드 (upstage: Solar API, hashing: 로컬 문자 n-gram TF-IDF)
+    EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "upstage")
+    EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL")  # 비우면 백엔드 기본 모델
+    HASHING_EMBEDDING_DIM = int(os.getenv("HASHING_EMBEDDING_DIM", "1024"))
+
+    # 벡터 검색과 동시에 식약처 API 검색을 미리 시작 (벡터 결과가 충분하면 취소)
+    SPECULATIVE_KFDA = os.getenv("SPECULATIVE_KFDA", "false").lower() == "true"
+    SPECULATIVE_KFDA_WORKERS = int(os.getenv("SPECULATIVE_KFDA_WORKERS", "4"))
+
+    # 요청 단위 시간 예산 (0이면 비활성화) 및 단계별 최소 필요 시간
+    REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "12"))
+    EMBEDDING_MIN_BUDGET_SECONDS = float(os.getenv("EMBEDDING_MIN_BUDGET_SECONDS", "0.3"))
+    KEYWORD_MIN_BUDGET_SECONDS = float(os.getenv("KEYWORD_MIN_BUDGET_SECONDS", "4"))
+    KFDA_MIN_BUDGET_SECONDS = float(os.getenv("KFDA_MIN_BUDGET_SECONDS", "3"))
+    LLM_MIN_BUDGET_SECONDS = float(os.getenv("LLM_MIN_BUDGET_SECONDS", "2"))
+    KFDA_TIMEOUT_SECONDS = float(os.getenv("KFDA_TIMEOUT_SECONDS", "10"))
+    LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "20"))
+
+    # 업스트림 재시도/서킷 브레이커 (Upstage, OpenAI, 식약처 공통)
+    RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "3"))
+    RETRY_BASE_DELAY_SECONDS = float(os.getenv("RETRY_BASE_DELAY_SECONDS", "0.2"))
+    RETRY_MAX_DELAY_SECONDS = float(os.getenv("RETRY_MAX_DELAY_SECONDS", "2"))
+    CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+    CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
+
+    # 아래 단계 중 응답 내용을 바꾸는 것(템플릿 응답, 상호작용 그래프, 오타 교정)은 기본 꺼짐
+    # 나머지(이름/증상 인덱스, 다양화, 복합 질문)는 LLM에 넘길 검색 후보만 바꾸고 응답은 LLM이 생성
+
+    # 단일 필드 질문(보관법, 최대 용량 등)은 LLM 없이 템플릿으로 응답
+    TEMPLATE_FASTPATH = os.getenv("TEMPLATE_FASTPATH", "false").lower() == "true"
+    FASTPATH_MIN_SIMILARITY = float(os.getenv("FASTPATH_MIN_SIMILARITY", "0.6"))
+
+    # 제품명/성분명 해시 인덱스 (약 이름만 있는 질문은 임베딩 생략, 섞인 질문은 가산점)
+    NAME_INDEX = os.getenv("NAME_INDEX", "true").lower() == "true"
+    NAME_MATCH_BOOST = float(os.getenv("NAME_MATCH_BOOST", "0.15"))
+    NAME_MATCH_CANDIDATES = int(os.getenv("NAME_MATCH_CANDIDATES", "32"))
+
+    # 증상 → 문서 역색인 (벡터 결과가 부족할 때 식약처 API보다 먼저 조회)
+    SYMPTOM_INDEX = os.getenv("SYMPTOM_INDEX", "true").lower() == "true"
+    SYMPTOM_MATCH_SCORE = float(os.getenv("SYMPTOM_MATCH_SCORE", "0.8"))
+
+    # 상호작용 그래프 ("A랑 B 같이 먹어도 돼?"를 LLM 없이 응답)
+    INTERACTION_GRAPH = os.getenv("INTERACTION_GRAPH", "false").lower() == "true"
+
+    # 약 이름 오타 교정 ('타이레놈' → '타이레놀', 키워드 추출 LLM 호출 전 로컬 처리)
+    SPELLING_CORRECTION = os.getenv("SPELLING_CORRECTION", "false").lower() == "true"
+
+    # 벡터 후보 과다 조회 후 어휘 특징으로 재순위화 (RERANK_WEIGHTS: 쉼표 구분, reranker.FEATURE_NAMES 순서)
+    RERANK = os.getenv("RERANK", "false").lower() == "true"
+    RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "50"))
+    RERANK_WEIGHTS = os.getenv("RERANK_WEIGHTS", "")
+
+    # 상위 3개 선택 전 결과 다양화 (ingredient: 같은 성분 제품 묶음, mmr: 저장 벡터 MMR, off: 사용 안 함)
+    RESULT_DIVERSIFY = os.getenv("RESULT_DIVERSIFY", "ingredient").lower()
+    DIVERSIFY_CANDIDATES = int(os.getenv("DIVERSIFY_CANDIDATES", "10"))
+    MMR_LAMBDA = float(os.getenv("MMR_LAMBDA", "0.7"))
+
+    # 복합 질문('감기약과 두통약 ...')을 하위 질문으로 나눠 한 번에 배치 검색
+    MULTI_QUERY = os.getenv("MULTI_QUERY", "true").lower() == "true"
+
+    # /api/chat/batch (한 번에 받을 질문 수, 동시 파이프라인/LLM 호출 수, 임베딩 호출당 질문 수)
+    BATCH_MAX_MESSAGES = int(os.getenv("BATCH_MAX_MESSAGES", "500"))
+    BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "4"))
+    BATCH_EMBEDDING_SIZE = int(os.getenv("BATCH_EMBEDDING_SIZE", "100"))
+
+    # 응답 압축 (Accept-Encoding: gzip 요청에 한해 이 크기(바이트) 이상이면 압축)
+    GZIP_MINIMUM_SIZE = int(os.getenv("GZIP_MINIMUM_SIZE", "1000"))
+
+    # 구축 시 준중복 문서 묶기 (MinHash 추정 Jaccard 유사도 기준, 0이면 사용 안 함)
+    # 성분과 효과/복용법이 같은 제품만 묶지만 답변 대상이 바뀔 수 있어 기본은 끔 (0.9 권장)
+    NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0"))
+
+    # 문서 벡터 사본(vectors.npy)을 인덱스와 함께 저장하고 memmap으로 조회 (false면 인덱스에서 복원)
+    VECTOR_MEMMAP = os.getenv("VECTOR_MEMMAP", "false").lower() == "true"
+
+    # 구축 시 PCA로 임베딩 차원 축소 (예: 256, 512 / 0이면 사용 안 함, 재구축 필요)
+    PROJECTION_DIM = int(os.getenv("PROJECTION_DIM", "0"))
+
+    # 구축 시 인덱스 샤드 수 (1이면 단일 인덱스) / 분할 기준 (range: ID 구간, category: 카테고리 경계)
+    INDEX_SHARDS = int(os.getenv("INDEX_SHARDS", "1"))
+    SHARD_BY = os.getenv("SHARD_BY", "range")
+    # 샤드 동시 검색 스레드 수 (0이면 샤드 수)
+    SHARD_SEARCH_WORKERS = int(os.getenv("SHARD_SEARCH_WORKERS", "0"))
+
+    # 인덱스 종류 (flat: 메모리 전체 로드, ivf_ondisk: IVF + 디스크 역리스트를 읽기 전용 mmap)
+    INDEX_TYPE = os.getenv("INDEX_TYPE", "flat")
+    # IVF 리스트 수 (0이면 문서 수 기준 자동) / 검색 시 조사할 리스트 수
+    IVF_NLIST = int(os.getenv("IVF_NLIST", "0"))
+    IVF_NPROBE = int(os.getenv("IVF_NPROBE", "16"))
     
     # CORS 설정
     ALLOWED_ORIGINS = [
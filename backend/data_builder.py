@@ -1,17 +1,35 @@
 import os
+import sys
 import json
 import faiss
 import time
+import hashlib
 import requests
 import numpy as np
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Optional
 from dotenv import load_dotenv
 from kfda_data_handler import get_data_handler
-from embedder import UpstageEmbedder
-from common_parser import item_to_documents, create_embedding_content
+from embedder import create_embedder_from_settings
+from common_parser import item_to_documents, create_embedding_content, product_key
+from interaction_graph import InteractionGraph
+from vector_store import save_vectors
+from dump_reader import iter_dump_items
+from near_duplicates import collapse_near_duplicates
+from projection import train_projection, project, save_projection, load_projection, neighbour_overlap
+from sharded_index import split_into_shards, index_exists, read_index, write_index
+from ondisk_index import build_ondisk_ivf
+from config import settings
 
 load_dotenv()
+
+
+def document_hash(document: Dict) -> str:
+    """문서 내용 해시 (필드 순서 무관, 준중복 묶음 정보 제외)"""
+    content = {key: value for key, value in document.items() if key != 'member_products'}
+    canonical = json.dumps(content, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+
     
 class MedicalDataBuilder:
     """의료 데이터 대량 수집 및 벡터 DB 구축"""
@@ -25,15 +43,23 @@ class MedicalDataBuilder:
         self.index_path = os.path.join(data_dir, "medical_docs.index")
         self.documents_path = os.path.join(data_dir, "documents.json")
         self.progress_path = os.path.join(data_dir, "build_progress.json")
+        self.sync_report_path = os.path.join(data_dir, "sync_report.json")
+        self.projection_report_path = os.path.join(data_dir, "projection_report.json")
         
         # 디렉토리 생성
         os.makedirs(data_dir, exist_ok=True)
         
-        # 임베딩 모델
-        self.embedder = UpstageEmbedder(model_name="solar-embedding-1-large-passage")
+        # 임베딩 모델 (EMBEDDING_BACKEND 설정)
+        self.embedder = create_embedder_from_settings()
         
-        # 식약처 데이터 핸들러
-        self.data_handler = get_data_handler()
+        # 식약처 데이터 핸들러 (API 키가 필요하므로 API 수집 시에만 생성 → 덤프 가져오기는 오프라인)
+        self._data_handler = None
+
+    @property
+    def data_handler(self):
+        if self._data_handler is None:
+            self._data_handler = get_data_handler()
+        return self._data_handler
 
     def load_progress(self) -> Dict:
         """이전 진행 상황 로드"""
@@ -73,32 +99,9 @@ class MedicalDataBuilder:
 
         while page <= self.max_pages:
             try:
-
-                params = {
-                    'serviceKey': self.data_handler.api_key,
-                    'numOfRows': 100,
-                    'pageNo': page,
-                    'type': 'json'
-                }
-
-                response = requests.get(self.data_handler.base_url, params=params)
-                response.raise_for_status()
-
-                data = response.json()
-
-                # API 응답 검증
-                header = data.get('header', {})
-                if header.get('resultCode') != '00':
-                    print(f"API 오류: {header.get('resultMsg')}")
+                items = self._fetch_page(page)
+                if items is None:
                     break
-                    
-                items = data.get('body', {}).get('items', [])
-
-                # 응답 형식 정규화
-                if isinstance(items, dict):
-                    items = [items]
-                elif not isinstance(items, list):
-                    items = []
                 
                 if not items:
                     print(f"페이지 {page}: 데이터 없음 - 수집 완료")
@@ -140,6 +143,50 @@ class MedicalDataBuilder:
         return unique_documents
     
 
+    def import_documents(self, paths: List[str]) -> List[Dict]:
+        """로컬 식약처 덤프(JSON/JSONL/XML, .gz 가능)에서 문서 수집 (API 호출 없음)"""
+        documents = []
+        item_count = 0
+        for path in paths:
+            for item in iter_dump_items(path):
+                item_count += 1
+                documents.extend(self._item_to_documents(item))
+                if item_count % 10000 == 0:
+                    print(f"아이템 {item_count}개 처리: 문서 {len(documents)}개")
+
+        unique_documents = self._remove_duplicates(documents)
+        print(f"덤프 가져오기: 아이템 {item_count}개 → 문서 {len(unique_documents)}개")
+        return unique_documents
+
+    def _fetch_page(self, page: int) -> Optional[List[Dict]]:
+        """식약처 API 한 페이지 아이템 (API 오류 응답이면 None)"""
+        params = {
+            'serviceKey': self.data_handler.api_key,
+            'numOfRows': 100,
+            'pageNo': page,
+            'type': 'json'
+        }
+
+        response = requests.get(self.data_handler.base_url, params=params)
+        response.raise_for_status()
+
+        data = response.json()
+
+        # API 응답 검증
+        header = data.get('header', {})
+        if header.get('resultCode') != '00':
+            print(f"API 오류: {header.get('resultMsg')}")
+            return None
+            
+        items = data.get('body', {}).get('items', [])
+
+        # 응답 형식 정규화
+        if isinstance(items, dict):
+            items = [items]
+        elif not isinstance(items, list):
+            items = []
+        return items
+
     def _item_to_documents(self, item: Dict) -> List[Dict]:
         """API 응답 아이템을 문서로 변환"""
         return item_to_documents(item)
@@ -167,6 +214,12 @@ class MedicalDataBuilder:
         if not documents:
             print("문서가 없어 인덱스를 구축할 수 없습니다.")
             return
+
+        # 본문이 거의 같은 제네릭 제품은 대표 문서 하나로 묶기 (나머지는 member_products)
+        if settings.NEAR_DUPLICATE_THRESHOLD > 0:
+            before = len(documents)
+            documents = collapse_near_duplicates(documents, settings.NEAR_DUPLICATE_THRESHOLD)
+            print(f"준중복 묶기: 문서 {before}개 → {len(documents)}개")
         
         # 임베딩 생성
         contents = []
@@ -174,6 +227,10 @@ class MedicalDataBuilder:
         for i, doc in enumerate(documents):
             embeddings_text = create_embedding_content(doc)
             contents.append(embeddings_text)
+
+        # 코퍼스 통계가 필요한 백엔드(hashing)는 먼저 학습 후 상태 저장
+        self.embedder.fit(contents)
+        self.embedder.save_state(self.data_dir)
         
         # 배치 처리로 메모리 효율성 증대
         batch_size = 100
@@ -187,23 +244,63 @@ class MedicalDataBuilder:
         # 임베딩 합치기
         embeddings = np.concatenate(all_embeddings, axis=0)
 
+        # L2 정규화
+        embeddings = embeddings.astype('float32')
+        faiss.normalize_L2(embeddings)
+
+        # (선택) PCA 차원 축소 + 원래 차원 인덱스와 top-3 이웃 비교 리포트
+        projection = None
+        if 0 < settings.PROJECTION_DIM < embeddings.shape[1]:
+            projection = train_projection(embeddings, settings.PROJECTION_DIM)
+            projected = project(projection, embeddings)
+            report = neighbour_overlap(embeddings, projected)
+            with open(self.projection_report_path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            print(f"차원 축소: {report['full_dimension']} → {report['projected_dimension']}, "
+                  f"top-3 겹침 평균 {report['mean_overlap']:.1%} (완전 일치 {report['exact_match_rate']:.1%})")
+            embeddings = projected
+
         # FAISS 인덱스 생성
-        dimension = embeddings.shape[1]
-        index = faiss.IndexFlatIP(dimension)
+        index, documents = self._create_index(embeddings, documents)
 
-        # L2 정규화 후 추가
-        faiss.normalize_L2(embeddings)
-        index.add(embeddings.astype('float32'))
+        self._save_database(index, documents, {'build_date': datetime.now().isoformat()}, projection)
+
+    def _create_index(self, vectors: np.ndarray, documents: List[Dict]):
+        """설정(INDEX_TYPE, INDEX_SHARDS)에 맞는 인덱스 → (인덱스, 문서) (category 샤드는 문서 순서가 바뀜)"""
+        if settings.INDEX_TYPE == "ivf_ondisk":
+            if settings.INDEX_SHARDS > 1:
+                print("⚠️ 온디스크 IVF는 샤드 없이 하나로 구축합니다.")
+            index = build_ondisk_ivf(vectors, self.index_path, settings.IVF_NLIST)
+            print(f"온디스크 IVF 인덱스: 리스트 {index.nlist}개")
+            return index, documents
+
+        if settings.INDEX_SHARDS > 1:
+            index, documents = split_into_shards(vectors, documents, settings.INDEX_SHARDS, settings.SHARD_BY)
+            print(f"인덱스 샤드 {len(index.shards)}개 ({settings.SHARD_BY})")
+            return index, documents
+
+        index = faiss.IndexFlatIP(vectors.shape[1])
+        index.add(vectors)
+        return index, documents
+
+    def _save_database(self, index, documents: List[Dict], extra: Dict = None, projection=None):
+        """인덱스, 투영, 문서, (선택) 벡터 사본, 상호작용 그래프 저장"""
+
+        # FAISS 인덱스 + 투영 저장 (투영이 없으면 이전 투영 파일 삭제)
+        write_index(index, self.index_path)
+        save_projection(self.data_dir, projection)
 
-        # FAISS 인덱스 저장
-        faiss.write_index(index, self.index_path)
+        # (선택) memmap 조회용 벡터 사본
+        if settings.VECTOR_MEMMAP:
+            save_vectors(self.data_dir, index.reconstruct_n(0, index.ntotal))
 
         # 문서 저장
         data = {
             'documents': documents,
-            'build_date': datetime.now().isoformat(),
+            **(extra or {}),
             'total_documents': len(documents),
-            'embedding_model': 'solar-embedding-1-large-passage',
+            **self.embedder.describe(),
+            'projection_dimension': index.d if projection is not None else 0,
             'document_format': 'direct_fields',  # 새로운 포맷 표시
             'field_structure': [
                 '효과',
@@ -218,6 +315,188 @@ class MedicalDataBuilder:
         with open(self.documents_path, 'w', encoding='utf-8') as f:
             json.dump(data, f, ensure_ascii=False, indent=2)
 
+        # 상호작용 그래프 (상호작용 필드 → 약물/계열 간선)
+        graph = InteractionGraph.from_documents(documents)
+        graph.save(self.data_dir)
+        print(f"상호작용 그래프 저장: {len(graph)}개 노드")
+
+    def sync_documents(self) -> Optional[Dict]:
+        """식약처 전체 페이지와 비교해 추가/변경/삭제 문서만 반영 (변경 없는 문서는 저장 벡터 재사용)
+
+        페이지 조회가 하나라도 실패하면 삭제는 반영하지 않음
+        """
+        start_time = time.time()
+
+        # 1. 기존 인덱스/문서 로드
+        if not (index_exists(self.index_path) and os.path.exists(self.documents_path)):
+            print("기존 벡터 DB가 없습니다. 전체 구축을 먼저 실행하세요.")
+            return None
+
+        with open(self.documents_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        index = read_index(self.index_path)
+        state_loaded = self.embedder.load_state(self.data_dir)
+
+        current = self.embedder.describe()
+        if (not state_loaded
+                or data.get('embedding_backend', 'upstage') != current['embedding_backend']
+                or data.get('embedding_model', 'solar-embedding-1-large-passage') != current['embedding_model']
+                or data.get('embedding_options', {}) != current.get('embedding_options', {})):
+            print("❌ 임베딩 설정이 인덱스와 달라 동기화할 수 없습니다. 전체 구축을 다시 실행하세요.")
+            return None
+
+        # 제품 키 → 기존 문서 ID / 기존 내용 (준중복으로 묶인 제품도 제품별로 비교)
+        group_of: Dict[str, int] = {}
+        old_products: Dict[str, Dict] = {}
+        for doc_id, doc in enumerate(data['documents']):
+            for product in [doc, *doc.get('member_products', [])]:
+                key = product_key(product)
+                if key not in group_of:
+                    group_of[key] = doc_id
+                    old_products[key] = product
+
+        # 2. 전체 페이지 조회 → 제품 키별 최신 문서
+        fresh: Dict[str, Dict] = {}
+        complete = True
+        page = 1
+        while page <= self.max_pages:
+            try:
+                items = self._fetch_page(page)
+            except Exception as e:
+                print(f"페이지 {page} 실패: {e}")
+                complete = False
+                page += 1
+                time.sleep(0.5)
+                continue
+
+            if items is None:
+                complete = False
+                break
+            if not items:
+                break
+
+            for item in items:
+                for doc in self._item_to_documents(item):
+                    fresh.setdefault(product_key(doc), doc)
+
+            if page % 50 == 0:
+                print(f"페이지 {page}: 문서 {len(fresh)}개")
+            page += 1
+            time.sleep(0.5)
+        else:
+            # 목표 문서 수 기준 최대 페이지에서 멈춘 경우 나머지 문서는 삭제로 보지 않음
+            complete = False
+
+        # 3. 변경 분류
+        added = [key for key in fresh if key not in group_of]
+        changed = [key for key in fresh if key in group_of
+                   and document_hash(fresh[key]) != document_hash(old_products[key])]
+        removed = [key for key in group_of if key not in fresh] if complete else []
+
+        # 제품이 하나라도 바뀌거나 삭제된 묶음은 남은 제품 + 추가 제품과 함께 다시 묶음
+        # (대표가 삭제되면 남은 제품 중 하나가 대표가 됨, 조회하지 못한 제품은 기존 내용 유지)
+        dirty = {group_of[key] for key in changed + removed}
+        regroup: List[Dict] = []
+        for doc_id in sorted(dirty):
+            doc = data['documents'][doc_id]
+            for product in [doc, *doc.get('member_products', [])]:
+                key = product_key(product)
+                if key in fresh:
+                    regroup.append(fresh[key])
+                elif not complete:
+                    regroup.append({k: v for k, v in product.items() if k != 'member_products'})
+        regroup += [fresh[key] for key in added]
+        if settings.NEAR_DUPLICATE_THRESHOLD > 0:
+            regroup = collapse_near_duplicates(regroup, settings.NEAR_DUPLICATE_THRESHOLD)
+
+        # 기존 대표가 다시 대표가 된 묶음은 제자리, 나머지는 뒤에
+        in_place: Dict[int, Dict] = {}
+        appended: List[Dict] = []
+        for document in regroup:
+            doc_id = group_of.get(product_key(document))
+            if doc_id in dirty and doc_id not in in_place and product_key(data['documents'][doc_id]) == product_key(document):
+                in_place[doc_id] = document
+            else:
+                appended.append(document)
+
+        # 4. 새 문서 목록 (기존 순서 유지, 변경 묶음은 제자리 교체, 추가는 뒤에) + 벡터 출처
+        documents: List[Dict] = []
+        sources = []  # ("old", 기존 문서 ID) 또는 ("new", 새 임베딩 행)
+        to_embed: List[Dict] = []
+        for doc_id, doc in enumerate(data['documents']):
+            if group_of[product_key(doc)] != doc_id:
+                continue  # 같은 제품 키의 중복 문서
+            if doc_id not in dirty:
+                sources.append(("old", doc_id))
+                documents.append(doc)
+            elif doc_id in in_place:
+                sources.append(("new", len(to_embed)))
+                to_embed.append(in_place[doc_id])
+                documents.append(in_place[doc_id])
+        for document in appended:
+            sources.append(("new", len(to_embed)))
+            to_embed.append(document)
+            documents.append(document)
+
+        report = {
+            "synced_at": datetime.now().isoformat(),
+            "pages": page - 1,
+            "complete": complete,
+            "total_documents": len(documents),
+            "unchanged": len(documents) - len(to_embed),
+            "added": [fresh[key]['product_name'] for key in added],
+            "changed": [fresh[key]['product_name'] for key in changed],
+            "removed": [old_products[key]['product_name'] for key in removed],
+        }
+
+        # 5. 바뀐 문서만 임베딩 후 인덱스 재구성
+        if to_embed or removed:
+            # 차원 축소로 구축한 인덱스면 새 임베딩에도 같은 투영 적용
+            projection = load_projection(self.data_dir)
+            new_embeddings = project(projection, self._embed_documents(to_embed)) if to_embed else None
+            new_index = faiss.IndexFlatIP(index.d)
+            chunk_size = 1000
+            for start in range(0, len(sources), chunk_size):
+                chunk = sources[start:start + chunk_size]
+                vectors = np.zeros((len(chunk), index.d), dtype='float32')
+                old_rows = [row for row, (kind, _) in enumerate(chunk) if kind == "old"]
+                if old_rows:
+                    vectors[old_rows] = index.reconstruct_batch(np.array([chunk[row][1] for row in old_rows], dtype='int64'))
+                new_rows = [row for row, (kind, _) in enumerate(chunk) if kind == "new"]
+                if new_rows:
+                    vectors[new_rows] = new_embeddings[[chunk[row][1] for row in new_rows]]
+                new_index.add(vectors)
+
+            # 샤드/온디스크 IVF 구성이면 새 문서 목록 기준으로 다시 구성 (category 샤드는 문서 순서도 재정렬)
+            if settings.INDEX_SHARDS > 1 or settings.INDEX_TYPE == "ivf_ondisk":
+                new_index, documents = self._create_index(new_index.reconstruct_n(0, new_index.ntotal), documents)
+
+            self._save_database(new_index, documents, {
+                'build_date': data.get('build_date'),
+                'last_sync': report['synced_at'],
+            }, projection)
+
+        report["elapsed_seconds"] = round(time.time() - start_time, 1)
+        with open(self.sync_report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+        print(f"동기화 완료: 추가 {len(added)}, 변경 {len(changed)}, 삭제 {len(removed)}, "
+              f"유지 {report['unchanged']} ({report['elapsed_seconds']}초)")
+        if not complete:
+            print("⚠️ 전체 페이지를 확인하지 못해 삭제는 반영하지 않았습니다.")
+        print("실행 중인 서버는 POST /api/reload 로 반영하세요.")
+        return report
+
+    def _embed_documents(self, documents: List[Dict]) -> np.ndarray:
+        """문서 임베딩 (배치, L2 정규화)"""
+        contents = [create_embedding_content(doc) for doc in documents]
+        batch_size = 100
+        embeddings = np.concatenate(
+            [self.embedder.encode(contents[i:i + batch_size]) for i in range(0, len(contents), batch_size)], axis=0
+        ).astype('float32')
+        faiss.normalize_L2(embeddings)
+        return embeddings
+
     def build_full_database(self):
         """전체 데이터베이스 구축 프로세스"""
 
@@ -236,7 +515,18 @@ class MedicalDataBuilder:
             print("진행 상황이 저장되었습니다.")
 
 def main():
-    """메인 실행"""
+    """메인 실행 (python data_builder.py sync → 변경분 동기화, import <경로> → 덤프로 구축)"""
+    if len(sys.argv) > 1 and sys.argv[1] == "sync":
+        print("식약처 변경분 동기화")
+        MedicalDataBuilder(target_documents=int(sys.argv[2]) if len(sys.argv) > 2 else 100000).sync_documents()
+        return
+
+    # python data_builder.py import <덤프 파일/디렉토리> ... → 로컬 덤프로 전체 구축
+    if len(sys.argv) > 2 and sys.argv[1] == "import":
+        builder = MedicalDataBuilder()
+        builder.build_vector_index(builder.import_documents(sys.argv[2:]))
+        return
+
     print("의료 데이터 수집 및 벡터 DB 구축 도구")
     print("주의: 이 과정은 30분-2시간 정도 소요됩니다.")
 
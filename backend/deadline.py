@@ -0,0 +1,48 @@
+import time
+import threading
+from typing import List, Optional
+from metrics import count_event
+
+
+class Deadline:
+    """요청 단위 시간 예산 (남은 시간에 맞춰 단계 생략/축소)"""
+
+    def __init__(self, budget_seconds: float):
+        self.budget = budget_seconds
+        self.expires_at = time.monotonic() + budget_seconds
+        self.degraded: List[str] = []  # 생략되거나 축소된 단계
+        self._lock = threading.Lock()
+
+    def remaining(self) -> float:
+        """남은 시간 (초)"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def allows(self, seconds: float) -> bool:
+        """해당 단계에 필요한 최소 시간이 남았는지"""
+        return self.remaining() >= seconds
+
+    def timeout(self, cap: Optional[float] = None) -> float:
+        """업스트림 호출에 줄 타임아웃 (기존 상한과 남은 시간 중 작은 값)"""
+        remaining = self.remaining()
+        return remaining if cap is None else min(cap, remaining)
+
+    def degrade(self, stage: str):
+        """단계 생략 기록 (응답의 degraded 필드와 메트릭에 반영)"""
+        with self._lock:
+            if stage in self.degraded:
+                return
+            self.degraded.append(stage)
+        count_event(f"degraded_{stage}")
+
+
+def stage_timeout(deadline: Optional[Deadline], cap: Optional[float]) -> Optional[float]:
+    """deadline이 없으면 기존 타임아웃 그대로 사용"""
+    return deadline.timeout(cap) if deadline is not None else cap
+
+
+def has_budget(deadline: Optional[Deadline], seconds: float) -> bool:
+    """deadline이 없으면 항상 진행"""
+    return deadline is None or deadline.allows(seconds)
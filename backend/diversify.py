@@ -0,0 +1,92 @@
+import numpy as np
+from typing import Dict, List, Optional
+from common_parser import extract_brand_name, extract_ingredient_names, normalize_drug_name
+from metrics import registry
+
+# 상위 3개 컨텍스트 슬롯이 같은 성분 제품으로 채워지지 않도록 결과 다양화
+# ingredient: 같은 성분(조합) 제품은 대표 1개만 남기고 related_products로 묶음
+# mmr: 저장된 벡터로 Maximal Marginal Relevance 선택
+
+CONTEXT_TOKENS_SAVED = registry.counter(
+    "medimate_context_tokens_saved_total",
+    "결과 다양화로 LLM 프롬프트에서 줄어든 컨텍스트 토큰 수 (추정)",
+)
+
+
+def ingredient_key(document: Dict) -> str:
+    """같은 성분 조합이면 같은 키 (성분이 없으면 브랜드명)"""
+    product_name = document.get('product_name', '')
+    ingredients = sorted(normalize_drug_name(name) for name in extract_ingredient_names(product_name))
+    if ingredients:
+        return ",".join(ingredients)
+    return normalize_drug_name(extract_brand_name(product_name))
+
+
+def estimate_tokens(text: str) -> int:
+    """대략적인 토큰 수 (한글 위주 텍스트 기준 UTF-8 3바이트당 1토큰)"""
+    return (len(text.encode('utf-8')) + 2) // 3
+
+
+def collapse_by_ingredient(results: List[Dict], top_k: int) -> List[Dict]:
+    """순위대로 성분 키가 처음 나온 문서만 선택"""
+    selected = []
+    seen_keys = set()
+    for result in results:
+        key = ingredient_key(result)
+        if key in seen_keys:
+            continue
+        seen_keys.add(key)
+        selected.append(result)
+        if len(selected) == top_k:
+            break
+    return selected
+
+
+def mmr_select(results: List[Dict], vectors: Optional[np.ndarray], top_k: int,
+               lambda_: float = 0.7, score_key: str = 'similarity_score') -> List[Dict]:
+    """MMR: 관련도 - 이미 고른 문서와의 최대 유사도
+
+    vectors: results와 같은 순서의 L2 정규화 벡터 (없는 행은 0), 벡터가 없는 쌍은 성분 키 일치로 유사도 대체
+    """
+    if len(results) <= top_k:
+        return list(results)
+
+    relevance = np.array([result.get(score_key, 0.0) for result in results], dtype="float32")
+    keys = [ingredient_key(result) for result in results]
+    same_key = np.array([[a == b for b in keys] for a in keys], dtype="float32")
+
+    if vectors is not None:
+        pairwise = vectors @ vectors.T
+        known = np.linalg.norm(vectors, axis=1) > 0
+        both_known = np.outer(known, known)
+        pairwise = np.where(both_known, pairwise, same_key)
+    else:
+        pairwise = same_key
+
+    selected = [int(np.argmax(relevance))]
+    max_similarity = pairwise[selected[0]].copy()
+    while len(selected) < top_k:
+        mmr = lambda_ * relevance - (1 - lambda_) * max_similarity
+        mmr[selected] = -np.inf
+        best = int(np.argmax(mmr))
+        selected.append(best)
+        max_similarity = np.maximum(max_similarity, pairwise[best])
+
+    return [results[i] for i in selected]
+
+
+def attach_related_products(selected: List[Dict], results: List[Dict], limit: int = 5) -> int:
+    """선택되지 않은 같은 성분 제품을 대표 문서의 related_products로 묶음 → 묶인 문서 수"""
+    selected_ids = {id(result) for result in selected}
+    related: Dict[str, List[str]] = {}
+    for result in results:
+        if id(result) not in selected_ids:
+            related.setdefault(ingredient_key(result), []).append(result.get('product_name', ''))
+
+    collapsed = 0
+    for result in selected:
+        products = [name for name in related.pop(ingredient_key(result), []) if name != result.get('product_name')]
+        if products:
+            result["related_products"] = list(dict.fromkeys(products))[:limit]
+            collapsed += len(products)
+    return collapsed
@@ -0,0 +1,119 @@
+import sys
+from collections.abc import Mapping
+from typing import Dict, Iterator
+from common_parser import document_source, document_url
+
+# self.documents용 압축 문서 레코드
+# 키는 문서마다 저장하지 않고(__slots__), 짧은 반복 값(분류, 제조사, 상투 문구)은 intern,
+# url/source는 제품명에서 필요할 때 생성, LLM 컨텍스트 한 줄은 미리 만들어 둠
+
+CONTEXT_FIELDS = ['효과', '복용법', '주의사항', '상호작용', '부작용', '보관법']
+
+# 문서 키 → 슬롯 이름
+FIELD_SLOTS = {
+    'drug_name': 'drug_name',
+    'product_name': 'product_name',
+    'company_name': 'company_name',
+    'category': 'category',
+    '효과': 'effect',
+    '복용법': 'dosage',
+    '주의사항': 'warnings',
+    '상호작용': 'interactions',
+    '부작용': 'side_effects',
+    '보관법': 'storage',
+}
+
+# 제품명에서 생성하는 키
+DERIVED_FIELDS = {
+    'source': document_source,
+    'url': document_url,
+}
+
+# item_to_documents 문서와 같은 키 순서
+KEY_ORDER = ['drug_name', 'product_name', 'company_name', 'source', 'url', 'category', *CONTEXT_FIELDS]
+
+# 이 길이 이하 문자열은 intern
+INTERN_MAX_LENGTH = 40
+
+
+def context_snippet(document: Mapping) -> str:
+    """LLM 컨텍스트용 문서 한 줄 ('약물: ... / 효과: ... / ...')"""
+    info_parts = [f"약물: {document.get('drug_name', '')}"]
+    for field in CONTEXT_FIELDS:
+        value = document.get(field, '')
+        if value:
+            info_parts.append(f"{field}: {value}")
+    return " / ".join(info_parts)
+
+
+def _intern(value):
+    if isinstance(value, str) and len(value) <= INTERN_MAX_LENGTH:
+        return sys.intern(value)
+    return value
+
+
+class DocumentRecord(Mapping):
+    """읽기 전용 dict처럼 쓰는 문서 (doc['효과'], doc.get(...), {**doc}, dict(doc))"""
+
+    __slots__ = (*FIELD_SLOTS.values(), 'extra', 'snippet')
+
+    def __init__(self, fields: Dict):
+        for slot in FIELD_SLOTS.values():
+            setattr(self, slot, None)
+        self.extra = None  # 슬롯에 없는 키, 제품명으로 만든 값과 다른 url/source
+
+        derived = {}
+        for key, value in fields.items():
+            slot = FIELD_SLOTS.get(key)
+            if slot is not None:
+                setattr(self, slot, _intern(value))
+            elif key in DERIVED_FIELDS:
+                derived[key] = value
+            else:
+                self._set_extra(key, value)
+
+        for key, value in derived.items():
+            if self.product_name is None or value != DERIVED_FIELDS[key](self.product_name):
+                self._set_extra(key, value)
+
+        self.snippet = context_snippet(self)
+
+    def _set_extra(self, key: str, value):
+        if self.extra is None:
+            self.extra = {}
+        self.extra[key] = _intern(value)
+
+    def __getitem__(self, key: str):
+        slot = FIELD_SLOTS.get(key)
+        if slot is not None:
+            value = getattr(self, slot)
+            if value is None:
+                raise KeyError(key)
+            return value
+        if self.extra is not None and key in self.extra:
+            return self.extra[key]
+        if key in DERIVED_FIELDS and self.product_name is not None:
+            return DERIVED_FIELDS[key](self.product_name)
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        for key in KEY_ORDER:
+            slot = FIELD_SLOTS.get(key)
+            if slot is not None:
+                if getattr(self, slot) is not None:
+                    yield key
+            elif self.product_name is not None or (self.extra is not None and key in self.extra):
+                yield key
+        if self.extra is not None:
+            for key in self.extra:
+                if key not in DERIVED_FIELDS:
+                    yield key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return f"DocumentRecord({dict(self)!r})"
+
+    def to_dict(self) -> Dict:
+        return dict(self)
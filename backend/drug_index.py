@@ -0,0 +1,174 @@
+import re
+from typing import Dict, List, Optional, Set, Tuple
+from common_parser import extract_brand_name, extract_ingredient_names, normalize_drug_name
+from answer_templates import FIELD_KEYWORDS
+
+# 제품명/성분명 → 문서 ID 해시 인덱스
+# 질문이 코퍼스의 약 이름만으로 이루어져 있으면 임베딩/FAISS 검색 없이 바로 문서 반환
+
+# 일치 강도별 검색 점수 (2: 제품명 전체, 1: 브랜드/성분명)
+MATCH_SCORES = {2: 1.0, 1: 0.95}
+
+# 약 이름 뒤에 붙는 조사
+PARTICLES = sorted([
+    '은', '는', '이', '가', '을', '를', '의', '도', '에', '과', '와', '랑', '이랑', '하고', '만',
+    '이나', '나', '로', '으로', '에서', '이요', '요', '이야', '야', '이에요', '예요',
+], key=len, reverse=True)
+
+# 약 이름 외에 있어도 '정확 일치'로 보는 단어 (필드 키워드 + 정보 요청 표현)
+FILLER_WORDS = {
+    keyword.replace(" ", "") for keywords in FIELD_KEYWORDS.values() for keyword in keywords
+} | {
+    '알려줘', '알려주세요', '알려줄래', '뭐야', '뭔가요', '무엇인가요', '정보', '설명', '설명해줘',
+    '약', '약물', '약품', '성분', '방법', '어때', '어때요', '궁금해', '궁금해요', '병용',
+}
+
+_TOKEN_PATTERN = re.compile(r'[가-힣A-Za-z0-9]+')
+
+
+def _strip_particle(rest: str) -> bool:
+    """이름 뒤 남은 부분이 없거나 조사뿐인지"""
+    return rest == '' or rest in PARTICLES
+
+
+def query_tokens(query: str) -> List[str]:
+    """질문을 한글/영문/숫자 토큰으로 분리 (영문 소문자)"""
+    return [token.lower() for token in _TOKEN_PATTERN.findall(query)]
+
+
+def query_token_spans(query: str) -> List[Tuple[str, int, int]]:
+    """query_tokens와 같은 토큰 + 원문 위치 (토큰, 시작, 끝)"""
+    return [(match.group().lower(), match.start(), match.end()) for match in _TOKEN_PATTERN.finditer(query)]
+
+
+# 여러 대상을 잇는 표현 ('감기약과 두통약', '타이레놀 및 애드빌')
+CONNECTOR_SUFFIXES = ['이랑', '하고', '랑', '과', '와']
+CONNECTOR_WORDS = {'및', '그리고', '또는'}
+
+
+def split_subqueries(query: str, max_parts: int = 3) -> List[str]:
+    """연결 표현 기준으로 질문을 하위 질문으로 분리 (나눌 곳이 없으면 빈 리스트)
+
+    '감기약과 두통약 같이 먹어도 돼?' → ['감기약', '두통약 같이 먹어도 돼?']
+    """
+    parts = [[]]
+    for word in query.split():
+        bare = word.rstrip('?!.,')
+        if bare in CONNECTOR_WORDS:
+            parts.append([])
+            continue
+
+        connector = next((c for c in CONNECTOR_SUFFIXES if bare.endswith(c) and len(bare) - len(c) >= 2), None)
+        # '효과와 부작용'처럼 필드 키워드끼리 이어진 경우는 나누지 않음
+        if connector and bare not in FILLER_WORDS and bare[:-len(connector)] not in FILLER_WORDS:
+            parts[-1].append(bare[:-len(connector)])
+            parts.append([])
+        elif word.endswith(',') and len(bare) >= 2:
+            parts[-1].append(bare)
+            parts.append([])
+        else:
+            parts[-1].append(word)
+
+    subqueries = [" ".join(part) for part in parts if part]
+    return subqueries[:max_parts] if len(subqueries) > 1 else []
+
+
+def longest_name_prefix(token: str, table: Dict, max_key_length: int) -> Optional[str]:
+    """토큰 앞부분에서 table에 있는 가장 긴 이름 (이름 뒤에는 조사만 허용)"""
+    for length in range(min(len(token), max_key_length), 1, -1):
+        prefix = token[:length]
+        if prefix in table and _strip_particle(token[length:]):
+            return prefix
+    return None
+
+
+class DrugNameMatch:
+    """질문에서 찾은 약 이름과 문서 ID"""
+
+    def __init__(self):
+        self.names: List[str] = []            # 질문에서 찾은 이름 키
+        self.doc_ids: Dict[int, int] = {}     # 문서 ID -> 일치 강도 (2: 제품명 전체, 1: 브랜드/성분)
+        self.is_exact = False                 # 질문 전체가 약 이름 + 필드 키워드로만 구성
+
+    def __bool__(self):
+        return bool(self.doc_ids)
+
+    def ranked_ids(self) -> List[int]:
+        """일치 강도 높은 순 (같으면 먼저 구축된 문서)"""
+        return sorted(self.doc_ids, key=lambda doc_id: (-self.doc_ids[doc_id], doc_id))
+
+
+class DrugNameIndex:
+    """정규화한 제품명/브랜드명/성분명 → 문서 ID 역색인"""
+
+    def __init__(self, documents: List[Dict] = None):
+        self.product_ids: Dict[str, Set[int]] = {}   # 정규화 제품명 전체
+        self.name_ids: Dict[str, Set[int]] = {}      # 브랜드명, 제형 포함 이름, 성분명
+        self.max_key_length = 0
+        if documents:
+            self.add_documents(documents)
+
+    def __len__(self):
+        return len(self.name_ids)
+
+    def _add_key(self, table: Dict[str, Set[int]], key: str, doc_id: int):
+        if len(key) < 2:
+            return
+        table.setdefault(key, set()).add(doc_id)
+        self.max_key_length = max(self.max_key_length, len(key))
+
+    def add_documents(self, documents: List[Dict], start_id: int = 0):
+        """문서 추가 (문서 ID는 FAISS 인덱스 순서와 동일)"""
+        for offset, doc in enumerate(documents):
+            doc_id = start_id + offset
+            # 준중복으로 묶인 제품(member_products)도 대표 문서로 연결
+            product_names = [doc.get('product_name', '')]
+            product_names += [member.get('product_name', '') for member in doc.get('member_products', [])]
+
+            for product_name in product_names:
+                self._add_key(self.product_ids, normalize_drug_name(product_name), doc_id)
+
+                # '타이레놀정500밀리그람(아세트아미노펜)' → 타이레놀, 타이레놀정, 아세트아미노펜
+                base_name = re.split(r'[\d(\s]', product_name, maxsplit=1)[0]
+                for name in [extract_brand_name(product_name), base_name, *extract_ingredient_names(product_name)]:
+                    self._add_key(self.name_ids, normalize_drug_name(name), doc_id)
+
+    def lookup(self, name: str) -> Set[int]:
+        """이름 하나로 문서 ID 조회"""
+        key = normalize_drug_name(name)
+        return self.product_ids.get(key) or self.name_ids.get(key, set())
+
+    def match_query(self, query: str) -> DrugNameMatch:
+        """질문 토큰별로 가장 긴 이름 키를 찾아 문서 ID 수집"""
+        match = DrugNameMatch()
+        all_covered = True
+
+        # 제품명 전체를 그대로 입력한 경우
+        full_key = normalize_drug_name(query)
+        if full_key in self.product_ids:
+            match.names.append(full_key)
+            for doc_id in self.product_ids[full_key]:
+                match.doc_ids[doc_id] = 2
+            match.is_exact = True
+            return match
+
+        for token in query_tokens(query):
+            name = longest_name_prefix(token, self.name_ids, self.max_key_length)
+            if name is None:
+                if not self._is_filler(token):
+                    all_covered = False
+                continue
+
+            match.names.append(name)
+            # 괄호 없는 제품명('베아제정')은 제품명 전체 일치로 취급
+            strength = 2 if name in self.product_ids else 1
+            for doc_id in self.name_ids[name]:
+                match.doc_ids[doc_id] = max(match.doc_ids.get(doc_id, 0), strength)
+
+        match.is_exact = bool(match.doc_ids) and all_covered
+        return match
+
+    def _is_filler(self, token: str) -> bool:
+        if token in FILLER_WORDS:
+            return True
+        return any(token.endswith(p) and token[:-len(p)] in FILLER_WORDS for p in PARTICLES)
@@ -0,0 +1,129 @@
+import os
+import io
+import gzip
+import json
+import xml.etree.ElementTree as ET
+from typing import Dict, Iterator, List, TextIO
+
+# 식약처 의약품개요정보 덤프 파일을 아이템 단위로 스트리밍
+# 지원 형식: JSON(API 응답 / 아이템 배열), JSONL, XML (각각 .gz 가능), 디렉토리는 파일 이름순
+
+DUMP_EXTENSIONS = ('.json', '.jsonl', '.ndjson', '.xml')
+CHUNK_SIZE = 1 << 16
+
+
+def _open_text(path: str) -> TextIO:
+    """gzip이면 풀어서 텍스트로 열기 (확장자가 아니라 파일 앞 2바이트로 판단)"""
+    with open(path, 'rb') as f:
+        magic = f.read(2)
+    if magic == b'\x1f\x8b':
+        return io.TextIOWrapper(gzip.open(path, 'rb'), encoding='utf-8-sig')
+    return open(path, 'r', encoding='utf-8-sig')
+
+
+def _dump_format(path: str) -> str:
+    name = path[:-3] if path.endswith('.gz') else path
+    extension = os.path.splitext(name)[1].lower()
+    if extension not in DUMP_EXTENSIONS:
+        raise ValueError(f"❌ 지원하지 않는 덤프 형식: {path} (사용 가능: {', '.join(DUMP_EXTENSIONS)}, .gz)")
+    return extension
+
+
+def _iter_jsonl(f: TextIO) -> Iterator[Dict]:
+    for line in f:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def _iter_json(f: TextIO) -> Iterator[Dict]:
+    """JSON 아이템 배열 스트리밍 ([...] 또는 {"body": {"items": [...]}} 의 items)"""
+    decoder = json.JSONDecoder()
+    buffer = f.read(CHUNK_SIZE)
+
+    # 아이템 배열 시작 위치 찾기
+    stripped = buffer.lstrip()
+    if stripped.startswith('['):
+        position = buffer.index('[') + 1
+    else:
+        while '"items"' not in buffer:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            buffer += chunk
+        position = buffer.index('"items"') + len('"items"')
+        while True:
+            bracket = buffer.find('[', position)
+            brace = buffer.find('{', position)
+            if bracket != -1 or brace != -1:
+                break
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            buffer += chunk
+        if bracket == -1 or (brace != -1 and brace < bracket):
+            # 아이템이 1개면 배열 대신 객체로 오는 응답
+            item, _ = decoder.raw_decode(buffer + f.read(), brace)
+            yield item
+            return
+        position = bracket + 1
+
+    eof = False
+    while True:
+        # 공백/쉼표 건너뛰기
+        while position < len(buffer) and buffer[position] in ' \t\r\n,':
+            position += 1
+        if position >= len(buffer):
+            if eof:
+                return
+            chunk = f.read(CHUNK_SIZE)
+            eof = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+        if buffer[position] == ']':
+            return
+
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            chunk = f.read(CHUNK_SIZE)
+            eof = not chunk
+            buffer = buffer[position:] + chunk
+            position = 0
+            continue
+
+        yield item
+        position = end
+        # 처리한 부분은 버퍼에서 제거
+        if position > CHUNK_SIZE:
+            buffer = buffer[position:]
+            position = 0
+
+
+def _iter_xml(f: TextIO) -> Iterator[Dict]:
+    """<item><itemName>...</itemName>...</item> → dict"""
+    for _, element in ET.iterparse(f, events=('end',)):
+        if element.tag == 'item':
+            yield {child.tag: (child.text or '').strip() for child in element}
+            element.clear()
+
+
+def _dump_files(path: str) -> List[str]:
+    if os.path.isdir(path):
+        return sorted(
+            os.path.join(path, name) for name in os.listdir(path)
+            if name.lower().endswith(DUMP_EXTENSIONS) or name.lower().endswith(tuple(e + '.gz' for e in DUMP_EXTENSIONS))
+        )
+    return [path]
+
+
+def iter_dump_items(path: str) -> Iterator[Dict]:
+    """덤프 파일(또는 디렉토리)의 식약처 아이템을 하나씩 반환"""
+    readers = {'.json': _iter_json, '.jsonl': _iter_jsonl, '.ndjson': _iter_jsonl, '.xml': _iter_xml}
+    for file_path in _dump_files(path):
+        reader = readers[_dump_format(file_path)]
+        with _open_text(file_path) as f:
+            yield from reader(f)
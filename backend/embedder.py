@@ -1,7 +1,12 @@
 import os
+import json
+import zlib
 import numpy as np
+from typing import Dict, List
 from dotenv import load_dotenv
 from openai import OpenAI
+from deadline import Deadline
+from resilience import call_with_resilience
 
 load_dotenv()
 
@@ -13,29 +18,194 @@ load_dotenv()
 # 긴 텍스트(설명, 약품 정보, 가이드라인) 최적화
 # 실시간 검색 시 (rag_system.py → 사용자 쿼리)
 
-class UpstageEmbedder:
+# 백엔드 이름 -> 임베더 클래스
+EMBEDDER_REGISTRY = {}
+
+
+def register_embedder(name: str):
+    """임베더 백엔드 등록 데코레이터"""
+    def decorator(cls):
+        cls.backend_name = name
+        EMBEDDER_REGISTRY[name] = cls
+        return cls
+    return decorator
+
+
+def create_embedder(backend: str = "upstage", **options):
+    """등록된 백엔드 이름으로 임베더 생성"""
+    if backend not in EMBEDDER_REGISTRY:
+        available = ", ".join(sorted(EMBEDDER_REGISTRY))
+        raise ValueError(f"❌ 알 수 없는 임베딩 백엔드: {backend} (사용 가능: {available})")
+    return EMBEDDER_REGISTRY[backend](**options)
+
+
+def create_embedder_from_settings():
+    """환경 설정(EMBEDDING_BACKEND 등)에 맞는 임베더 생성"""
+    from config import settings
+
+    options = {}
+    if settings.EMBEDDING_MODEL:
+        options["model_name"] = settings.EMBEDDING_MODEL
+    if settings.EMBEDDING_BACKEND == "hashing":
+        options["dimension"] = settings.HASHING_EMBEDDING_DIM
+    return create_embedder(settings.EMBEDDING_BACKEND, **options)
+
+
+class BaseEmbedder:
+    """임베더 공통 인터페이스"""
+
+    backend_name = ""
+    default_model = ""
+
+    def __init__(self, model_name: str = None):
+        self.model_name = model_name or self.default_model
+        self.dimension = None
+
+    def encode(self, texts, timeout: float = None) -> np.ndarray:
+        """텍스트를 벡터로 변환 (n x dimension float32), timeout은 원격 백엔드용"""
+        raise NotImplementedError
+
+    def fit(self, texts: List[str]):
+        """코퍼스 통계가 필요한 백엔드용 (기본은 아무것도 하지 않음)"""
+
+    def save_state(self, data_dir: str):
+        """백엔드 상태를 인덱스와 함께 저장"""
+
+    def load_state(self, data_dir: str) -> bool:
+        """인덱스와 함께 저장된 백엔드 상태 로드 (상태가 필요한데 없으면 False)"""
+        return True
+
+    def describe(self) -> Dict:
+        """빌드 메타데이터에 기록할 임베딩 설정"""
+        return {
+            "embedding_backend": self.backend_name,
+            "embedding_model": self.model_name,
+            "embedding_dimension": self.dimension,
+        }
+
+
+@register_embedder("upstage")
+class UpstageEmbedder(BaseEmbedder):
     """Upstage 임베딩 (OpenAI SDK 호환)"""
 
+    default_model = "solar-embedding-1-large-passage"
+
     def __init__(self, model_name="solar-embedding-1-large-passage"):
-        self.model_name = model_name
+        super().__init__(model_name)
         api_key = os.getenv("UPSTAGE_API_KEY")
         if not api_key:
             raise ValueError("❌ UPSTAGE_API_KEY 환경 변수가 설정되지 않았습니다.")
-        
+
+        # 재시도는 resilience 계층에서 처리
         self.client = OpenAI(
             api_key=api_key,
-            base_url="https://api.upstage.ai/v1"
+            base_url=os.getenv("UPSTAGE_BASE_URL", "https://api.upstage.ai/v1"),
+            max_retries=0
         )
 
-    def encode(self, texts):
+    def encode(self, texts, timeout: float = None):
         """텍스트를 벡터로 변환"""
         if isinstance(texts, str):
             texts = [texts]
 
-        response = self.client.embeddings.create(
-            input=texts,
-            model=self.model_name
-        )
+        # timeout은 재시도를 포함한 전체 예산
+        budget = Deadline(timeout) if timeout is not None else None
+
+        def request():
+            request_options = {"timeout": budget.timeout()} if budget is not None else {}
+            return self.client.embeddings.create(
+                input=texts,
+                model=self.model_name,
+                **request_options
+            )
+
+        response = call_with_resilience("upstage", request, deadline=budget)
 
         embeddings = [item.embedding for item in response.data]
-        return np.array(embeddings, dtype="float32")
\ No newline at end of file
+        embeddings = np.array(embeddings, dtype="float32")
+        self.dimension = embeddings.shape[1]
+        return embeddings
+
+
+@register_embedder("hashing")
+class HashingEmbedder(BaseEmbedder):
+    """문자 n-gram 해싱 TF-IDF 임베딩 (로컬 CPU, 네트워크 불필요)"""
+
+    default_model = "char-ngram-hashing"
+    state_filename = "hashing_idf.json"
+
+    def __init__(self, model_name="char-ngram-hashing", dimension=1024, ngram_range=(1, 3)):
+        super().__init__(model_name)
+        self.dimension = int(dimension)
+        self.ngram_range = tuple(ngram_range)
+        # 구축 시 fit()으로 계산, 없으면 TF만 사용
+        self.idf = np.ones(self.dimension, dtype="float32")
+
+    def _ngram_buckets(self, text: str):
+        """문자 n-gram을 (버킷, 부호) 배열로 변환"""
+        compact = " ".join(text.split())
+        min_n, max_n = self.ngram_range
+        buckets, signs = [], []
+        for n in range(min_n, max_n + 1):
+            for i in range(len(compact) - n + 1):
+                gram = compact[i:i + n]
+                if gram.isspace():
+                    continue
+                h = zlib.crc32(gram.encode('utf-8'))
+                buckets.append(h % self.dimension)
+                signs.append(1.0 if (h >> 31) & 1 else -1.0)
+        return np.array(buckets, dtype=np.int64), np.array(signs, dtype="float32")
+
+    def fit(self, texts: List[str]):
+        """코퍼스 문서 빈도로 버킷별 IDF 계산"""
+        df = np.zeros(self.dimension, dtype="float64")
+        for text in texts:
+            buckets, _ = self._ngram_buckets(text)
+            if len(buckets):
+                df[np.unique(buckets)] += 1
+        n_docs = max(len(texts), 1)
+        self.idf = (np.log((1 + n_docs) / (1 + df)) + 1.0).astype("float32")
+
+    def encode(self, texts, timeout: float = None):
+        """텍스트를 sublinear TF-IDF 해싱 벡터로 변환 (로컬 계산이라 timeout 무시)"""
+        if isinstance(texts, str):
+            texts = [texts]
+
+        embeddings = np.zeros((len(texts), self.dimension), dtype="float32")
+        for row, text in enumerate(texts):
+            buckets, signs = self._ngram_buckets(text)
+            if not len(buckets):
+                continue
+            counts = np.bincount(buckets, weights=signs, minlength=self.dimension).astype("float32")
+            embeddings[row] = np.sign(counts) * np.log1p(np.abs(counts)) * self.idf
+
+        return embeddings
+
+    def save_state(self, data_dir: str):
+        path = os.path.join(data_dir, self.state_filename)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "dimension": self.dimension,
+                "ngram_range": list(self.ngram_range),
+                "idf": self.idf.tolist(),
+            }, f)
+
+    def load_state(self, data_dir: str) -> bool:
+        path = os.path.join(data_dir, self.state_filename)
+        if not os.path.exists(path):
+            # IDF 없이 인코딩하면 인덱스와 가중치가 달라짐
+            return False
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        if state["dimension"] != self.dimension or tuple(state["ngram_range"]) != self.ngram_range:
+            print(f"⚠️ 해싱 설정이 인덱스와 다릅니다 (설정={self.dimension}/{list(self.ngram_range)}, "
+                  f"인덱스={state['dimension']}/{state['ngram_range']}). 인덱스 설정을 사용합니다.")
+        self.dimension = state["dimension"]
+        self.ngram_range = tuple(state["ngram_range"])
+        self.idf = np.array(state["idf"], dtype="float32")
+        return True
+
+    def describe(self) -> Dict:
+        info = super().describe()
+        info["embedding_options"] = {"ngram_range": list(self.ngram_range)}
+        return info
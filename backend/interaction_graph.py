@@ -0,0 +1,274 @@
+import os
+import json
+import re
+from typing import Dict, List, Optional, Set, Tuple
+from common_parser import extract_brand_name, extract_ingredient_names, normalize_drug_name
+from drug_index import query_tokens, longest_name_prefix
+from answer_templates import INTERACTION_MARKERS
+
+# 상호작용 필드(extract_core_interactions 결과)로 만든 약물/약물 계열 그래프
+# "A랑 B 같이 먹어도 돼?" 질문을 LLM 없이 그래프 조회로 응답
+
+GRAPH_FILENAME = "interaction_graph.json"
+
+# 성분 → 계열 (상호작용 문구가 계열명으로 적혀 있어 성분과 연결하기 위함)
+# 계열 소속만으로는 병용 주의 응답을 만들지 않음 (근거는 항상 문서의 상호작용/성분 문구)
+# 아세트아미노펜은 NSAID가 아니므로 NSAID 계열 목록에 넣지 않음
+CLASS_MEMBERS = {
+    '해열진통제': ['이부프로펜', '덱시부프로펜', '나프록센', '아스피린', '케토프로펜', '이소프로필안티피린'],
+    '소염진통제': ['이부프로펜', '덱시부프로펜', '나프록센', '아스피린', '케토프로펜', '록소프로펜', '디클로페낙', '아세클로페낙'],
+    '항응고제': ['와파린', '아픽사반', '리바록사반', '에독사반', '다비가트란', '헤파린'],
+    '제산제': ['수산화마그네슘', '수산화알루미늄', '인산알루미늄', '탄산칼슘', '알마게이트', '히드로탈시트'],
+    '항히스타민제': ['세티리진', '세티리진염산염', '로라타딘', '펙소페나딘', '클로르페니라민', '디펜히드라민', '독실아민'],
+    '항생제': ['아목시실린', '독시사이클린', '테트라사이클린', '미노사이클린', '시프로플록사신', '레보플록사신'],
+    '철분제': ['황산제일철', '푸마르산제일철', '철'],
+    '진정제': ['디펜히드라민', '독실아민', '멜라토닌', '졸피뎀'],
+    '이뇨제': ['히드로클로로티아지드', '푸로세미드', '스피로노락톤'],
+}
+
+# 같은 계열의 다른 표기
+CLASS_ALIASES = {
+    '진통제': '해열진통제',
+    '비스테로이드성소염진통제': '소염진통제',
+    'nsaid': '소염진통제',
+    '소염진통외용제': '소염진통제',
+    '항혈전제': '항응고제',
+    '수면제': '진정제',
+}
+
+# extract_core_interactions 결과에서 약물명이 아닌 표현
+GENERIC_TERMS = {'다수 약물과', '다수', '사용', '복용', '함께', '경구', '포함'}
+
+_ACTION_SUFFIX = re.compile(r'\s*(병용주의|상호작용)$')
+
+
+def parse_interaction_terms(text: str) -> List[str]:
+    """'항응고제, 철분제 병용주의' → ['항응고제', '철분제']"""
+    if not text:
+        return []
+    body = _ACTION_SUFFIX.sub('', text.strip())
+    terms = [term.strip() for term in body.split(',')]
+    return [term for term in terms if len(term) >= 2 and term not in GENERIC_TERMS]
+
+
+class DrugMention:
+    """질문에서 찾은 약 이름 하나"""
+
+    def __init__(self, name: str, nodes: Set[int], doc_ids: Set[int]):
+        self.name = name
+        self.nodes = nodes
+        self.doc_ids = doc_ids
+
+
+class InteractionFinding:
+    """약 쌍에 대한 그래프 조회 결과 하나"""
+
+    def __init__(self, kind: str, subject: str, target: str, doc_ids: List[int]):
+        self.kind = kind          # interaction, same_ingredient, general_caution
+        self.subject = subject    # 주의 문구를 가진 쪽 (약/성분)
+        self.target = target      # 상대 약/성분/계열
+        self.doc_ids = doc_ids    # 근거 문서 ID
+
+
+class InteractionGraph:
+    """약물(성분)/계열 노드와 '함께 복용 주의' 간선"""
+
+    def __init__(self):
+        self.nodes: List[str] = []
+        self.kinds: List[str] = []                           # drug 또는 class
+        self.node_ids: Dict[str, int] = {}
+        self.edges: Dict[int, Dict[int, List[int]]] = {}     # 주의 문구를 가진 노드 -> 상대 노드 -> 근거 문서
+        self.members: Dict[int, Set[int]] = {}               # 성분 노드 -> 계열 노드
+        self.general_caution: Dict[int, List[int]] = {}      # '다수 약물과 병용주의' 노드 -> 근거 문서
+        self.aliases: Dict[str, Tuple[Set[int], Set[int]]] = {}  # 이름 -> (노드, 제품 문서)
+        self.max_alias_length = 0
+        self.document_count = 0
+
+    def __len__(self):
+        return len(self.nodes)
+
+    # 구축
+    def _node(self, name: str, kind: str) -> int:
+        key = normalize_drug_name(CLASS_ALIASES.get(normalize_drug_name(name), name))
+        node = self.node_ids.get(key)
+        if node is None:
+            node = len(self.nodes)
+            self.nodes.append(key)
+            self.kinds.append(kind)
+            self.node_ids[key] = node
+        return node
+
+    def _add_alias(self, name: str, nodes: Set[int], doc_ids: Set[int] = ()):
+        key = normalize_drug_name(name)
+        if len(key) < 2:
+            return
+        alias_nodes, alias_docs = self.aliases.setdefault(key, (set(), set()))
+        alias_nodes.update(nodes)
+        alias_docs.update(doc_ids)
+        self.max_alias_length = max(self.max_alias_length, len(key))
+
+    def _build_classes(self):
+        for class_name, ingredients in CLASS_MEMBERS.items():
+            class_node = self._node(class_name, 'class')
+            self._add_alias(class_name, {class_node})
+            for ingredient in ingredients:
+                drug_node = self._node(ingredient, 'drug')
+                self.members.setdefault(drug_node, set()).add(class_node)
+                self._add_alias(ingredient, {drug_node})
+        for alias, class_name in CLASS_ALIASES.items():
+            self._add_alias(alias, {self.node_ids[normalize_drug_name(class_name)]})
+
+    def _resolve_term(self, term: str) -> Set[int]:
+        """상호작용 문구의 용어 → 노드 (알려진 이름이 없으면 새 약물 노드)"""
+        key = normalize_drug_name(CLASS_ALIASES.get(normalize_drug_name(term), term))
+        if key in self.aliases:
+            return set(self.aliases[key][0])
+        return {self._node(term, 'class' if key.endswith('제') else 'drug')}
+
+    @classmethod
+    def from_documents(cls, documents: List[Dict]) -> "InteractionGraph":
+        graph = cls()
+        graph._build_classes()
+        graph.add_documents(documents)
+        return graph
+
+    def add_documents(self, documents: List[Dict], start_id: int = None):
+        """문서 추가 (문서 ID는 FAISS 인덱스 순서와 동일)"""
+        start_id = self.document_count if start_id is None else start_id
+
+        # 1. 제품 → 성분 노드 (성분이 없으면 제품 자체가 노드)
+        subjects = []
+        for offset, doc in enumerate(documents):
+            doc_id = start_id + offset
+            product_name = doc.get('product_name', '')
+            ingredients = extract_ingredient_names(product_name)
+            names = ingredients or [extract_brand_name(product_name)]
+            nodes = {self._node(name, 'drug') for name in names if len(normalize_drug_name(name)) >= 2}
+
+            for name in ingredients:
+                self._add_alias(name, {self._node(name, 'drug')}, {doc_id})
+            base_name = re.split(r'[\d(\s]', product_name, maxsplit=1)[0]
+            for name in {extract_brand_name(product_name), base_name}:
+                self._add_alias(name, nodes, {doc_id})
+            subjects.append((doc_id, doc, nodes))
+
+        # 2. 상호작용 문구 → 간선 (제품 이름이 모두 등록된 뒤 연결)
+        for doc_id, doc, nodes in subjects:
+            text = doc.get('상호작용', '')
+            targets = set()
+            for term in parse_interaction_terms(text):
+                targets |= self._resolve_term(term)
+            # 요약에서 빠진 계열명이 원문 일부에 남아 있는 경우
+            compact = normalize_drug_name(text)
+            for class_name in list(CLASS_MEMBERS) + list(CLASS_ALIASES):
+                if normalize_drug_name(class_name) in compact:
+                    targets |= self.aliases[normalize_drug_name(class_name)][0]
+
+            for node in nodes:
+                if '다수 약물' in text:
+                    self.general_caution.setdefault(node, []).append(doc_id)
+                for target in targets - {node}:
+                    self.edges.setdefault(node, {}).setdefault(target, []).append(doc_id)
+
+        self.document_count = max(self.document_count, start_id + len(documents))
+
+    # 조회
+    def find_mentions(self, query: str) -> List[DrugMention]:
+        """질문에서 그래프에 있는 약/성분/계열 이름 찾기 (등장 순서)"""
+        mentions = []
+        seen = set()
+        for token in query_tokens(query):
+            name = longest_name_prefix(token, self.aliases, self.max_alias_length)
+            if name is None or name in seen:
+                continue
+            seen.add(name)
+            nodes, doc_ids = self.aliases[name]
+            mentions.append(DrugMention(name, set(nodes), set(doc_ids)))
+        return mentions
+
+    def _with_classes(self, nodes: Set[int]) -> Set[int]:
+        expanded = set(nodes)
+        for node in nodes:
+            expanded |= self.members.get(node, set())
+        return expanded
+
+    def _own_evidence(self, mention: DrugMention, doc_ids: List[int]) -> List[int]:
+        """제품명으로 찾은 약은 그 제품 문서의 문구만 근거로 사용 (같은 성분의 다른 복합제 문구 제외)"""
+        if not mention.doc_ids:
+            return doc_ids
+        return [doc_id for doc_id in doc_ids if doc_id in mention.doc_ids]
+
+    def check_pair(self, first: DrugMention, second: DrugMention) -> List[InteractionFinding]:
+        """두 약 사이의 병용 주의/성분 중복 조회 (문서 문구에 근거가 없으면 빈 목록 → 일반 검색/LLM 경로)"""
+        findings = []
+
+        # 1. 한쪽 문서에 상대 약(또는 그 계열)이 병용 주의로 적힌 경우
+        for subject, other in ((first, second), (second, first)):
+            targets = self._with_classes(other.nodes)
+            for node in subject.nodes:
+                for target, doc_ids in self.edges.get(node, {}).items():
+                    if target in targets:
+                        evidence = self._own_evidence(subject, doc_ids)
+                        if not evidence:
+                            continue
+                        findings.append(InteractionFinding(
+                            'interaction', subject.name, self.nodes[target], evidence[:3]
+                        ))
+
+        # 2. 같은 성분 중복 복용
+        for node in first.nodes & second.nodes:
+            if self.kinds[node] == 'drug':
+                evidence = sorted(first.doc_ids | second.doc_ids)[:3]
+                findings.append(InteractionFinding('same_ingredient', first.name, self.nodes[node], evidence))
+
+        # 3. 그래프에 직접 간선은 없지만 '다수 약물과 병용주의' 표기가 있는 경우
+        if not findings:
+            for mention in (first, second):
+                for node in mention.nodes:
+                    evidence = self._own_evidence(mention, self.general_caution.get(node, []))
+                    if evidence:
+                        findings.append(InteractionFinding('general_caution', mention.name, '', evidence[:3]))
+                        break
+
+        return findings
+
+    # 저장/로드
+    def save(self, data_dir: str):
+        path = os.path.join(data_dir, GRAPH_FILENAME)
+        data = {
+            'nodes': self.nodes,
+            'kinds': self.kinds,
+            'edges': [[s, t, docs] for s, targets in self.edges.items() for t, docs in targets.items()],
+            'members': [[node, sorted(classes)] for node, classes in self.members.items()],
+            'general_caution': [[node, docs] for node, docs in self.general_caution.items()],
+            'aliases': {name: [sorted(nodes), sorted(docs)] for name, (nodes, docs) in self.aliases.items()},
+            'document_count': self.document_count,
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, data_dir: str) -> Optional["InteractionGraph"]:
+        path = os.path.join(data_dir, GRAPH_FILENAME)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+        graph = cls()
+        graph.nodes = data['nodes']
+        graph.kinds = data['kinds']
+        graph.node_ids = {name: i for i, name in enumerate(graph.nodes)}
+        for s, t, docs in data['edges']:
+            graph.edges.setdefault(s, {})[t] = docs
+        graph.members = {node: set(classes) for node, classes in data['members']}
+        graph.general_caution = {node: docs for node, docs in data['general_caution']}
+        graph.aliases = {name: (set(nodes), set(docs)) for name, (nodes, docs) in data['aliases'].items()}
+        graph.max_alias_length = max((len(name) for name in graph.aliases), default=0)
+        graph.document_count = data['document_count']
+        return graph
+
+
+def is_interaction_question(query: str) -> bool:
+    """'A랑 B 같이 먹어도 돼?' 형태인지"""
+    return any(marker in query for marker in INTERACTION_MARKERS)
@@ -1,12 +1,15 @@
 import json
 from typing import List, Tuple
+from resilience import call_with_resilience
+from deadline import Deadline, stage_timeout
+from config import settings
 class OpenAIKeywordExtractor:
     def __init__(self, openai_client):
         self.client = openai_client
         
 
-    def extract_search_keywords(self, query: str) -> Tuple[List[str], List[str]]:
-        """OpenAI를 사용해 자연어에서 약물명과 증상 키워드 추출"""
+    def extract_search_keywords(self, query: str, deadline: Deadline = None) -> Tuple[List[str], List[str], str]:
+        """OpenAI를 사용해 자연어에서 약물명과 증상 키워드 추출 (재시도 포함 deadline 안에서)"""
 
         function_schema = {
             "name": "extract_medical_keywords",
@@ -53,13 +56,19 @@ class OpenAIKeywordExtractor:
         ]
 
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=messages,
-                functions=[function_schema],
-                function_call={"name": "extract_medical_keywords"},
-                temperature=0.1,
-                max_tokens=300
+            # 타임아웃은 시도마다 남은 예산으로 다시 계산
+            response = call_with_resilience(
+                "openai",
+                lambda: self.client.chat.completions.create(
+                    model="gpt-4o-mini",
+                    messages=messages,
+                    functions=[function_schema],
+                    function_call={"name": "extract_medical_keywords"},
+                    temperature=0.1,
+                    max_tokens=300,
+                    timeout=stage_timeout(deadline, settings.LLM_TIMEOUT_SECONDS),
+                ),
+                deadline=deadline,
             )
 
             function_call = response.choices[0].message.function_call
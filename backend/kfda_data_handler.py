@@ -1,10 +1,16 @@
 import os
+import threading
 import requests
 from typing import List, Dict
 from dotenv import load_dotenv
 from openai import OpenAI
 from common_parser import item_to_documents
 from keyword_extractor import OpenAIKeywordExtractor
+from metrics import track_stage
+from deadline import Deadline, stage_timeout, has_budget
+from config import settings
+from resilience import call_with_resilience, is_circuit_open
+from batch import current_batch
 
 load_dotenv()
 
@@ -13,28 +19,59 @@ class KFDADataHandler:
 
     def __init__(self):
         self.api_key = os.getenv("KFDA_API_KEY")
-        self.base_url = "http://apis.data.go.kr/1471000/DrbEasyDrugInfoService/getDrbEasyDrugList"
+        self.base_url = os.getenv(
+            "KFDA_BASE_URL",
+            "http://apis.data.go.kr/1471000/DrbEasyDrugInfoService/getDrbEasyDrugList"
+        )
 
-        # OpenAI 클라이언트 (RAG 시스템과 공유)
-        self.openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        # OpenAI 클라이언트 (RAG 시스템과 공유, 재시도는 resilience 계층에서 처리)
+        self.openai_client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
         self.keyword_extractor = OpenAIKeywordExtractor(self.openai_client)
 
         if not self.api_key:
             raise ValueError("🔑 KFDA_API_KEY가 필요합니다. .env 파일에 설정하세요.")
 
-    def search_drug(self, query: str) -> List[Dict]:
-        """API에서 약명과 증상으로 검색하는 통합 함수"""
+    def search_drug(self, query: str, cancel_event: threading.Event = None,
+                    deadline: Deadline = None) -> List[Dict]:
+        """API에서 약명과 증상으로 검색하는 통합 함수
 
-        # 1. AI로 키워드 추출
-        drug_names, symptoms, intent = self.keyword_extractor.extract_search_keywords(query)
+        cancel_event가 설정되면 남은 API 호출을 건너뛴다 (투기적 검색 취소용, 결과 버림)
+        deadline의 남은 시간이 부족하면 남은 키워드 추출/API 호출을 생략하고 이미 받은 문서만 반환한다
+        """
+
+        def cancelled():
+            return cancel_event is not None and cancel_event.is_set()
+
+        def out_of_budget():
+            # 시간 예산 부족 또는 식약처 서킷 열림 → 남은 호출 생략
+            if not has_budget(deadline, settings.KFDA_MIN_BUDGET_SECONDS) or is_circuit_open("kfda"):
+                if deadline is not None:
+                    deadline.degrade("kfda_search")
+                return True
+            return False
+
+        if cancelled() or out_of_budget():
+            return []
+
+        # 1. AI로 키워드 추출 (시간이 부족하면 원본 쿼리로 바로 검색)
+        if has_budget(deadline, settings.KEYWORD_MIN_BUDGET_SECONDS):
+            with track_stage("keyword_extraction"):
+                drug_names, symptoms, intent = self.keyword_extractor.extract_search_keywords(query, deadline)
+        else:
+            deadline.degrade("keyword_extraction")
+            drug_names, symptoms, intent = [], [], "general"
 
         all_documents = []
 
         # 2. 추출된 키워드로 검색
         # 약물명 검색
         for drug_name in drug_names:
+            if cancelled():
+                return []
+            if out_of_budget():
+                break
             try:
-                drug_docs = self._search_by_drug_name(drug_name)
+                drug_docs = self._search_by_drug_name(drug_name, deadline)
                 all_documents.extend(drug_docs)
 
             except Exception as e:
@@ -42,17 +79,21 @@ class KFDADataHandler:
         
         # 증상 검색  
         for symptom in symptoms:
+            if cancelled():
+                return []
+            if out_of_budget():
+                break
             try:
-                symptom_docs = self._search_by_symptom(symptom)
+                symptom_docs = self._search_by_symptom(symptom, deadline)
                 all_documents.extend(symptom_docs)
 
             except Exception as e:
                 print(f"❌ 증상 '{symptom}' 검색 실패: {e}")
 
         # 3. 키워드가 없으면 원본 쿼리로 폴백
-        if not drug_names and not symptoms:
+        if not drug_names and not symptoms and not cancelled() and not out_of_budget():
             try:
-                fallback_docs = self._search_by_drug_name(query)
+                fallback_docs = self._search_by_drug_name(query, deadline)
                 all_documents.extend(fallback_docs)
             except:
                 pass
@@ -69,7 +110,7 @@ class KFDADataHandler:
 
         return unique_docs
     
-    def _search_by_drug_name(self, drug_name: str) -> List[Dict]:
+    def _search_by_drug_name(self, drug_name: str, deadline: Deadline = None) -> List[Dict]:
         """약명으로 검색"""
         
         params = {
@@ -80,9 +121,9 @@ class KFDADataHandler:
             'type' : 'json'
         }
 
-        return self._api_call(params, drug_name)
+        return self._api_call(params, drug_name, deadline)
     
-    def _search_by_symptom(self, symptom:str) -> List[Dict]:
+    def _search_by_symptom(self, symptom:str, deadline: Deadline = None) -> List[Dict]:
         """증상으로 검색"""
 
         params = {
@@ -93,13 +134,29 @@ class KFDADataHandler:
             'type' : 'json'
         }
 
-        return self._api_call(params, symptom)
+        return self._api_call(params, symptom, deadline)
     
-    def _api_call(self, params: Dict, search_term: str) -> List[Dict]:
-        """공통 API 호출 로직"""
+    def _api_call(self, params: Dict, search_term: str, deadline: Deadline = None) -> List[Dict]:
+        """공통 API 호출 로직 (배치 요청에서는 같은 검색을 한 번만 호출)"""
+        batch = current_batch()
+        if batch is None:
+            return self._fetch_documents(params, search_term, deadline)
+
+        key = ("kfda", search_term, tuple(sorted((k, v) for k, v in params.items() if k != 'serviceKey')))
+        documents = batch.shared_call(key, lambda: self._fetch_documents(params, search_term, deadline))
+        return [dict(doc) for doc in documents]
+
+    def _fetch_documents(self, params: Dict, search_term: str, deadline: Deadline = None) -> List[Dict]:
+        """식약처 API 호출 → 문서 변환"""
+
+        def fetch():
+            timeout = stage_timeout(deadline, settings.KFDA_TIMEOUT_SECONDS)
+            with track_stage("kfda_call"):
+                response = requests.get(self.base_url, params=params, timeout=timeout)
+            response.raise_for_status()
+            return response
 
-        response = requests.get(self.base_url, params=params, timeout=10)
-        response.raise_for_status()
+        response = call_with_resilience("kfda", fetch, deadline=deadline)
 
         data = response.json()  # 문자열으로 오기때문에 json으로 변환
 
@@ -141,7 +198,7 @@ def get_medical_documents():
     """의료 문서 가져오기"""
     return get_data_handler().get_medical_documents()
 
-def search_medical_data(query: str):
+def search_medical_data(query: str, cancel_event: threading.Event = None, deadline: Deadline = None):
     """사용자 쿼리로 의료 데이터 검색 (약명+증상)"""
-    return get_data_handler().search_drug(query)
+    return get_data_handler().search_drug(query, cancel_event=cancel_event, deadline=deadline)
 
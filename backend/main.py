@@ -1,15 +1,36 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 import time
+import json
 import uvicorn
 import os
 from typing import Optional, List, Dict
 from rag_system import get_rag_system
 from config import settings
+from metrics import count_event, render_metrics, STAGE_LATENCY
+
+# orjson이 있으면 빠른 JSON 직렬화 사용
+try:
+    import orjson
+    from fastapi.responses import ORJSONResponse as FastJSONResponse
+
+    def dumps_json(content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+except ImportError:
+    from fastapi.responses import JSONResponse as FastJSONResponse
+
+    def dumps_json(content) -> bytes:
+        return json.dumps(content, ensure_ascii=False).encode("utf-8")
 
 # 서버 생성
-app = FastAPI(title="복약지도 챗봇 API", version="1.0.0", description="RAG 기반 복약지도 챗봇 서비스")
+app = FastAPI(title="복약지도 챗봇 API", version="1.0.0", description="RAG 기반 복약지도 챗봇 서비스",
+              default_response_class=FastJSONResponse)
+
+# 응답 압축 (클라이언트가 gzip을 지원할 때만)
+app.add_middleware(GZipMiddleware, minimum_size=settings.GZIP_MINIMUM_SIZE)
 
 # CORS 설정 (프론트엔드와 연결을 위해)
 app.add_middleware(
@@ -23,6 +44,7 @@ app.add_middleware(
 # 요청/응답 모델 
 class ChatRequest(BaseModel):
     message: str  
+    include_timings: bool = False  # 단계별 소요 시간 포함 여부
 
 class SourceInfo(BaseModel):
     rank: int
@@ -37,6 +59,18 @@ class ChatResponse(BaseModel):
     search_results: List[Dict] = []
     model_used: str = "rag-gpt4"
     processing_time: Optional[float] = None
+    timings: Optional[Dict[str, float]] = None
+    degraded: List[str] = []  # 시간 예산 부족으로 생략/축소된 단계
+    corrected_query: Optional[str] = None  # 약 이름 오타를 교정한 경우 교정된 질문
+
+class BatchChatRequest(BaseModel):
+    messages: List[str]
+    include_timings: bool = False
+    stream: bool = False  # True면 끝나는 순서대로 NDJSON 한 줄씩 ({"index": 입력 위치, ...응답})
+
+class BatchChatResponse(BaseModel):
+    results: List[ChatResponse]  # 입력 순서
+    processing_time: Optional[float] = None
 
 def check_emergency_keywords(query: str) -> List[str]:
     """기본 안전성 경고 체크"""
@@ -56,11 +90,81 @@ def check_emergency_keywords(query: str) -> List[str]:
 async def root():
     return {"message" : "복약지도 Copilot API 서버가 정상 작동 중 입니다. 🤖"}
 
+def emergency_response(warnings: List[str], start_time: float) -> ChatResponse:
+    """응급 키워드 응답"""
+    count_event("emergency")
+    return ChatResponse(
+        response=warnings[0] + "\n\n전문 의료진의 진료가 필요합니다.",
+        sources=[],
+        search_results=[],
+        model_used="emergency_rule",
+        processing_time=time.time() - start_time
+    )
+
+def error_response(start_time: float) -> ChatResponse:
+    """RAG 처리 실패 응답"""
+    count_event("error")
+    return ChatResponse(
+        response="죄송합니다. 서버 처리 중 오류가 발생했습니다. 잠시 후 다시 시도해주세요.",
+        sources=[],
+        search_results=[],
+        model_used="error",
+        processing_time=time.time() - start_time
+    )
+
+def build_chat_response(result: Dict, start_time: float, include_timings: bool) -> ChatResponse:
+    """RAG 결과 → 응답 모델 (내부에서 만든 값이라 검증 생략)"""
+    sources = [
+        SourceInfo.model_construct(
+            rank=src["rank"],
+            source=src["source"],
+            category=src["category"],
+            similarity=src["similarity"],
+            url=src.get("url", "")
+        ) for src in result.get("sources", [])
+    ]
+
+    processing_time = time.time() - start_time
+    STAGE_LATENCY.observe(processing_time, stage="request")
+
+    return ChatResponse.model_construct(
+        response=result["response"],
+        sources=sources,
+        search_results=result.get("search_results", []),
+        model_used=result.get("model_used", "rag-gpt4"),
+        processing_time=processing_time,
+        timings=result.get("timings") if include_timings else None,
+        degraded=result.get("degraded", []),
+        corrected_query=result.get("corrected_query")
+    )
+
+def parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    """'product_name,효과' → 필드 목록 (없으면 None = 전체)"""
+    if not fields:
+        return None
+    return [field.strip() for field in fields.split(",") if field.strip()]
+
+def shape_response(response: ChatResponse, verbose: bool = True, fields: Optional[List[str]] = None) -> Dict:
+    """응답 dict 생성 (verbose=False면 search_results 제외, fields가 있으면 해당 필드만)"""
+    payload = response.model_dump(exclude={"search_results"})
+    if not verbose:
+        payload["search_results"] = []
+    elif fields:
+        payload["search_results"] = [
+            {field: doc[field] for field in fields if field in doc} for doc in response.search_results
+        ]
+    else:
+        payload["search_results"] = response.search_results
+    return payload
+
 @app.post("/api/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
-    """RAG 기반 채팅 엔드포인트"""
+def chat(request: ChatRequest, verbose: bool = True, fields: Optional[str] = None):
+    """RAG 기반 채팅 엔드포인트 (process_query가 블로킹이라 동기 def → 스레드풀에서 실행)
 
+    verbose=false면 search_results(문서 전체 필드) 생략, fields=product_name,효과 처럼 주면 해당 필드만
+    """
     start_time = time.time()
+    field_list = parse_fields(fields)
 
     # 사용자가 보낸 메세지
     user_message = request.message
@@ -68,49 +172,95 @@ async def chat(request: ChatRequest):
     # 1. 응급상황 우선 체크
     emergency_warnings = check_emergency_keywords(user_message)
     if emergency_warnings:
-        return ChatResponse(
-            response=emergency_warnings[0] + "\n\n전문 의료진의 진료가 필요합니다.",
-            sources=[],
-            search_results=[],
-            model_used="emergency_rule",
-            processing_time=time.time() - start_time
-        )
+        return FastJSONResponse(shape_response(emergency_response(emergency_warnings, start_time), verbose, field_list))
     
     try:
         # 2. RAG 시스템 처리
         rag_system = get_rag_system()
         result = rag_system.process_query(user_message)
 
-        # 3. 응답 구성
-        sources = [
-            SourceInfo(
-                rank=src["rank"],
-                source=src["source"],
-                category=src["category"],
-                similarity=src["similarity"],
-                url=src.get("url", "")
-            ) for src in result.get("sources", [])
-        ]
-
-        processing_time = time.time() - start_time
-
-        return ChatResponse(
-            response=result["response"],
-            sources=sources,
-            search_results=result.get("search_results", []),
-            model_used=result.get("model_used", "rag-gpt4"),
-            processing_time=processing_time
-        )
+        # 3. 응답 구성 (응답 모델 재검증 없이 바로 직렬화)
+        response = build_chat_response(result, start_time, request.include_timings)
+        return FastJSONResponse(shape_response(response, verbose, field_list))
 
     except Exception as e:
         print(f"RAG 시스템 오류: {e}")
-        return ChatResponse(
-            response="죄송합니다. 서버 처리 중 오류가 발생했습니다. 잠시 후 다시 시도해주세요.",
-            sources=[],
-            search_results=[],
-            model_used="error",
-            processing_time=time.time() - start_time
-        )
+        return FastJSONResponse(shape_response(error_response(start_time), verbose, field_list))
+
+@app.post("/api/chat/batch", response_model=BatchChatResponse)
+def chat_batch(request: BatchChatRequest, verbose: bool = True, fields: Optional[str] = None):
+    """여러 질문 일괄 처리 (백오피스용)
+
+    임베딩/FAISS 검색은 한 번에, 식약처 호출은 공유, LLM 호출은 BATCH_CONCURRENCY개까지 동시 실행
+    stream=True면 끝나는 순서대로 NDJSON 스트림, 아니면 입력 순서의 리스트
+    verbose/fields는 /api/chat과 동일
+    """
+    field_list = parse_fields(fields)
+    if len(request.messages) > settings.BATCH_MAX_MESSAGES:
+        raise HTTPException(status_code=413, detail=f"한 번에 최대 {settings.BATCH_MAX_MESSAGES}개 질문까지 처리할 수 있습니다.")
+
+    start_time = time.time()
+    count_event("batch_request")
+
+    # 1. 응급상황 질문은 RAG 없이 바로 응답
+    emergencies: Dict[int, ChatResponse] = {}
+    pending: List[int] = []
+    for index, message in enumerate(request.messages):
+        warnings = check_emergency_keywords(message)
+        if warnings:
+            emergencies[index] = emergency_response(warnings, start_time)
+        else:
+            pending.append(index)
+
+    def responses():
+        """(입력 위치, 응답) - 응급 응답 먼저, 나머지는 끝나는 순서대로"""
+        yield from emergencies.items()
+        if not pending:
+            return
+        try:
+            rag_system = get_rag_system()
+            for position, result in rag_system.iter_batch([request.messages[i] for i in pending]):
+                if result is None:
+                    yield pending[position], error_response(start_time)
+                else:
+                    yield pending[position], build_chat_response(result, start_time, request.include_timings)
+        except Exception as e:
+            print(f"RAG 배치 처리 오류: {e}")
+            for index in pending:
+                yield index, error_response(start_time)
+
+    # 2. NDJSON 스트림
+    if request.stream:
+        def ndjson():
+            sent = set()
+            for index, response in responses():
+                if index in sent:
+                    continue
+                sent.add(index)
+                yield dumps_json({"index": index, **shape_response(response, verbose, field_list)}) + b"\n"
+
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+    # 3. 입력 순서 리스트
+    results: List[Optional[Dict]] = [None] * len(request.messages)
+    for index, response in responses():
+        if results[index] is None:
+            results[index] = shape_response(response, verbose, field_list)
+
+    return FastJSONResponse({"results": results, "processing_time": time.time() - start_time})
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Prometheus 메트릭 엔드포인트"""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.post("/api/reload")
+def reload_database():
+    """동기화(python data_builder.py sync)로 바뀐 벡터 DB 다시 로드 (블로킹 작업이라 스레드풀에서 실행)"""
+    result = get_rag_system().reload_from_disk()
+    if not result["reloaded"]:
+        raise HTTPException(status_code=500, detail="벡터 DB를 다시 로드하지 못했습니다.")
+    return result
 
 @app.get("/api/drugs")
 async def get_all_drugs():
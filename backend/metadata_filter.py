@@ -0,0 +1,98 @@
+import numpy as np
+from typing import Dict, Iterable, List, Optional, Union
+from common_parser import extract_dosage_form, extract_ingredient_names, normalize_drug_name
+
+# 문서 속성(제조사, 분류, 성분, 제형)별 문서 ID 비트맵
+# search_documents(filters=...)에서 FAISS IDSelector로 넘겨 조건에 맞는 벡터만 점수 계산
+
+FILTER_ATTRIBUTES = ("company", "category", "ingredient", "dosage_form")
+
+# 세부 제형 → 대표 제형 ('정'으로 거르면 서방정/장용정도 포함)
+GENERAL_DOSAGE_FORMS = {
+    '서방정': '정', '장용정': '정', '필름코팅정': '정', '츄어블정': '정', '발포정': '정',
+    '연질캡슐': '캡슐', '경질캡슐': '캡슐', '건조시럽': '시럽',
+    '내복액': '액', '현탁액': '액', '점안액': '액',
+}
+
+FilterValue = Union[str, Iterable[str]]
+
+
+def document_attributes(document: Dict) -> Dict[str, List[str]]:
+    """필터용 문서 속성 값 (정규화)"""
+    product_name = document.get('product_name', '')
+    dosage_form = extract_dosage_form(product_name)
+    dosage_forms = [dosage_form, GENERAL_DOSAGE_FORMS.get(dosage_form)] if dosage_form else []
+
+    return {
+        "company": [normalize_drug_name(document.get('company_name', ''))],
+        "category": [document.get('category', '')],
+        "ingredient": [normalize_drug_name(name) for name in extract_ingredient_names(product_name)],
+        "dosage_form": [form for form in dosage_forms if form],
+    }
+
+
+def _normalize_value(attribute: str, value: str) -> str:
+    if attribute in ("company", "ingredient"):
+        return normalize_drug_name(value)
+    return value.strip()
+
+
+class MetadataBitmaps:
+    """속성 값별 bool 비트맵 (길이 = 문서 수, 인덱스 = FAISS 문서 ID)"""
+
+    def __init__(self, documents: List[Dict] = None):
+        self.size = 0
+        self.bitmaps: Dict[str, Dict[str, np.ndarray]] = {attribute: {} for attribute in FILTER_ATTRIBUTES}
+        if documents:
+            self.add_documents(documents)
+
+    def add_documents(self, documents: List[Dict], start_id: int = None):
+        """문서 추가 (기존 비트맵은 새 길이로 확장)"""
+        start_id = self.size if start_id is None else start_id
+        new_size = max(self.size, start_id + len(documents))
+
+        # 값별 문서 ID 모은 뒤 한 번에 비트맵 생성
+        postings: Dict[str, Dict[str, List[int]]] = {attribute: {} for attribute in FILTER_ATTRIBUTES}
+        for offset, document in enumerate(documents):
+            for attribute, values in document_attributes(document).items():
+                for value in values:
+                    if value:
+                        postings[attribute].setdefault(value, []).append(start_id + offset)
+
+        for attribute, bitmaps in self.bitmaps.items():
+            if new_size > self.size:
+                for value, bitmap in bitmaps.items():
+                    bitmaps[value] = np.concatenate([bitmap, np.zeros(new_size - self.size, dtype=bool)])
+            for value, doc_ids in postings[attribute].items():
+                bitmap = bitmaps.get(value)
+                if bitmap is None:
+                    bitmap = np.zeros(new_size, dtype=bool)
+                    bitmaps[value] = bitmap
+                bitmap[doc_ids] = True
+
+        self.size = new_size
+
+    def values(self, attribute: str) -> List[str]:
+        """속성별 사용 가능한 값 목록"""
+        return sorted(self.bitmaps[attribute])
+
+    def mask(self, filters: Dict[str, FilterValue]) -> Optional[np.ndarray]:
+        """필터 조건 → 문서 bool 마스크 (속성 내 값은 OR, 속성 간은 AND), 조건이 없으면 None"""
+        mask = None
+        for attribute, values in (filters or {}).items():
+            if attribute not in self.bitmaps:
+                raise ValueError(f"❌ 알 수 없는 필터 속성: {attribute} (사용 가능: {', '.join(FILTER_ATTRIBUTES)})")
+            if values is None:
+                continue
+            if isinstance(values, str):
+                values = [values]
+
+            attribute_mask = np.zeros(self.size, dtype=bool)
+            for value in values:
+                bitmap = self.bitmaps[attribute].get(_normalize_value(attribute, value))
+                if bitmap is not None:
+                    attribute_mask |= bitmap
+
+            mask = attribute_mask if mask is None else mask & attribute_mask
+
+        return mask
@@ -0,0 +1,240 @@
+import time
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+# Prometheus 텍스트 포맷(0.0.4)으로 내보내는 경량 메트릭 모듈
+# 외부 의존성 없이 /metrics 엔드포인트에서 사용
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0)
+
+
+def _format_labels(labelnames: Tuple[str, ...], values: Tuple[str, ...], extra: Dict[str, str] = None) -> str:
+    """라벨을 Prometheus 형식 문자열로 변환"""
+    pairs = list(zip(labelnames, values))
+    if extra:
+        pairs.extend(extra.items())
+    if not pairs:
+        return ""
+    escaped = []
+    for k, v in pairs:
+        value = str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        escaped.append(f'{k}="{value}"')
+    return "{" + ",".join(escaped) + "}"
+
+
+class _Metric:
+    """메트릭 공통 베이스"""
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: List[str] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames or [])
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """단조 증가 카운터"""
+
+    type_name = "counter"
+
+    def __init__(self, name, documentation, labelnames=None):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in items]
+
+
+class Gauge(_Metric):
+    """현재 값을 나타내는 게이지"""
+
+    type_name = "gauge"
+
+    def __init__(self, name, documentation, labelnames=None):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = float(value)
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {value}" for key, value in items]
+
+
+class Histogram(_Metric):
+    """누적 버킷 히스토그램"""
+
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, labelnames=None, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> (버킷별 카운트, 합계, 전체 카운트)
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = [[0] * len(self.buckets), 0.0, 0]
+                self._values[key] = state
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    def count(self, **labels) -> int:
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def sum(self, **labels) -> float:
+        state = self._values.get(self._key(labels))
+        return state[1] if state else 0.0
+
+    def _samples(self):
+        lines = []
+        with self._lock:
+            items = sorted((key, (list(s[0]), s[1], s[2])) for key, s in self._values.items())
+        for key, (bucket_counts, total, count) in items:
+            for bound, bucket_count in zip(self.buckets, bucket_counts):
+                labels = _format_labels(self.labelnames, key, {"le": repr(float(bound))})
+                lines.append(f"{self.name}_bucket{labels} {bucket_count}")
+            labels = _format_labels(self.labelnames, key, {"le": "+Inf"})
+            lines.append(f"{self.name}_bucket{labels} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """메트릭 등록 및 렌더링"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: List[str] = None) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: List[str] = None) -> Gauge:
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: List[str] = None,
+                  buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+# 전역 레지스트리
+registry = MetricsRegistry()
+
+STAGE_LATENCY = registry.histogram(
+    "medimate_stage_latency_seconds",
+    "RAG 파이프라인 단계별 소요 시간",
+    ["stage"],
+)
+
+PIPELINE_EVENTS = registry.counter(
+    "medimate_pipeline_events_total",
+    "파이프라인 경로 이벤트 (폴백, 응급 등)",
+    ["event"],
+)
+
+FASTPATH_SAVED = registry.histogram(
+    "medimate_fastpath_saved_seconds",
+    "템플릿 응답으로 절약한 LLM 생성 시간 (평균 LLM 지연 기준 추정)",
+)
+
+# 요청 단위 타이밍 수집용 (스레드/코루틴별로 분리)
+_current_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("medimate_timings", default=None)
+_timings_lock = threading.Lock()
+
+
+@contextmanager
+def track_stage(stage: str):
+    """단계 소요 시간을 히스토그램과 현재 요청 타이밍에 기록"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        STAGE_LATENCY.observe(elapsed, stage=stage)
+        timings = _current_timings.get()
+        if timings is not None:
+            with _timings_lock:
+                timings[stage] = timings.get(stage, 0.0) + elapsed
+
+
+@contextmanager
+def collect_timings():
+    """현재 요청의 단계별 타이밍을 dict로 수집"""
+    timings: Dict[str, float] = {}
+    token = _current_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _current_timings.reset(token)
+
+
+def count_event(event: str, amount: float = 1.0):
+    """파이프라인 이벤트 카운트"""
+    PIPELINE_EVENTS.inc(amount, event=event)
+
+
+def average_stage_latency(stage: str) -> float:
+    """지금까지 관측된 단계 평균 소요 시간 (관측 없으면 0)"""
+    count = STAGE_LATENCY.count(stage=stage)
+    return STAGE_LATENCY.sum(stage=stage) / count if count else 0.0
+
+
+def render_metrics() -> str:
+    """Prometheus 텍스트 포맷 출력"""
+    return registry.render()
@@ -0,0 +1,122 @@
+import re
+import zlib
+import numpy as np
+from typing import Dict, List, Optional
+from common_parser import extract_brand_name, extract_ingredient_names, normalize_drug_name
+
+# 구축 단계 준중복 문서 묶기 (MinHash + LSH)
+# 같은 성분의 제네릭 제품은 효과/복용법 등 본문이 거의 같아 인덱스와 top-k를 같은 내용으로 채움
+# → 대표 문서 1개만 임베딩하고 나머지는 member_products로 보관 (각 제품의 필드 그대로)
+# 성분이 같아도 효과/복용법이 다르면(액제/시럽 용량 등) 묶지 않음
+
+TEXT_FIELDS = ['효과', '복용법', '주의사항', '상호작용', '부작용', '보관법']
+NUM_PERM = 64
+BANDS = 16  # 밴드당 NUM_PERM / BANDS 행
+SHINGLE_SIZE = 3
+
+_rng = np.random.default_rng(20240501)
+_MULTIPLIERS = (_rng.integers(1, 2 ** 63, NUM_PERM, dtype=np.uint64) * 2 + 1).astype(np.uint64)
+_OFFSETS = _rng.integers(0, 2 ** 63, NUM_PERM, dtype=np.uint64)
+
+
+def document_text(document: Dict, fields: List[str] = TEXT_FIELDS) -> str:
+    """비교용 본문 (필드 순서대로 이어 붙이고 공백/문장부호 제거)"""
+    text = " ".join(document.get(field, '') for field in fields)
+    return re.sub(r'[\s.,;:()\[\]·~\-]', '', text).lower()
+
+
+def minhash_signature(text: str) -> np.ndarray:
+    """문자 n-gram 집합의 MinHash 서명 (multiply-shift 해시 NUM_PERM개)"""
+    shingles = {text[i:i + SHINGLE_SIZE] for i in range(max(1, len(text) - SHINGLE_SIZE + 1))}
+    hashes = np.fromiter((zlib.crc32(s.encode('utf-8')) for s in shingles), dtype=np.uint64, count=len(shingles))
+    with np.errstate(over='ignore'):
+        permuted = (hashes[None, :] * _MULTIPLIERS[:, None] + _OFFSETS[:, None]) >> np.uint64(32)
+    return permuted.min(axis=1)
+
+
+def _ingredient_key(document: Dict) -> str:
+    return ",".join(sorted(normalize_drug_name(n) for n in extract_ingredient_names(document.get('product_name', ''))))
+
+
+def _dosing_key(document: Dict) -> str:
+    """효과 + 복용법 정규화 본문 (같은 제품끼리만 같은 값)"""
+    return document_text(document, ['효과', '복용법'])
+
+
+def group_near_duplicates(documents: List[Dict], threshold: float = 0.9) -> List[List[int]]:
+    """추정 Jaccard 유사도가 threshold 이상이고 성분 조합과 효과/복용법이 같은 문서 묶음
+    (문서 순서, 첫 문서가 대표, 성분을 알 수 없거나 효과/복용법이 비어 있으면 묶지 않음)"""
+    rows = NUM_PERM // BANDS
+    texts = [document_text(doc) for doc in documents]
+    signatures = [minhash_signature(text) if text else None for text in texts]
+    ingredient_keys = [_ingredient_key(doc) for doc in documents]
+    dosing_keys = [_dosing_key(doc) for doc in documents]
+
+    parent = list(range(len(documents)))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    # 밴드 버킷이 하나라도 같으면 후보 → 서명 일치 비율로 확인
+    buckets: Dict[tuple, List[int]] = {}
+    for doc_id, signature in enumerate(signatures):
+        if signature is None or not ingredient_keys[doc_id] or not dosing_keys[doc_id]:
+            continue
+        for band in range(BANDS):
+            key = (band, ingredient_keys[doc_id], dosing_keys[doc_id], signature[band * rows:(band + 1) * rows].tobytes())
+            for other in buckets.setdefault(key, []):
+                root, other_root = find(doc_id), find(other)
+                if root == other_root:
+                    continue
+                if float(np.mean(signature == signatures[other])) >= threshold:
+                    parent[max(root, other_root)] = min(root, other_root)
+            buckets[key].append(doc_id)
+
+    groups: Dict[int, List[int]] = {}
+    for doc_id in range(len(documents)):
+        groups.setdefault(find(doc_id), []).append(doc_id)
+    return sorted(groups.values(), key=lambda group: group[0])
+
+
+def collapse_near_duplicates(documents: List[Dict], threshold: float = 0.9) -> List[Dict]:
+    """준중복 묶음마다 대표 문서만 남기고 나머지 제품은 자기 필드 그대로 member_products로"""
+    collapsed = []
+    for group in group_near_duplicates(documents, threshold):
+        representative = dict(documents[group[0]])
+        members = list(representative.get('member_products', []))
+        for doc_id in group[1:]:
+            member = documents[doc_id]
+            members.append({key: value for key, value in member.items() if key != 'member_products'})
+            members.extend(member.get('member_products', []))
+        if members:
+            representative['member_products'] = members
+        collapsed.append(representative)
+    return collapsed
+
+
+def _brand_in_query(document: Dict, compact_query: str) -> bool:
+    brand = normalize_drug_name(extract_brand_name(document.get('product_name', '')))
+    return len(brand) >= 2 and brand in compact_query
+
+
+def resolve_member(result: Dict, query: str) -> Dict:
+    """질문이 대표 문서가 아닌 묶인 제품 이름을 가리키면 그 제품 자신의 필드로 바꾼 결과"""
+    members = result.get('member_products')
+    if not members:
+        return result
+
+    compact_query = normalize_drug_name(query)
+    if _brand_in_query(result, compact_query):
+        return result
+
+    member: Optional[Dict] = next((m for m in members if _brand_in_query(m, compact_query)), None)
+    # 예전 빌드의 묶인 제품은 이름만 있어 대표 문서 내용으로 답할 수밖에 없음
+    if member is None or not any(member.get(field) for field in TEXT_FIELDS):
+        return result
+
+    resolved = {**result, **member}
+    resolved.pop('member_products', None)
+    return resolved
@@ -0,0 +1,86 @@
+import os
+import glob
+import time
+import shutil
+import tempfile
+import faiss
+import numpy as np
+from faiss.contrib.ondisk import merge_ondisk
+
+# IVF + 온디스크 역리스트 (전체 카탈로그처럼 인덱스를 RAM에 다 올리기 부담스러운 경우)
+# 역리스트는 medical_docs.index.<빌드시각>.ivfdata 에 저장하고 서버는 읽기 전용 mmap으로 열어
+# 검색 시 nprobe개 리스트의 페이지만 읽음 (상주 메모리 = 코어스 양자화기 + 문서 ID 맵 + 페이지 캐시)
+
+BLOCK_SIZE = 100000
+
+
+def default_nlist(count: int) -> int:
+    """리스트 수 기본값 (~4√N, 리스트당 학습 벡터 39개 이상)"""
+    return max(1, min(int(4 * np.sqrt(count)), count // 39))
+
+
+def ivfdata_files(index_path: str):
+    return sorted(glob.glob(f"{glob.escape(index_path)}.*.ivfdata"))
+
+
+def is_ondisk(index) -> bool:
+    return (isinstance(index, faiss.IndexIVF)
+            and isinstance(faiss.downcast_InvertedLists(index.invlists), faiss.OnDiskInvertedLists))
+
+
+def build_ondisk_ivf(vectors: np.ndarray, index_path: str, nlist: int = 0,
+                     block_size: int = BLOCK_SIZE, seed: int = 0) -> faiss.IndexIVF:
+    """정규화된 벡터로 IVF 학습 → 블록별로 추가해 하나의 .ivfdata로 병합 (문서 ID = 행 번호)"""
+    count, dimension = vectors.shape
+    nlist = nlist or default_nlist(count)
+
+    quantizer = faiss.IndexFlatIP(dimension)
+    index = faiss.IndexIVFFlat(quantizer, dimension, nlist, faiss.METRIC_INNER_PRODUCT)
+    rng = np.random.default_rng(seed)
+    sample = np.sort(rng.choice(count, size=min(count, nlist * 64), replace=False))
+    index.train(np.ascontiguousarray(vectors[sample], dtype='float32'))
+
+    # 새 빌드는 새 파일에 (실행 중인 서버가 mmap한 이전 파일은 write_ondisk_index에서 삭제)
+    ivfdata_path = f"{index_path}.{int(time.time() * 1000)}.ivfdata"
+    block_dir = tempfile.mkdtemp(dir=os.path.dirname(index_path) or '.')
+    try:
+        block_paths = []
+        for start in range(0, count, block_size):
+            end = min(start + block_size, count)
+            block = faiss.clone_index(index)
+            block.add_with_ids(np.ascontiguousarray(vectors[start:end], dtype='float32'),
+                               np.arange(start, end, dtype='int64'))
+            block_path = os.path.join(block_dir, f"block_{start}.index")
+            faiss.write_index(block, block_path)
+            block_paths.append(block_path)
+        merge_ondisk(index, block_paths, ivfdata_path)
+    finally:
+        shutil.rmtree(block_dir, ignore_errors=True)
+
+    return index
+
+
+def write_ondisk_index(index: faiss.IndexIVF, index_path: str):
+    """인덱스 헤더(코어스 양자화기 + .ivfdata 파일 이름) 교체 후 쓰지 않는 .ivfdata 삭제"""
+    temp_path = f"{index_path}.tmp"
+    faiss.write_index(index, temp_path)
+    os.replace(temp_path, index_path)
+
+    current = os.path.basename(faiss.downcast_InvertedLists(index.invlists).filename)
+    remove_ivfdata(index_path, keep=current)
+
+
+def remove_ivfdata(index_path: str, keep: str = None):
+    # 이미 mmap한 프로세스는 unlink 후에도 기존 내용을 계속 읽을 수 있음
+    for path in ivfdata_files(index_path):
+        if os.path.basename(path) != keep:
+            os.remove(path)
+
+
+def read_ondisk_index(index_path: str, nprobe: int = 16) -> faiss.IndexIVF:
+    """읽기 전용 mmap으로 열기 (.ivfdata는 인덱스 파일과 같은 디렉토리에서 찾음)"""
+    index = faiss.read_index(index_path, faiss.IO_FLAG_ONDISK_SAME_DIR | faiss.IO_FLAG_READ_ONLY)
+    index.nprobe = nprobe
+    # reconstruct(문서 ID)용 ID → 리스트 위치 맵 (문서당 8바이트)
+    index.make_direct_map()
+    return index
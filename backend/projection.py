@@ -0,0 +1,73 @@
+import os
+import faiss
+import numpy as np
+from typing import Dict, Optional
+
+# (선택) 구축 시 PCA 차원 축소
+# 투영 행렬은 인덱스 옆에 저장하고, 질문/새 문서 벡터에도 같은 투영 + L2 정규화 적용
+
+PROJECTION_FILENAME = "projection.bin"
+
+
+def train_projection(vectors: np.ndarray, dimension: int) -> faiss.VectorTransform:
+    """문서 벡터로 PCA 투영 학습 (입력 차원 → dimension)"""
+    pca = faiss.PCAMatrix(vectors.shape[1], dimension)
+    pca.train(np.ascontiguousarray(vectors, dtype='float32'))
+    return pca
+
+
+def project(transform: Optional[faiss.VectorTransform], vectors: np.ndarray) -> np.ndarray:
+    """투영 후 L2 정규화 (투영이 없으면 그대로)"""
+    if transform is None:
+        return vectors
+    projected = transform.apply(np.ascontiguousarray(vectors, dtype='float32'))
+    faiss.normalize_L2(projected)
+    return projected
+
+
+def save_projection(data_dir: str, transform: Optional[faiss.VectorTransform]):
+    """투영 저장 (None이면 이전 빌드의 투영 파일 삭제)"""
+    path = os.path.join(data_dir, PROJECTION_FILENAME)
+    if transform is None:
+        if os.path.exists(path):
+            os.remove(path)
+        return
+    faiss.write_VectorTransform(transform, path)
+
+
+def load_projection(data_dir: str) -> Optional[faiss.VectorTransform]:
+    path = os.path.join(data_dir, PROJECTION_FILENAME)
+    if not os.path.exists(path):
+        return None
+    return faiss.read_VectorTransform(path)
+
+
+def neighbour_overlap(full_vectors: np.ndarray, projected_vectors: np.ndarray,
+                      sample: int = 500, k: int = 3, seed: int = 0) -> Dict:
+    """문서 벡터를 질문으로 써서 원래 차원/축소 차원 인덱스의 top-k 이웃 겹침 비율 비교 (자기 자신 제외)"""
+    full_index = faiss.IndexFlatIP(full_vectors.shape[1])
+    full_index.add(full_vectors)
+    projected_index = faiss.IndexFlatIP(projected_vectors.shape[1])
+    projected_index.add(projected_vectors)
+
+    rng = np.random.default_rng(seed)
+    ids = rng.choice(len(full_vectors), size=min(sample, len(full_vectors)), replace=False)
+    _, full_neighbours = full_index.search(full_vectors[ids], k + 1)
+    _, projected_neighbours = projected_index.search(projected_vectors[ids], k + 1)
+
+    overlaps = []
+    for query_id, full_row, projected_row in zip(ids, full_neighbours, projected_neighbours):
+        expected = [i for i in full_row if i != query_id][:k]
+        found = [i for i in projected_row if i != query_id][:k]
+        if expected:
+            overlaps.append(len(set(expected) & set(found)) / len(expected))
+
+    return {
+        "full_dimension": int(full_vectors.shape[1]),
+        "projected_dimension": int(projected_vectors.shape[1]),
+        "queries": len(overlaps),
+        "k": k,
+        "mean_overlap": float(np.mean(overlaps)) if overlaps else 0.0,
+        "min_overlap": float(np.min(overlaps)) if overlaps else 0.0,
+        "exact_match_rate": float(np.mean([o == 1.0 for o in overlaps])) if overlaps else 0.0,
+    }
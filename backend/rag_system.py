@@ -1,14 +1,40 @@
 import os
 import json
 import faiss
+import threading
+import contextvars
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError, as_completed
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Union, Iterator, Optional, Tuple
 from openai import OpenAI
 from dotenv import load_dotenv
 from kfda_data_handler import get_data_handler, search_medical_data
-from embedder import UpstageEmbedder
-from common_parser import create_embedding_content
+from embedder import create_embedder_from_settings
+from common_parser import create_embedding_content, product_key
+from metrics import track_stage, collect_timings, count_event, average_stage_latency, FASTPATH_SAVED
+from config import settings
+from deadline import Deadline, stage_timeout, has_budget
+from answer_templates import (
+    render_document_summary, detect_field_intent, document_named_in_query, render_field_answer,
+    render_interaction_answer
+)
+from resilience import call_with_resilience, is_circuit_open
+from drug_index import DrugNameIndex, DrugNameMatch, MATCH_SCORES, FILLER_WORDS, split_subqueries
+from symptom_index import SymptomIndex, SYMPTOM_TERMS
+from spelling import SpellingIndex
+from metadata_filter import MetadataBitmaps
+from reranker import LexicalReranker, parse_weights
+from diversify import (
+    collapse_by_ingredient, mmr_select, attach_related_products, estimate_tokens, CONTEXT_TOKENS_SAVED
+)
+from interaction_graph import InteractionGraph, is_interaction_question
+from vector_store import save_vectors, load_vectors
+from projection import project, load_projection
+from sharded_index import index_exists, read_index, write_index, search_index
+from near_duplicates import resolve_member
+from batch import BatchContext, batch_scope, current_batch
+from document_record import DocumentRecord, context_snippet
 
 # Responses API가 새로 나왔지만, 안정성을 위해 Chat Completions API 사용
 
@@ -22,15 +48,16 @@ class MedicalRAGSystem:
         self.data_dir = data_dir
         self.index_path = os.path.join(data_dir, "medical_docs.index")
         self.documents_path = os.path.join(data_dir, "documents.json")
+        self.last_update_path = os.path.join(data_dir, "last_update.txt")
 
         # 디렉토리 생성
         os.makedirs(data_dir, exist_ok=True)
 
-        # OPENAI 설정
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        # OPENAI 설정 (재시도는 resilience 계층에서 처리)
+        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"), max_retries=0)
 
-        # 임베딩 모델
-        self.embedder = UpstageEmbedder(model_name="solar-embedding-1-large-passage")
+        # 임베딩 모델 (EMBEDDING_BACKEND 설정, 인덱스 메타데이터와 일치해야 함)
+        self.embedder = create_embedder_from_settings()
 
         # 식약처 데이터 T
         self.data_handler = get_data_handler()
@@ -38,6 +65,33 @@ class MedicalRAGSystem:
         # FAISS 인덱스와 메타데이터
         self.index = None
         self.documents = []
+        self.projection = None  # PCA 차원 축소로 구축한 인덱스면 질문/새 문서 벡터에 같은 투영 적용
+
+        # 제품 키(제품명_제조사) → 문서 ID, 문서 ID → 저장 벡터 (API 결과 재임베딩 방지)
+        self.product_ids: Dict[str, int] = {}
+        self.vectors = None  # vectors.npy memmap (없으면 인덱스에서 복원)
+
+        # 제품명/성분명, 증상 → 문서 ID 인덱스 (로드 시 구축, 다시 로드하면 증상 인덱스는 증분 갱신)
+        self.drug_index = None
+        self.symptom_index = None
+
+        # 상호작용 그래프 (구축 도구가 저장한 파일, 없으면 문서로 생성)
+        self.interaction_graph = None
+
+        # 약 이름 오타 교정 사전 (자모 분해 symmetric delete)
+        self.spelling_index = None
+
+        # 제조사/분류/성분/제형별 문서 ID 비트맵 (검색 필터용)
+        self.metadata_bitmaps = MetadataBitmaps()
+
+        # (선택) 과다 조회한 벡터 후보 재순위화
+        self.reranker = LexicalReranker(parse_weights(settings.RERANK_WEIGHTS)) if settings.RERANK else None
+
+        # 투기적 식약처 API 검색용 스레드 풀
+        self.speculation_pool = ThreadPoolExecutor(
+            max_workers=settings.SPECULATIVE_KFDA_WORKERS,
+            thread_name_prefix="kfda-speculation"
+        )
 
         # 시스템 초기화
         self._initialize_system()
@@ -52,17 +106,31 @@ class MedicalRAGSystem:
             self.index = None
             self.documents = []
 
-    def _load_existing_index(self) -> bool:
-        """기존 인덱스 로드"""
+    def _load_existing_index(self, previous: List[Dict] = None) -> bool:
+        """기존 인덱스 로드 (previous: 다시 로드 시 이전 문서 목록)"""
         try:
-            if os.path.exists(self.index_path) and os.path.exists(self.documents_path):
-                # FAISS 인덱스 로드
-                self.index = faiss.read_index(self.index_path)
-                
+            if index_exists(self.index_path) and os.path.exists(self.documents_path):
                 # 메타데이터 로드
                 with open(self.documents_path, 'r', encoding='utf-8') as f:
                     data = json.load(f)
-                    self.documents = data['documents']
+
+                # FAISS 인덱스 로드 (샤드 manifest면 샤드 인덱스, .ivfdata가 있으면 읽기 전용 mmap)
+                index = read_index(self.index_path, settings.SHARD_SEARCH_WORKERS, settings.IVF_NPROBE)
+
+                # 차원 축소 투영 (인덱스와 함께 저장됨)
+                projection = load_projection(self.data_dir) if data.get('projection_dimension') else None
+
+                # 임베딩 백엔드가 다르면 로드하지 않음 (벡터 공간이 달라 검색 결과가 무의미)
+                if not self.embedder.load_state(self.data_dir):
+                    print(f"❌ 임베딩 상태 파일이 없습니다 ({self.data_dir}). 인덱스를 다시 구축하세요.")
+                    return False
+                if not self._check_embedding_compatibility(data, index, projection):
+                    return False
+
+                self.index = index
+                self.projection = projection
+                self.documents = [DocumentRecord(doc) for doc in data['documents']]
+                self._build_lookup_indexes(previous)
                 
                 return True
                 
@@ -71,6 +139,38 @@ class MedicalRAGSystem:
 
         return False
 
+    def _check_embedding_compatibility(self, metadata: Dict, index, projection=None) -> bool:
+        """인덱스 구축 시 임베딩 설정과 현재 임베더 설정 비교"""
+        current = self.embedder.describe()
+
+        # 백엔드 정보가 없는 이전 빌드는 Upstage Solar 로 구축됨
+        built_backend = metadata.get('embedding_backend', 'upstage')
+        built_model = metadata.get('embedding_model', 'solar-embedding-1-large-passage')
+
+        if built_backend != current['embedding_backend'] or built_model != current['embedding_model']:
+            print(f"❌ 임베딩 설정 불일치: 인덱스={built_backend}/{built_model}, "
+                  f"현재={current['embedding_backend']}/{current['embedding_model']}")
+            return False
+
+        if metadata.get('projection_dimension') and (projection is None or projection.d_out != index.d):
+            print(f"❌ 차원 축소 투영 파일이 없거나 인덱스와 맞지 않음: 인덱스={index.d}")
+            return False
+
+        # 백엔드별 옵션 (해싱 n-gram 범위 등)
+        built_options = metadata.get('embedding_options', {})
+        if built_options != current.get('embedding_options', {}):
+            print(f"❌ 임베딩 옵션 불일치: 인덱스={built_options}, 현재={current.get('embedding_options', {})}")
+            return False
+
+        # 투영 전 임베딩 차원 기준으로 비교
+        input_dimension = projection.d_in if projection is not None else index.d
+        built_dimension = metadata.get('embedding_dimension') or input_dimension
+        if built_dimension != input_dimension or (current['embedding_dimension'] and current['embedding_dimension'] != input_dimension):
+            print(f"❌ 임베딩 차원 불일치: 인덱스={input_dimension}, 현재={current['embedding_dimension']}")
+            return False
+
+        return True
+
     def _rebuild_index(self, documents: List[Dict]):
         """인덱스 재구축"""
         
@@ -79,31 +179,48 @@ class MedicalRAGSystem:
         embeddings = self.embedder.encode(contents)
         
         # FAISS 인덱스 생성
-        dimension = embeddings.shape[1]
+        dimension = self.projection.d_out if self.projection is not None else embeddings.shape[1]
         self.index = faiss.IndexFlatIP(dimension)
         
         # L2 정규화 후 추가
         faiss.normalize_L2(embeddings)
-        self.index.add(embeddings.astype('float32'))
+        self.index.add(project(self.projection, embeddings.astype('float32')))
         
         
-        self.documents = documents
+        self.documents = [DocumentRecord(doc) for doc in documents]
+        self._build_lookup_indexes()
         
         # 디스크에 저장
         self._save_to_disk()
 
+    def reload_from_disk(self) -> Dict:
+        """동기화(python data_builder.py sync) 후 디스크 DB 다시 로드 (증상 인덱스는 바뀐 문서만 갱신)"""
+        previous = self.documents
+        reloaded = self._load_existing_index(previous)
+        return {"reloaded": reloaded, "total_documents": len(self.documents)}
+
     def _save_to_disk(self):
         """인덱스를 디스크에 저장"""
         try:
             # FAISS 인덱스 저장
-            faiss.write_index(self.index, self.index_path)
+            write_index(self.index, self.index_path)
+
+            if settings.VECTOR_MEMMAP:
+                save_vectors(self.data_dir, self.index.reconstruct_n(0, self.index.ntotal))
+                self.vectors = load_vectors(self.data_dir, self.index.ntotal, self.index.d)
             
             data = {
-                'documents': self.documents,
+                'documents': [doc.to_dict() for doc in self.documents],
+                'total_documents': len(self.documents),
+                **self.embedder.describe(),
+                'projection_dimension': self.index.d if self.projection is not None else 0,
                 'last_updated': datetime.now().isoformat()
             }
             with open(self.documents_path, 'w', encoding='utf-8') as f:
                 json.dump(data, f, ensure_ascii=False, indent=2)
+
+            if self.interaction_graph is not None:
+                self.interaction_graph.save(self.data_dir)
             
             # 마지막 업데이트 시간 저장
             with open(self.last_update_path, 'w') as f:
@@ -112,64 +229,288 @@ class MedicalRAGSystem:
         except Exception as e:
             print(f"디스크 저장 실패: {e}")
             
-    def search_documents(self, query: str, top_k: int = 3) -> List[Dict]:
-        """쿼리와 유사한 문서 검색 - 벡터 검색"""
+    def _update_symptom_index(self, previous: List[Dict]) -> int:
+        """이전 문서 목록과 같은 ID의 효과 필드를 비교해 바뀐 문서만 다시 색인 → 갱신 문서 수"""
+        changed = [doc_id for doc_id, doc in enumerate(self.documents)
+                   if doc_id >= len(previous) or previous[doc_id].get('효과') != doc.get('효과')]
+        # 동기화로 문서가 줄었으면 뒤쪽 ID 삭제, 바뀐 ID는 add_documents가 기존 포스팅을 지우고 다시 추가
+        removed = list(range(len(self.documents), len(previous)))
+        self.symptom_index.remove_documents(removed)
+        for doc_id in changed:
+            self.symptom_index.add_documents([self.documents[doc_id]], doc_id)
+        return len(changed) + len(removed)
+
+    def _add_product_keys(self, doc: Dict, doc_id: int):
+        """제품 키 → 문서 ID (준중복으로 묶인 제품은 대표 문서 ID)"""
+        self.product_ids.setdefault(product_key(doc), doc_id)
+        for member in doc.get('member_products', []):
+            self.product_ids.setdefault(product_key(member), doc_id)
+
+    def _build_lookup_indexes(self, previous: List[Dict] = None):
+        """현재 문서로 약 이름 해시 인덱스, 증상 역색인 등 조회용 인덱스 구축"""
+        self.metadata_bitmaps = MetadataBitmaps(self.documents)
+
+        self.product_ids = {}
+        for doc_id, doc in enumerate(self.documents):
+            self._add_product_keys(doc, doc_id)
+        self.vectors = None
+        if settings.VECTOR_MEMMAP and self.index is not None:
+            self.vectors = load_vectors(self.data_dir, self.index.ntotal, self.index.d)
+        self.drug_index = DrugNameIndex(self.documents) if settings.NAME_INDEX else None
+        if not settings.SYMPTOM_INDEX:
+            self.symptom_index = None
+        elif previous is not None and self.symptom_index is not None:
+            updated = self._update_symptom_index(previous)
+            count_event("symptom_index_updated", updated)
+            print(f"증상 인덱스 갱신: 문서 {updated}개")
+        else:
+            self.symptom_index = SymptomIndex(self.documents)
+
+        if self.drug_index is not None:
+            print(f"약 이름 인덱스 구축: {len(self.drug_index)}개 이름")
+        if self.symptom_index is not None:
+            print(f"증상 인덱스 구축: {len(self.symptom_index)}개 용어")
+
+        self.spelling_index = None
+        if settings.SPELLING_CORRECTION:
+            # 증상/필드 키워드 등 일반 단어는 약 이름으로 바꾸지 않음
+            protected = set(FILLER_WORDS) | set(SYMPTOM_TERMS)
+            if self.symptom_index is not None:
+                protected |= set(self.symptom_index.postings)
+            self.spelling_index = SpellingIndex(self.documents, protected_words=protected)
+            print(f"오타 교정 사전 구축: {len(self.spelling_index)}개 이름")
+
+        self.interaction_graph = None
+        if settings.INTERACTION_GRAPH:
+            graph = InteractionGraph.load(self.data_dir)
+            # 문서 수가 다르면 (예전 빌드) 현재 문서로 다시 생성
+            if graph is None or graph.document_count != len(self.documents):
+                graph = InteractionGraph.from_documents(self.documents)
+            self.interaction_graph = graph
+            print(f"상호작용 그래프 로드: {len(graph)}개 노드")
+
+    def search_documents(self, query: Union[str, List[str]], top_k: int = 3, deadline: Deadline = None,
+                         filters: Dict = None) -> List[Dict]:
+        """쿼리와 유사한 문서 검색 - 벡터 검색
+
+        query가 리스트(원본 질문 + 키워드 등 하위 질문)면 한 번에 임베딩/검색 후 하위 질문별 몫을 보장해 병합
+        filters: {"company": ..., "category": ..., "ingredient": ..., "dosage_form": ...}
+        값은 문자열 또는 리스트 (속성 내 OR, 속성 간 AND), 조건에 맞는 문서만 검색
+        """
         if self.index is None:
             return []
+
+        id_mask = self.metadata_bitmaps.mask(filters) if filters else None
+        if id_mask is not None and not id_mask.any():
+            return []
+
+        queries = [query] if isinstance(query, str) else list(query)
+        query_embeddings = self._embed_queries(queries, deadline)
+        if query_embeddings is None:
+            return []
+
+        if len(queries) == 1:
+            return self._search_by_vector(query_embeddings, top_k, id_mask)
+        result_lists = self._search_by_vectors(query_embeddings, top_k, id_mask)
+        return self._merge_subquery_results(result_lists, top_k, limit=top_k)
+
+    def _embed_query(self, query: str, deadline: Deadline = None):
+        """쿼리를 L2 정규화된 벡터로 변환 (예산 부족/임베딩 장애 시 None → API 검색으로 폴백)"""
+        return self._embed_queries([query], deadline)
+
+    def _embed_queries(self, queries: List[str], deadline: Deadline = None):
+        """여러 쿼리를 한 번의 임베딩 호출로 변환 (행 = 쿼리)"""
+        # 배치 요청에서 미리 임베딩한 질문은 재사용
+        batch = current_batch()
+        if batch is not None and all(query in batch.embeddings for query in queries):
+            return np.vstack([batch.embeddings[query] for query in queries])
+
+        if not has_budget(deadline, settings.EMBEDDING_MIN_BUDGET_SECONDS):
+            deadline.degrade("vector_search")
+            return None
+
+        try:
+            with track_stage("query_embedding"):
+                query_embeddings = self.embedder.encode(queries, timeout=stage_timeout(deadline, None))
+        except Exception as e:
+            print(f"쿼리 임베딩 실패: {e}")
+            if deadline is not None:
+                deadline.degrade("vector_search")
+            return None
+
+        faiss.normalize_L2(query_embeddings)
+        return project(self.projection, query_embeddings)
+
+    def _search_by_vector(self, query_embedding, top_k: int, id_mask=None) -> List[Dict]:
+        """FAISS에서 코사인 유사도 계산 + 검색 (id_mask가 있으면 해당 문서 벡터만 점수 계산)"""
+        return self._search_by_vectors(query_embedding[:1], top_k, id_mask)[0]
+
+    def _search_by_vectors(self, query_embeddings, top_k: int, id_mask=None) -> List[List[Dict]]:
+        """쿼리 여러 개를 한 번의 FAISS 검색(nq > 1)으로 처리 → 쿼리별 결과"""
+        # 배치 요청에서 미리 검색한 쿼리 벡터는 재사용 (결과 dict는 질문별로 복사)
+        batch = current_batch()
+        if batch is not None and id_mask is None:
+            cached = [batch.searches.get((row.tobytes(), top_k)) for row in query_embeddings]
+            if all(results is not None for results in cached):
+                return [[dict(result) for result in results] for results in cached]
+
+        if id_mask is not None:
+            top_k = min(top_k, int(id_mask.sum()))
+
+        # 샤드 인덱스면 샤드별 동시 검색 후 병합
+        with track_stage("faiss_search"):
+            scores, indices = search_index(self.index, query_embeddings.astype('float32'), top_k, id_mask)
         
-        # 1. 쿼리를 벡터로 변환
-        query_embedding = self.embedder.encode([query])
-        faiss.normalize_L2(query_embedding)
-        
-        # 2. FAISS에서 코사인 유사도 계산 + 검색
-        scores, indices = self.index.search(query_embedding.astype('float32'), top_k)
+        # 유사도 점수와 함께 결과 반환
+        result_lists = []
+        for row_scores, row_indices in zip(scores, indices):
+            results = []
+            for score, idx in zip(row_scores, row_indices):
+                if idx != -1 and idx < len(self.documents):  # 유효한 인덱스
+                    results.append(self._document_result(int(idx), float(score)))
+            result_lists.append(results)
         
-        # 3. 유사도 점수와 함께 결과 반환
+        return result_lists
+
+    @staticmethod
+    def _merge_subquery_results(result_lists: List[List[Dict]], top_k: int, limit: int = None) -> List[Dict]:
+        """하위 질문별 결과 병합: 질문마다 상위 몫(top_k / 질문 수)을 먼저 보장, 나머지는 점수순
+
+        같은 문서는 가장 높은 유사도로 한 번만, 몫으로 뽑힌 문서는 subquery_quota=True
+        """
+        best: Dict[int, Dict] = {}
+        for subquery, results in enumerate(result_lists):
+            for result in results:
+                current = best.get(result["doc_id"])
+                if current is None or result["similarity_score"] > current["similarity_score"]:
+                    best[result["doc_id"]] = {**result, "subquery": subquery}
+
+        quota = max(1, top_k // len(result_lists))
+        chosen = []
+        for results in result_lists:
+            taken = 0
+            for result in results:
+                if taken == quota:
+                    break
+                if result["doc_id"] not in chosen:
+                    chosen.append(result["doc_id"])
+                    taken += 1
+
+        for doc_id in chosen:
+            best[doc_id]["subquery_quota"] = True
+        merged = sorted((best[doc_id] for doc_id in chosen), key=lambda x: x["similarity_score"], reverse=True)
+        merged += sorted((r for doc_id, r in best.items() if doc_id not in chosen),
+                         key=lambda x: x["similarity_score"], reverse=True)
+        return merged[:limit or top_k]
+
+    def _document_result(self, doc_id: int, score: float) -> Dict:
+        """문서 ID → 검색 결과 형식"""
+        return {
+            **self.documents[doc_id],  # 직접 필드 방식 - 전체 문서 그대로
+            "doc_id": doc_id,
+            "similarity_score": score,
+        }
+
+    def search_by_name(self, name_match: DrugNameMatch, top_k: int = 3) -> List[Dict]:
+        """약 이름 정확 일치 문서 (임베딩/FAISS 검색 없음)"""
+        with track_stage("name_lookup"):
+            return [
+                self._document_result(doc_id, MATCH_SCORES[name_match.doc_ids[doc_id]])
+                for doc_id in name_match.ranked_ids()[:top_k]
+            ]
+
+    def search_by_symptom(self, query: str, query_embedding=None, top_k: int = 3,
+                          exclude_ids=None) -> List[Dict]:
+        """증상 역색인 조회 (식약처 efcyQesitm API 대신 사용)"""
+        if self.symptom_index is None:
+            return []
+
+        with track_stage("symptom_lookup"):
+            hits = self.symptom_index.lookup(query, top_k=top_k + len(exclude_ids or []))
+
         results = []
-        for i, (score, idx) in enumerate(zip(scores[0], indices[0])):
-            if idx != -1 and idx < len(self.documents):  # 유효한 인덱스
-                doc = self.documents[idx]
-                results.append({
-                    **doc,  # 직접 필드 방식 - 전체 문서 그대로
-                    "similarity_score": float(score),
-                })
-        
+        for doc_id, symptom_score in hits:
+            if exclude_ids and doc_id in exclude_ids:
+                continue
+            # 증상 일치 점수를 유사도 척도로 환산, 저장된 벡터 유사도가 더 높으면 그 값 사용
+            score = settings.SYMPTOM_MATCH_SCORE * symptom_score
+            if query_embedding is not None:
+                score = max(score, float(self._stored_vectors([doc_id])[0] @ query_embedding[0]))
+            result = self._document_result(doc_id, score)
+            result["symptom_score"] = symptom_score
+            results.append(result)
+
+        return results[:top_k]
+
+    def _boost_name_matches(self, results: List[Dict], name_match: DrugNameMatch,
+                            query_embedding=None) -> List[Dict]:
+        """질문에 나온 약 이름과 일치하는 문서 가산점, 벡터 후보에 없으면 추가"""
+        boost = settings.NAME_MATCH_BOOST
+        seen = set()
+        for result in results:
+            seen.add(result["doc_id"])
+            if result["doc_id"] in name_match.doc_ids:
+                result["similarity_score"] = min(1.0, result["similarity_score"] + boost)
+
+        missing = [doc_id for doc_id in name_match.ranked_ids() if doc_id not in seen]
+        missing = missing[:settings.NAME_MATCH_CANDIDATES]
+        if not missing:
+            return results
+
+        if query_embedding is not None:
+            # 인덱스에 저장된 벡터로 실제 유사도 계산 (추가 임베딩 없음)
+            vectors = self._stored_vectors(missing)
+            scores = vectors @ query_embedding[0]
+        else:
+            # 쿼리 임베딩이 생략된 경우 이름 일치 점수 사용
+            scores = [MATCH_SCORES[name_match.doc_ids[doc_id]] - boost for doc_id in missing]
+
+        injected = sorted(zip(missing, scores), key=lambda x: x[1], reverse=True)[:3]
+        count_event("name_match_injected", len(injected))
+        for doc_id, score in injected:
+            results.append(self._document_result(doc_id, min(1.0, float(score) + boost)))
+
         return results
 
-    def search_with_api(self, query: str) -> List[Dict]:
+    def search_with_api(self, query: str, cancel_event: threading.Event = None,
+                        deadline: Deadline = None) -> List[Dict]:
         """실시간 식약처 API 검색 (새로운 약물 질문 시)"""
         try:
-            api_results = search_medical_data(query)
+            api_results = search_medical_data(query, cancel_event=cancel_event, deadline=deadline)
             
             if not api_results:
                 return []
+
+            # 취소된 투기적 검색은 유사도 계산(임베딩)을 생략
+            if cancel_event is not None and cancel_event.is_set():
+                return []
             
-            # API 결과를 RAG 형식으로 변환
-            formatted_results = []
-            for doc in api_results:
-                # content 필드 추가하지 말고 바로 유사도 계산
-                doc_text = create_embedding_content(doc)
-
-                # 실제 유사도 계산
-                similarity = self.calculate_similarity(query, doc_text)
-                
-                formatted_results.append({
-                    **doc,  # API 결과도 직접 필드 방식
-                    "similarity_score": similarity,  
-                })
-            
+            # API 결과를 RAG 형식으로 변환 (API 결과도 직접 필드 방식)
+            formatted_results = [dict(doc) for doc in api_results]
+            scores = self._score_documents(query, formatted_results, deadline)
+            for doc, similarity in zip(formatted_results, scores):
+                doc["similarity_score"] = similarity
+
             return formatted_results
             
         except Exception as e:
             print(f"실시간 API 검색 실패: {e}")
             return []
         
-    def calculate_similarity(self, query:str, document: str) -> float:
+    def calculate_similarity(self, query:str, document: str, deadline: Deadline = None) -> float:
         """쿼리과 문서 간 코사인 유사도 계산"""
+        # 시간 예산이 부족하면 임베딩 없이 최하위 점수
+        if not has_budget(deadline, settings.EMBEDDING_MIN_BUDGET_SECONDS):
+            deadline.degrade("api_rerank")
+            return 0.0
+
         try:
             # 쿼리 문서를 각각 임베딩
-            query_embedding = self.embedder.encode([query])
-            doc_embedding = self.embedder.encode([document])
+            timeout = stage_timeout(deadline, None)
+            with track_stage("query_embedding"):
+                query_embedding = self.embedder.encode([query], timeout=timeout)
+            with track_stage("doc_embedding"):
+                doc_embedding = self.embedder.encode([document], timeout=timeout)
 
             # 코사인 유사도 계산
             query_norm = query_embedding / np.linalg.norm(query_embedding)
@@ -182,21 +523,57 @@ class MedicalRAGSystem:
             print(f"유사도 계산 오류: {e}")
             return 0.0
         
-    def rank_by_similarity(self, query:str, documents: List[Dict]) -> List[Dict]:
-        """실시간 벡터 유사도로 문서 재순위화"""
+    def _score_documents(self, query: str, documents: List[Dict], deadline: Deadline = None) -> List[float]:
+        """문서별 질문 코사인 유사도 (질문은 한 번만 임베딩)
+
+        인덱스에 이미 있는 제품(제품명_제조사)은 저장 벡터를 재사용하고, 새 문서만 한 번에 임베딩
+        """
         if not documents:
             return []
-        
-        scored_documents = []
 
-        for doc in documents:
-            # content 필드 대신 동적 생성
-            doc_text = create_embedding_content(doc)
-            similarity_score = self.calculate_similarity(query, doc_text)
-            
-            doc_copy = doc.copy()
-            doc_copy["similarity_score"] = similarity_score
-            scored_documents.append(doc_copy)
+        # 시간 예산이 부족하면 임베딩 없이 최하위 점수
+        if not has_budget(deadline, settings.EMBEDDING_MIN_BUDGET_SECONDS):
+            deadline.degrade("api_rerank")
+            return [0.0] * len(documents)
+
+        doc_ids = [self.product_ids.get(product_key(doc)) if self.index is not None else None for doc in documents]
+        known_rows = [row for row, doc_id in enumerate(doc_ids) if doc_id is not None]
+        new_rows = [row for row, doc_id in enumerate(doc_ids) if doc_id is None]
+
+        try:
+            timeout = stage_timeout(deadline, None)
+            with track_stage("query_embedding"):
+                query_embedding = self.embedder.encode([query], timeout=timeout)
+            faiss.normalize_L2(query_embedding)
+            query_embedding = project(self.projection, query_embedding)
+
+            vectors = np.zeros((len(documents), query_embedding.shape[1]), dtype="float32")
+            if known_rows:
+                vectors[known_rows] = self._stored_vectors([doc_ids[row] for row in known_rows])
+                count_event("api_vector_reused", len(known_rows))
+            if new_rows:
+                contents = [create_embedding_content(documents[row]) for row in new_rows]
+                with track_stage("doc_embedding"):
+                    new_vectors = self.embedder.encode(contents, timeout=stage_timeout(deadline, None))
+                faiss.normalize_L2(new_vectors)
+                vectors[new_rows] = project(self.projection, new_vectors)
+                count_event("api_doc_embedded", len(new_rows))
+
+            return [float(score) for score in vectors @ query_embedding[0]]
+
+        except Exception as e:
+            print(f"유사도 계산 오류: {e}")
+            return [0.0] * len(documents)
+
+    def rank_by_similarity(self, query:str, documents: List[Dict], deadline: Deadline = None) -> List[Dict]:
+        """실시간 벡터 유사도로 문서 재순위화 (search_with_api가 이미 계산한 유사도는 재사용)"""
+        if not documents:
+            return []
+
+        scored_documents = [doc.copy() for doc in documents]
+        unscored = [doc for doc in scored_documents if "similarity_score" not in doc]
+        for doc, similarity in zip(unscored, self._score_documents(query, unscored, deadline)):
+            doc["similarity_score"] = similarity
         
         # 유사도 기준으로 정렬
         scored_documents.sort(key=lambda x:x["similarity_score"], reverse=True)
@@ -207,8 +584,9 @@ class MedicalRAGSystem:
 
         return scored_documents
             
-    def generate_response_with_sources(self, query: str, search_results: List[Dict]) -> Dict:
-        """검색 결과를 바탕으로 OpenAI로 응답 생성"""
+    def generate_response_with_sources(self, query: str, search_results: List[Dict],
+                                       deadline: Deadline = None) -> Dict:
+        """검색 결과를 바탕으로 OpenAI로 응답 생성 (시간 예산 부족 시 필드 요약으로 대체)"""
 
         if not search_results:
             return {
@@ -218,21 +596,23 @@ class MedicalRAGSystem:
                 "model_used": "no_results"
             }
         
+        # 사용자용 완전한 소스 정보 생성
+        sources_info = self._build_sources(search_results)
+
+        # 단일 필드 질문은 상위 문서 필드로 바로 응답
+        if settings.TEMPLATE_FASTPATH:
+            fast_response = self._try_template_fast_path(query, search_results, sources_info)
+            if fast_response:
+                return fast_response
+
+        # LLM이 끝낼 시간이 없거나 OpenAI 서킷이 열려 있으면 상위 문서 필드 요약으로 응답
+        if not has_budget(deadline, settings.LLM_MIN_BUDGET_SECONDS) or is_circuit_open("openai"):
+            if deadline is not None:
+                deadline.degrade("llm_generation")
+            return self._template_response(search_results, sources_info)
+
         # 검색된 문서들을 컨텍스트로 구성
         context = self._create_minimal_context(search_results, query)
-
-        # 사용자용 완전한 소스 정보 생성
-        sources_info = []
-        for i, result in enumerate(search_results, 1):
-            sources_info.append({
-                "rank": i,
-                "source": result.get("source", ""),
-                "drug_name": result.get("drug_name", ""),
-                "category": result.get("category", ""),
-                "company_name": result.get("company_name", ""),
-                "similarity": result.get("similarity_score", 0.0),
-                "url": result.get("url", "")  # 사용자 클릭용 URL
-            })
         
         # OpenAI 프롬프트 구성
         system_prompt = """당신은 약학 정보 제공 전문 AI야. 다음 규칙을 엄격히 준수해서 답변해줘.:
@@ -268,17 +648,24 @@ class MedicalRAGSystem:
 위 문서들을 바탕으로 정확하고 안전한 답변을 제공해줘."""
 
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                max_tokens=300,
-                temperature=0.1,  # 일관된 응답을 위해 낮은 temperature
-            )
+            with track_stage("llm_generation"):
+                response = call_with_resilience(
+                    "openai",
+                    lambda: self.client.chat.completions.create(
+                        model="gpt-4o-mini",
+                        messages=[
+                            {"role": "system", "content": system_prompt},
+                            {"role": "user", "content": user_prompt}
+                        ],
+                        max_tokens=300,
+                        temperature=0.1,  # 일관된 응답을 위해 낮은 temperature
+                        timeout=stage_timeout(deadline, settings.LLM_TIMEOUT_SECONDS),
+                    ),
+                    deadline=deadline,
+                )
             
             ai_response = response.choices[0].message.content
+            count_event("llm_answer")
             
             return {
                 "response": ai_response,
@@ -289,62 +676,424 @@ class MedicalRAGSystem:
             
         except Exception as e:
             print(f"OpenAI API 오류: {e}")
-            return {
-                "response": "죄송합니다. AI 응답 생성 중 오류가 발생했습니다. 검색된 정보를 확인해주세요.",
-                "sources": sources_info,
-                "search_results": search_results,
-                "error": str(e)
-            }
+
+            # 시간 초과/재시도 소진/서킷 열림 시 필드 요약으로 대체
+            if deadline is not None:
+                deadline.degrade("llm_generation")
+            response_data = self._template_response(search_results, sources_info)
+            response_data["error"] = str(e)
+            return response_data
         
+    def _try_template_fast_path(self, query: str, search_results: List[Dict], sources_info: List[Dict]):
+        """'타이레놀 보관법' 같은 단일 필드 질문이면 템플릿 응답, 아니면 None"""
+        field = detect_field_intent(query)
+        if not field:
+            return None
+
+        # 약 이름이 둘 이상이면 ('애드빌이랑 탁센 복용법') 한 문서로 답할 수 없음
+        if split_subqueries(query):
+            return None
+        if self.drug_index is not None and len(set(self.drug_index.match_query(query).names)) > 1:
+            return None
+
+        top = search_results[0]
+        if not top.get(field):
+            return None
+
+        # 질문에 약 이름이 직접 나오거나 유사도가 충분히 높을 때만 (엉뚱한 약의 필드를 답하지 않도록)
+        if not document_named_in_query(top, query) and top.get("similarity_score", 0.0) < settings.FASTPATH_MIN_SIMILARITY:
+            return None
+
+        count_event("template_fastpath")
+        saved = average_stage_latency("llm_generation")
+        if saved:
+            FASTPATH_SAVED.observe(saved)
+
+        return {
+            "response": render_field_answer(top, field),
+            "sources": sources_info[:1],
+            "search_results": search_results[:1],
+            "model_used": "template_fastpath"
+        }
+
+    def _try_interaction_answer(self, query: str):
+        """'A랑 B 같이 먹어도 돼?' → 상호작용 그래프로 응답, 근거가 없으면 None"""
+        with track_stage("interaction_lookup"):
+            mentions = self.interaction_graph.find_mentions(query)
+            if len(mentions) < 2:
+                return None
+            first, second = mentions[0], mentions[1]
+            findings = self.interaction_graph.check_pair(first, second)
+
+        if not findings:
+            return None
+
+        doc_ids = list(dict.fromkeys(doc_id for finding in findings for doc_id in finding.doc_ids))[:3]
+        search_results = [self._document_result(doc_id, 1.0) for doc_id in doc_ids]
+        documents = {doc_id: self.documents[doc_id] for doc_id in doc_ids}
+        count_event("interaction_graph")
+
+        return {
+            "response": render_interaction_answer(first.name, second.name, findings, documents),
+            "sources": self._build_sources(search_results),
+            "search_results": search_results,
+            "model_used": "interaction_graph"
+        }
+
+    def _build_sources(self, search_results: List[Dict]) -> List[Dict]:
+        """사용자용 출처 정보"""
+        sources_info = []
+        for i, result in enumerate(search_results, 1):
+            sources_info.append({
+                "rank": i,
+                "source": result.get("source", ""),
+                "drug_name": result.get("drug_name", ""),
+                "category": result.get("category", ""),
+                "company_name": result.get("company_name", ""),
+                "similarity": result.get("similarity_score", 0.0),
+                "url": result.get("url", "")  # 사용자 클릭용 URL
+            })
+        return sources_info
+
+    def _template_response(self, search_results: List[Dict], sources_info: List[Dict]) -> Dict:
+        """LLM 없이 상위 문서 필드 요약 응답"""
+        return {
+            "response": render_document_summary(search_results),
+            "sources": sources_info,
+            "search_results": search_results,
+            "model_used": "template_fallback"
+        }
+
     def _create_minimal_context(self, search_results: List[Dict], query: str) -> str:
         """AI용 컨텍스트 생성"""
         
         parts = []
         
         for i, result in enumerate(search_results, 1):
-            drug_name = result.get('drug_name', '')
-            
-            # 모든 주요 정보를 포함 (이미 압축되어 있음)
-            info_parts = [f"약물: {drug_name}"]
-            
-            for field in ['효과', '복용법', '주의사항', '상호작용', '부작용', '보관법']:
-                value = result.get(field, '')
-                if value:
-                    info_parts.append(f"{field}: {value}")
+            # 코퍼스 문서는 미리 만든 한 줄 사용, API 결과는 바로 생성 (모든 주요 필드, 이미 압축되어 있음)
+            doc_id = result.get('doc_id')
+            if doc_id is not None and doc_id < len(self.documents):
+                snippet = self.documents[doc_id].snippet
+            else:
+                snippet = context_snippet(result)
+
+            # 묶인 같은 성분 제품은 이름만 (설명 반복 없이)
+            related = result.get('related_products')
+            if related:
+                snippet += f" / 같은 성분 제품: {', '.join(related[:3])}"
             
-            parts.append(f"[{i}] " + " / ".join(info_parts))
+            parts.append(f"[{i}] {snippet}")
         
         return "\n".join(parts)
     
-    def process_query(self, query: str) -> Dict:
-        """전체 RAG 파이프라인 실행"""
+    def process_query(self, query: str, deadline: Deadline = None, correct_spelling: bool = True) -> Dict:
+        """전체 RAG 파이프라인 실행 (단계별 타이밍 포함)
+
+        deadline이 없으면 REQUEST_DEADLINE_SECONDS 예산으로 생성 (0이면 무제한)
+        correct_spelling=False면 이미 교정된 질문으로 보고 오타 교정 생략 (배치 처리용)
+        """
+        if deadline is None and settings.REQUEST_DEADLINE_SECONDS > 0:
+            deadline = Deadline(settings.REQUEST_DEADLINE_SECONDS)
+
+        with collect_timings() as timings:
+            with track_stage("total"):
+                # 약 이름 오타는 모든 조회/LLM 단계 전에 교정
+                query, corrections = self._correct_spelling(query) if correct_spelling else (query, {})
+                response_data = self._run_pipeline(query, deadline)
+
+        if corrections:
+            response_data["corrected_query"] = query
+        response_data["timings"] = dict(timings)
+        response_data["degraded"] = list(deadline.degraded) if deadline else []
+        return response_data
+
+    def process_batch(self, queries: List[str]) -> List[Optional[Dict]]:
+        """여러 질문을 한 번에 처리 → 입력 순서대로 결과 (처리 실패는 None)"""
+        results: List[Optional[Dict]] = [None] * len(queries)
+        for index, result in self.iter_batch(queries):
+            results[index] = result
+        return results
+
+    def iter_batch(self, queries: List[str]) -> Iterator[Tuple[int, Optional[Dict]]]:
+        """여러 질문 처리, 끝나는 순서대로 (입력 위치, 결과) 반환 (처리 실패는 None)
+
+        같은 질문은 한 번만 처리, 전체 질문은 한 번에 임베딩 + 한 번의 FAISS 검색,
+        식약처 호출은 배치 안에서 공유, LLM 호출은 BATCH_CONCURRENCY개까지 동시 실행
+        """
+        # 1. 오타 교정 후 같은 질문끼리 묶기
+        positions: Dict[str, List[int]] = {}
+        corrected_any: Dict[str, bool] = {}
+        for index, query in enumerate(queries):
+            corrected, corrections = self._correct_spelling(query)
+            positions.setdefault(corrected, []).append(index)
+            corrected_any[corrected] = corrected_any.get(corrected, False) or bool(corrections)
+        if len(positions) < len(queries):
+            count_event("batch_duplicate_query", len(queries) - len(positions))
+
+        # 2. 임베딩/FAISS 검색 선계산
+        batch = BatchContext()
+        with track_stage("batch_prefetch"):
+            self._prefetch_batch(batch, list(positions))
+
+        # 3. 질문별 파이프라인 병렬 실행
+        def run(query: str) -> Dict:
+            with batch_scope(batch):
+                return self.process_query(query, correct_spelling=False)
+
+        with ThreadPoolExecutor(max_workers=settings.BATCH_CONCURRENCY, thread_name_prefix="chat-batch") as pool:
+            futures = {
+                pool.submit(contextvars.copy_context().run, run, query): query
+                for query in positions
+            }
+            for future in as_completed(futures):
+                query = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"배치 질문 처리 실패: {e}")
+                    result = None
+
+                for index in positions[query]:
+                    item = dict(result) if result is not None else None
+                    if item is not None and corrected_any[query] and query != queries[index]:
+                        item["corrected_query"] = query
+                    yield index, item
+
+    def _prefetch_batch(self, batch: BatchContext, queries: List[str]):
+        """배치 질문(+하위 질문)을 한 번에 임베딩하고 한 번의 FAISS 검색으로 후보 미리 계산"""
+        if self.index is None:
+            return
+
+        texts = []
+        for query in queries:
+            # 약 이름만으로 된 질문은 이름 인덱스로 조회하므로 임베딩 불필요
+            name_match = self.drug_index.match_query(query) if self.drug_index is not None else None
+            if name_match and name_match.is_exact:
+                continue
+            texts.append(query)
+            if settings.MULTI_QUERY:
+                texts.extend(split_subqueries(query))
+        texts = list(dict.fromkeys(texts))
+        if not texts:
+            return
+
+        chunks = []
+        for start in range(0, len(texts), settings.BATCH_EMBEDDING_SIZE):
+            embeddings = self._embed_queries(texts[start:start + settings.BATCH_EMBEDDING_SIZE])
+            if embeddings is None:
+                return  # 임베딩 실패 시 질문별 파이프라인에서 다시 시도
+            chunks.append(embeddings)
+        embeddings = np.vstack(chunks)
+
+        _, fetch_k = self._candidate_counts()
+        result_lists = self._search_by_vectors(embeddings, fetch_k)
+        for text, vector, results in zip(texts, embeddings, result_lists):
+            batch.embeddings[text] = vector
+            batch.searches[(vector.tobytes(), fetch_k)] = results
+        count_event("batch_prefetched", len(texts))
+
+    def _candidate_counts(self) -> Tuple[int, int]:
+        """(다양화 전 후보 수, 벡터 검색 후보 수)"""
+        # 다양화를 쓰면 같은 성분 제품이 묶여도 3개를 채울 수 있도록 후보를 더 가져옴
+        pool_k = max(3, settings.DIVERSIFY_CANDIDATES) if settings.RESULT_DIVERSIFY != "off" else 3
+        fetch_k = settings.RERANK_CANDIDATES if self.reranker is not None else pool_k
+        return pool_k, fetch_k
+
+    def _correct_spelling(self, query: str):
+        """약 이름 오타 교정 → (교정된 질문, {오타: 교정})"""
+        if self.spelling_index is None:
+            return query, {}
+
+        with track_stage("spelling_correction"):
+            corrected, corrections = self.spelling_index.correct_query(query)
+
+        if corrections:
+            count_event("spelling_corrected")
+        return corrected, corrections
+
+    def _run_pipeline(self, query: str, deadline: Deadline = None) -> Dict:
+        """RAG 파이프라인 본체"""
         
+        # 0. 병용 질문은 상호작용 그래프에서 바로 응답
+        if self.interaction_graph is not None and is_interaction_question(query):
+            response_data = self._try_interaction_answer(query)
+            if response_data:
+                response_data["search_path"] = "interaction_graph"
+                return response_data
+
+        # 약 이름만으로 된 질문은 해시 인덱스로 바로 문서 조회 (임베딩/API 검색 생략)
+        name_match = self.drug_index.match_query(query) if self.drug_index is not None else None
+        exact_match = bool(name_match) and name_match.is_exact
+
+        # (선택) 벡터 검색과 동시에 API 검색을 미리 시작
+        speculation = None
+        if settings.SPECULATIVE_KFDA and not exact_match:
+            speculation = self._start_speculative_api_search(query, deadline)
+
+        pool_k, fetch_k = self._candidate_counts()
+
         # 1. 벡터 인덱스에서 문서 검색
-        vector_results = self.search_documents(query, top_k=3)
+        query_embedding = None
+        if exact_match:
+            count_event("exact_match")
+            vector_results = self.search_by_name(name_match, top_k=pool_k)
+        else:
+            # 벡터 인덱스에서 문서 검색 (약 이름이 섞인 질문은 일치 문서 가산점)
+            # 복합 질문은 원본 + 하위 질문을 한 번에 임베딩/검색 (질문별 몫 보장)
+            subqueries = [query] + (split_subqueries(query) if settings.MULTI_QUERY else [])
+            query_embeddings = self._embed_queries(subqueries, deadline) if self.index is not None else None
+            query_embedding = query_embeddings[:1] if query_embeddings is not None else None
+            if query_embeddings is None:
+                vector_results = []
+            elif len(subqueries) > 1:
+                count_event("multi_query")
+                vector_results = self._merge_subquery_results(
+                    self._search_by_vectors(query_embeddings, fetch_k), top_k=3, limit=fetch_k
+                )
+            else:
+                vector_results = self._search_by_vector(query_embedding, fetch_k)
+            if name_match:
+                count_event("name_match_boost")
+                vector_results = self._boost_name_matches(vector_results, name_match, query_embedding)
 
-        # 2. # 벡터 검색 결과가 부족하면 실시간 api 검색 
-        low_similarity = any(result['similarity_score'] < 0.5 for result in vector_results)
-        if len(vector_results) < 2 or low_similarity:
-            api_results = self.search_with_api(query)
+            # 과다 조회한 후보를 어휘 특징으로 재순위화
+            if self.reranker is not None and vector_results:
+                with track_stage("rerank"):
+                    vector_results = self.reranker.rerank(query, vector_results, top_k=pool_k)
 
+        # 2. # 벡터 검색 결과가 부족하면 실시간 api 검색 (판단은 상위 3개 기준)
+        top_results = sorted(vector_results, key=lambda x: x.get('rerank_score', x['similarity_score']), reverse=True)[:3]
+        low_similarity = any(result['similarity_score'] < 0.5 for result in top_results)
+        if exact_match:
+            search_path = "exact"
+            api_results = []
+        elif len(top_results) < 2 or low_similarity:
+            # 증상 역색인에 있으면 실시간 API 대신 사용
+            api_results = self.search_by_symptom(
+                query, query_embedding, top_k=3, exclude_ids={r["doc_id"] for r in vector_results}
+            )
             if api_results:
-                api_results = self.rank_by_similarity(query, api_results)
+                count_event("symptom_index_hit")
+                search_path = "vector+symptom"
+                if speculation:
+                    self._cancel_speculation(speculation)
+            else:
+                count_event("kfda_fallback")
+                search_path = "vector+api"
+                if speculation:
+                    api_results = self._collect_speculation(speculation, deadline)
+                else:
+                    api_results = self._api_search_and_rank(query, deadline=deadline)
         else:
+            count_event("vector_only")
+            search_path = "vector"
             api_results = []
+            if speculation:
+                self._cancel_speculation(speculation)
 
         # 3. 결과 조합 (벡터 검색 우선, api 검색 보완)
         all_results = vector_results +  api_results
-        all_results.sort(key=lambda x:x['similarity_score'], reverse=True)
+        # 재순위 점수가 있으면 그 순서 유지 (유사도 + 가산점이라 벡터 결과가 우선), 하위 질문 몫은 맨 앞
+        all_results.sort(key=lambda x: (x.get('subquery_quota', False), x.get('rerank_score', x['similarity_score'])),
+                         reverse=True)
 
-        # 4. 상위 3개만 선택
-        if len(all_results) > 3:
-            all_results = all_results[:3]
+        # 4. 같은 성분 제품을 묶은 뒤 상위 3개만 선택
+        all_results = self._diversify_results(query, all_results, top_k=3)
+        # 준중복으로 묶인 제품 이름을 물었으면 대표 문서가 아닌 그 제품 내용으로 답변
+        all_results = [resolve_member(result, query) for result in all_results]
 
         # 5. OpenAI로 응답 생성
-        response_data = self.generate_response_with_sources(query, all_results)
+        response_data = self.generate_response_with_sources(query, all_results, deadline)
+        response_data["search_path"] = search_path
 
         return response_data
     
+    def _diversify_results(self, query: str, results: List[Dict], top_k: int = 3) -> List[Dict]:
+        """상위 top_k 선택 전 결과 다양화 (같은 성분 제품은 대표 문서의 related_products로)"""
+        mode = settings.RESULT_DIVERSIFY
+        if mode == "off" or len(results) <= 1:
+            return results[:top_k]
+
+        with track_stage("diversify"):
+            if mode == "mmr":
+                selected = mmr_select(results, self._result_vectors(results), top_k, settings.MMR_LAMBDA,
+                                      score_key='rerank_score' if 'rerank_score' in results[0] else 'similarity_score')
+            else:
+                selected = collapse_by_ingredient(results, top_k)
+            collapsed = attach_related_products(selected, results)
+
+        # 다양화 전 상위 top_k 대비 줄어든 컨텍스트 토큰 수 (같은 성분 설명 반복 제거분)
+        naive = results[:top_k]
+        if collapsed and [id(r) for r in naive] != [id(r) for r in selected]:
+            count_event("results_collapsed", collapsed)
+            saved = (estimate_tokens(self._create_minimal_context(naive, query))
+                     - estimate_tokens(self._create_minimal_context(selected, query)))
+            if saved > 0:
+                CONTEXT_TOKENS_SAVED.inc(saved)
+
+        return selected
+
+    def _result_vectors(self, results: List[Dict]):
+        """결과별 저장 벡터 (doc_id 없는 API 결과는 0 벡터), 인덱스가 없으면 None"""
+        if self.index is None:
+            return None
+        vectors = np.zeros((len(results), self.index.d), dtype="float32")
+        rows = [row for row, result in enumerate(results) if result.get("doc_id") is not None]
+        if rows:
+            vectors[rows] = self._stored_vectors([int(results[row]["doc_id"]) for row in rows])
+        return vectors
+
+    def _stored_vectors(self, doc_ids: List[int]) -> np.ndarray:
+        """문서 ID → 정규화된 저장 벡터 (memmap 우선, 없으면 인덱스에서 복원)"""
+        if self.vectors is not None and all(doc_id < len(self.vectors) for doc_id in doc_ids):
+            return np.asarray(self.vectors[doc_ids], dtype="float32")
+        return np.vstack([self.index.reconstruct(int(doc_id)) for doc_id in doc_ids])
+
+    def _api_search_and_rank(self, query: str, cancel_event: threading.Event = None,
+                             deadline: Deadline = None) -> List[Dict]:
+        """식약처 API 검색 후 유사도 재순위화"""
+        api_results = self.search_with_api(query, cancel_event=cancel_event, deadline=deadline)
+
+        if api_results:
+            api_results = self.rank_by_similarity(query, api_results, deadline)
+
+        return api_results
+
+    def _start_speculative_api_search(self, query: str, deadline: Deadline = None):
+        """벡터 검색과 병렬로 API 검색 시작 → (future, cancel_event)"""
+        cancel_event = threading.Event()
+        context = contextvars.copy_context()  # 단계별 타이밍이 현재 요청에 기록되도록
+        future = self.speculation_pool.submit(
+            context.run, self._api_search_and_rank, query, cancel_event, deadline
+        )
+        count_event("speculation_started")
+        return future, cancel_event
+
+    def _collect_speculation(self, speculation, deadline: Deadline = None) -> List[Dict]:
+        """벡터 결과가 부족할 때 투기적 검색 결과 사용"""
+        future, cancel_event = speculation
+        count_event("speculation_used")
+        try:
+            with track_stage("speculation_wait"):
+                return future.result(timeout=stage_timeout(deadline, None))
+        except FutureTimeoutError:
+            # 예산 안에 끝나지 않으면 벡터 결과만 사용
+            cancel_event.set()
+            deadline.degrade("kfda_search")
+            return []
+        except Exception as e:
+            print(f"투기적 API 검색 실패: {e}")
+            return []
+
+    def _cancel_speculation(self, speculation):
+        """벡터 결과가 충분하면 투기적 검색 취소 (낭비로 집계)"""
+        future, cancel_event = speculation
+        cancel_event.set()
+        if future.cancel():
+            # 아직 시작 전이면 API 호출 없이 취소됨
+            count_event("speculation_cancelled_before_start")
+        count_event("speculation_wasted")
+
 # 전역 RAG 시스템 인스턴스
 rag_system = None
 
@@ -0,0 +1,90 @@
+import numpy as np
+from typing import Dict, List, Sequence
+from common_parser import extract_brand_name, extract_ingredient_names, normalize_drug_name
+from answer_templates import detect_field_intent
+from drug_index import PARTICLES, FILLER_WORDS, query_tokens
+
+# FAISS 후보(top 50 등)를 어휘 특징으로 재점수화하는 단계
+# 특징 행렬(후보 x 특징)과 가중치 벡터의 내적으로 한 번에 점수 계산
+
+FEATURE_NAMES = [
+    "similarity",       # FAISS 코사인 유사도
+    "name_overlap",     # 질문 단어가 제품명에 포함된 비율
+    "effect_overlap",   # 질문 단어가 효과 필드에 포함된 비율
+    "field_overlap",    # 질문 단어가 나머지 필드에 포함된 비율 (필드 평균)
+    "exact_name",       # 브랜드명/성분명이 질문에 그대로 등장
+    "field_present",    # 질문이 묻는 필드(보관법 등)가 문서에 있음
+]
+DEFAULT_WEIGHTS = [1.0, 0.25, 0.2, 0.1, 0.3, 0.05]
+
+OTHER_FIELDS = ['복용법', '주의사항', '상호작용', '부작용', '보관법']
+
+
+def _query_terms(query: str) -> List[str]:
+    """조사/필드 키워드를 뗀 질문 단어"""
+    terms = []
+    for token in query_tokens(query):
+        for particle in PARTICLES:
+            if token.endswith(particle) and len(token) - len(particle) >= 2:
+                token = token[:-len(particle)]
+                break
+        if len(token) >= 2 and token not in FILLER_WORDS:
+            terms.append(token)
+    return list(dict.fromkeys(terms))
+
+
+def _overlap(terms: List[str], text: str) -> float:
+    if not terms or not text:
+        return 0.0
+    text = text.lower()
+    return sum(1 for term in terms if term in text) / len(terms)
+
+
+class LexicalReranker:
+    """과다 조회한 벡터 후보를 어휘 특징 가중합으로 재순위화"""
+
+    def __init__(self, weights: Sequence[float] = None):
+        self.weights = np.asarray(weights or DEFAULT_WEIGHTS, dtype="float32")
+        if len(self.weights) != len(FEATURE_NAMES):
+            raise ValueError(f"❌ 재순위 가중치는 {len(FEATURE_NAMES)}개여야 합니다: {', '.join(FEATURE_NAMES)}")
+
+    def features(self, query: str, candidates: List[Dict]) -> np.ndarray:
+        """후보별 특징 행렬 (후보 수 x 특징 수)"""
+        terms = _query_terms(query)
+        compact_query = normalize_drug_name(query)
+        field = detect_field_intent(query)
+
+        matrix = np.zeros((len(candidates), len(FEATURE_NAMES)), dtype="float32")
+        for row, doc in enumerate(candidates):
+            product_name = doc.get('product_name', '')
+            names = [extract_brand_name(product_name), *extract_ingredient_names(product_name)]
+
+            matrix[row, 0] = doc.get('similarity_score', 0.0)
+            matrix[row, 1] = _overlap(terms, product_name)
+            matrix[row, 2] = _overlap(terms, doc.get('효과', ''))
+            matrix[row, 3] = sum(_overlap(terms, doc.get(f, '')) for f in OTHER_FIELDS) / len(OTHER_FIELDS)
+            matrix[row, 4] = float(any(len(n) >= 2 and normalize_drug_name(n) in compact_query for n in names))
+            matrix[row, 5] = float(bool(field and doc.get(field)))
+        return matrix
+
+    def rerank(self, query: str, candidates: List[Dict], top_k: int = 3) -> List[Dict]:
+        """가중합 점수(rerank_score) 내림차순 상위 top_k"""
+        if not candidates:
+            return []
+
+        scores = self.features(query, candidates) @ self.weights
+        order = np.argsort(-scores, kind="stable")[:top_k]
+
+        results = []
+        for i in order:
+            doc = candidates[i]
+            doc["rerank_score"] = float(scores[i])
+            results.append(doc)
+        return results
+
+
+def parse_weights(text: str) -> List[float]:
+    """'1.0,0.25,...' 형식 가중치 (빈 값이면 기본값)"""
+    if not text:
+        return list(DEFAULT_WEIGHTS)
+    return [float(w) for w in text.split(",")]
@@ -0,0 +1,207 @@
+import time
+import random
+import threading
+import requests
+import openai
+from typing import Callable, Dict, Optional
+from metrics import registry, count_event
+from deadline import Deadline
+
+# 업스트림(Upstage, OpenAI, 식약처) 공용 재시도 + 서킷 브레이커
+
+
+class CircuitOpenError(Exception):
+    """서킷이 열려 있어 호출을 즉시 거부"""
+
+    def __init__(self, provider: str, retry_after: float):
+        super().__init__(f"{provider} 서킷 열림 ({retry_after:.1f}초 후 재시도)")
+        self.provider = provider
+        self.retry_after = retry_after
+
+
+BREAKER_STATE = registry.gauge(
+    "medimate_circuit_state",
+    "업스트림별 서킷 상태 (0: closed, 1: half_open, 2: open)",
+    ["provider"],
+)
+BREAKER_TRANSITIONS = registry.counter(
+    "medimate_circuit_transitions_total",
+    "서킷 상태 전이 횟수",
+    ["provider", "state"],
+)
+UPSTREAM_CALLS = registry.counter(
+    "medimate_upstream_calls_total",
+    "업스트림 호출 결과 (success, failure, retry, rejected)",
+    ["provider", "outcome"],
+)
+
+_STATE_VALUES = {"closed": 0, "half_open": 1, "open": 2}
+
+
+def is_transient_error(error: Exception) -> bool:
+    """재시도할 만한 일시적 오류인지 (연결 실패, 타임아웃, 429, 5xx)"""
+    if isinstance(error, (requests.ConnectionError, requests.Timeout)):
+        return True
+    if isinstance(error, requests.HTTPError):
+        status = error.response.status_code if error.response is not None else 0
+        return status == 429 or status >= 500
+    if isinstance(error, (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)):
+        return True
+    return False
+
+
+class RetryPolicy:
+    """지수 백오프 + full jitter 재시도 정책"""
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.2, max_delay: float = 2.0,
+                 retryable: Callable[[Exception], bool] = is_transient_error):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retryable = retryable
+
+    def backoff(self, attempt: int) -> float:
+        """attempt번째 실패 후 대기 시간 (0 ~ min(max, base * 2^attempt))"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+
+class CircuitBreaker:
+    """연속 실패 시 열리고, 쿨다운 후 한 번 시험 호출(half-open)하는 서킷 브레이커"""
+
+    def __init__(self, provider: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.provider = provider
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        BREAKER_STATE.set(0, provider=provider)
+
+    def _transition(self, state: str):
+        if self.state == state:
+            return
+        self.state = state
+        BREAKER_STATE.set(_STATE_VALUES[state], provider=self.provider)
+        BREAKER_TRANSITIONS.inc(provider=self.provider, state=state)
+        if state == "open":
+            print(f"⚡ {self.provider} 서킷 열림 - {self.reset_timeout:.0f}초간 즉시 실패 처리")
+
+    def before_call(self):
+        """호출 허용 여부 확인 (열려 있으면 CircuitOpenError)"""
+        with self._lock:
+            if self.state == "open":
+                elapsed = time.monotonic() - self.opened_at
+                if elapsed < self.reset_timeout:
+                    raise CircuitOpenError(self.provider, self.reset_timeout - elapsed)
+                self._transition("half_open")
+
+            if self.state == "half_open":
+                # 시험 호출은 하나만 허용
+                if self._trial_in_flight:
+                    raise CircuitOpenError(self.provider, 0.0)
+                self._trial_in_flight = True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self._trial_in_flight = False
+            self._transition("closed")
+
+    def record_failure(self):
+        with self._lock:
+            self._trial_in_flight = False
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                self._transition("open")
+
+    def is_open(self) -> bool:
+        with self._lock:
+            return self.state == "open" and time.monotonic() - self.opened_at < self.reset_timeout
+
+
+class ResilientCaller:
+    """공급자별 재시도 정책 + 서킷 브레이커 묶음"""
+
+    def __init__(self, provider: str, policy: RetryPolicy, breaker: CircuitBreaker):
+        self.provider = provider
+        self.policy = policy
+        self.breaker = breaker
+
+    def call(self, func: Callable, *args, deadline: Optional[Deadline] = None, **kwargs):
+        """func 실행 (실패 시 백오프 재시도, 서킷 열림이면 즉시 실패)"""
+        last_error = None
+
+        for attempt in range(self.policy.max_attempts):
+            try:
+                self.breaker.before_call()
+            except CircuitOpenError:
+                UPSTREAM_CALLS.inc(provider=self.provider, outcome="rejected")
+                count_event(f"circuit_rejected_{self.provider}")
+                raise
+
+            try:
+                result = func(*args, **kwargs)
+            except Exception as e:
+                if not self.policy.retryable(e):
+                    # 4xx 등은 업스트림이 응답한 것이므로 서킷에 반영하지 않음
+                    self.breaker.record_success()
+                    UPSTREAM_CALLS.inc(provider=self.provider, outcome="client_error")
+                    raise
+
+                last_error = e
+                self.breaker.record_failure()
+                UPSTREAM_CALLS.inc(provider=self.provider, outcome="failure")
+
+                delay = self.policy.backoff(attempt)
+                is_last = attempt == self.policy.max_attempts - 1
+                # 남은 시간 예산으로 재시도가 불가능하면 중단
+                if is_last or (deadline is not None and not deadline.allows(delay + 0.5)):
+                    break
+                UPSTREAM_CALLS.inc(provider=self.provider, outcome="retry")
+                time.sleep(delay)
+                continue
+
+            self.breaker.record_success()
+            UPSTREAM_CALLS.inc(provider=self.provider, outcome="success")
+            return result
+
+        raise last_error
+
+
+_callers: Dict[str, ResilientCaller] = {}
+_callers_lock = threading.Lock()
+
+
+def get_caller(provider: str) -> ResilientCaller:
+    """공급자별 ResilientCaller 싱글톤 (설정은 config.settings)"""
+    with _callers_lock:
+        caller = _callers.get(provider)
+        if caller is None:
+            from config import settings
+
+            policy = RetryPolicy(
+                max_attempts=settings.RETRY_MAX_ATTEMPTS,
+                base_delay=settings.RETRY_BASE_DELAY_SECONDS,
+                max_delay=settings.RETRY_MAX_DELAY_SECONDS,
+            )
+            breaker = CircuitBreaker(
+                provider,
+                failure_threshold=settings.CIRCUIT_FAILURE_THRESHOLD,
+                reset_timeout=settings.CIRCUIT_RESET_SECONDS,
+            )
+            caller = ResilientCaller(provider, policy, breaker)
+            _callers[provider] = caller
+        return caller
+
+
+def call_with_resilience(provider: str, func: Callable, *args, deadline: Optional[Deadline] = None, **kwargs):
+    """공급자 이름으로 재시도/서킷 브레이커 적용 호출"""
+    return get_caller(provider).call(func, *args, deadline=deadline, **kwargs)
+
+
+def is_circuit_open(provider: str) -> bool:
+    """호출 전에 서킷 열림 여부 확인 (폴백 경로 선택용)"""
+    return get_caller(provider).breaker.is_open()
@@ -0,0 +1,194 @@
+import os
+import json
+import faiss
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Tuple
+from ondisk_index import ivfdata_files, is_ondisk, write_ondisk_index, remove_ivfdata, read_ondisk_index
+
+# 샤드 인덱스: 문서 ID 구간별로 나눈 FAISS 인덱스 여러 개를 스레드 풀에서 동시에 검색 후 top-k 병합
+# 샤드 파일은 medical_docs.index.0, .1, ... + 구간 정보 medical_docs.index.shards.json
+# (각 샤드가 독립 파일이고 구간이 manifest에 있으므로 나중에 샤드별 워커 프로세스로 나눌 수 있음)
+
+SHARD_BY_OPTIONS = ("range", "category")
+
+
+class ShardedIndex:
+    """ID 구간 순서로 이어 붙인 샤드 (rag_system/data_builder가 쓰는 faiss.Index 메서드만 제공)"""
+
+    def __init__(self, shards: List[faiss.Index], categories: List[List[str]] = None, workers: int = 0):
+        self.shards = shards
+        self.categories = categories or [[] for _ in shards]
+        self.workers = workers or len(shards)
+        self._pool = None
+
+    @property
+    def d(self) -> int:
+        return self.shards[0].d
+
+    @property
+    def ntotal(self) -> int:
+        return sum(shard.ntotal for shard in self.shards)
+
+    def _starts(self) -> List[int]:
+        starts, total = [], 0
+        for shard in self.shards:
+            starts.append(total)
+            total += shard.ntotal
+        return starts
+
+    def _locate(self, doc_id: int) -> Tuple[int, int]:
+        """전역 문서 ID → (샤드 번호, 샤드 안 ID)"""
+        starts = self._starts()
+        shard_no = int(np.searchsorted(starts, doc_id, side='right')) - 1
+        return shard_no, doc_id - starts[shard_no]
+
+    def add(self, vectors: np.ndarray):
+        # 서버에서 추가되는 문서는 마지막 샤드 뒤에 (ID 구간 유지)
+        self.shards[-1].add(vectors)
+
+    def reconstruct(self, doc_id: int) -> np.ndarray:
+        shard_no, local_id = self._locate(int(doc_id))
+        return self.shards[shard_no].reconstruct(local_id)
+
+    def reconstruct_batch(self, doc_ids) -> np.ndarray:
+        return np.vstack([self.reconstruct(int(doc_id)) for doc_id in doc_ids])
+
+    def reconstruct_n(self, start: int, count: int) -> np.ndarray:
+        vectors = np.vstack([shard.reconstruct_n(0, shard.ntotal) for shard in self.shards if shard.ntotal])
+        return vectors[start:start + count]
+
+    def search(self, queries: np.ndarray, k: int, id_mask: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray]:
+        """모든 샤드를 동시에 검색하고 점수 순으로 top-k 병합 (id_mask는 전역 문서 ID 기준)"""
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="faiss-shard")
+
+        jobs = []
+        for shard, start in zip(self.shards, self._starts()):
+            shard_mask = id_mask[start:start + shard.ntotal] if id_mask is not None else None
+            if shard.ntotal == 0 or (shard_mask is not None and not shard_mask.any()):
+                continue
+            jobs.append((start, self._pool.submit(search_index, shard, queries, k, shard_mask)))
+
+        if not jobs:
+            return np.full((len(queries), k), -np.inf, dtype='float32'), np.full((len(queries), k), -1, dtype='int64')
+
+        scores, labels = [], []
+        for start, job in jobs:
+            shard_scores, shard_labels = job.result()
+            scores.append(shard_scores)
+            labels.append(np.where(shard_labels >= 0, shard_labels + start, -1))
+        scores, labels = np.hstack(scores), np.hstack(labels)
+
+        order = np.argsort(-scores, axis=1, kind='stable')[:, :k]
+        return np.take_along_axis(scores, order, axis=1), np.take_along_axis(labels, order, axis=1)
+
+
+def search_index(index, queries: np.ndarray, k: int, id_mask: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray]:
+    """단일/샤드 인덱스 공통 검색 (id_mask가 있으면 해당 문서 벡터만 점수 계산)"""
+    if isinstance(index, ShardedIndex):
+        return index.search(queries, k, id_mask)
+    if id_mask is None:
+        return index.search(queries, k)
+
+    # packed 비트맵은 검색이 끝날 때까지 참조 유지
+    packed = np.packbits(id_mask, bitorder='little')
+    selector = faiss.IDSelectorBitmap(len(id_mask), faiss.swig_ptr(packed))
+    if isinstance(index, faiss.IndexIVF):
+        # IVF는 IVF 전용 파라미터만 받음 (nprobe 유지)
+        return index.search(queries, k, params=faiss.SearchParametersIVF(sel=selector, nprobe=index.nprobe))
+    return index.search(queries, k, params=faiss.SearchParameters(sel=selector))
+
+
+def split_into_shards(vectors: np.ndarray, documents: List[Dict], shard_count: int,
+                      by: str = "range") -> Tuple[ShardedIndex, List[Dict]]:
+    """벡터를 shard_count개 샤드로 분할 (문서 ID = 샤드 시작 + 샤드 안 ID)
+
+    range: 문서 순서대로 같은 크기 구간
+    category: 문서를 카테고리순으로 재정렬하고 카테고리 경계에서만 자름 (반환 문서 순서가 바뀜)
+    """
+    if by not in SHARD_BY_OPTIONS:
+        raise ValueError(f"❌ 지원하지 않는 샤드 기준: {by} (사용 가능: {', '.join(SHARD_BY_OPTIONS)})")
+
+    total = len(documents)
+    target = max(1, -(-total // shard_count))
+    if by == "category":
+        order = sorted(range(total), key=lambda i: documents[i].get('category', ''))
+        documents = [documents[i] for i in order]
+        vectors = vectors[order]
+        bounds = [0]
+        for end in range(1, total + 1):
+            category_ends = end == total or documents[end].get('category', '') != documents[end - 1].get('category', '')
+            if category_ends and end - bounds[-1] >= target and len(bounds) < shard_count:
+                bounds.append(end)
+        if bounds[-1] != total:
+            bounds.append(total)
+    else:
+        bounds = list(range(0, total, target)) + [total]
+
+    shards, categories = [], []
+    for start, end in zip(bounds, bounds[1:]):
+        shard = faiss.IndexFlatIP(vectors.shape[1])
+        shard.add(np.ascontiguousarray(vectors[start:end], dtype='float32'))
+        shards.append(shard)
+        categories.append(sorted({doc.get('category', '') for doc in documents[start:end]}) if by == "category" else [])
+
+    return ShardedIndex(shards, categories), documents
+
+
+def _manifest_path(index_path: str) -> str:
+    return f"{index_path}.shards.json"
+
+
+def _remove_shard_files(index_path: str):
+    manifest_path = _manifest_path(index_path)
+    if not os.path.exists(manifest_path):
+        return
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    for entry in manifest['shards']:
+        path = os.path.join(os.path.dirname(index_path), entry['file'])
+        if os.path.exists(path):
+            os.remove(path)
+    os.remove(manifest_path)
+
+
+def index_exists(index_path: str) -> bool:
+    return os.path.exists(index_path) or os.path.exists(_manifest_path(index_path))
+
+
+def write_index(index, index_path: str):
+    """단일 인덱스는 index_path, 샤드 인덱스는 샤드 파일 + manifest,
+    온디스크 IVF는 헤더만 (다른 형식의 이전 파일은 삭제)"""
+    _remove_shard_files(index_path)
+    if is_ondisk(index):
+        write_ondisk_index(index, index_path)
+        return
+    remove_ivfdata(index_path)
+    if not isinstance(index, ShardedIndex):
+        faiss.write_index(index, index_path)
+        return
+
+    if os.path.exists(index_path):
+        os.remove(index_path)
+    entries = []
+    for shard_no, (shard, start, categories) in enumerate(zip(index.shards, index._starts(), index.categories)):
+        file_name = f"{os.path.basename(index_path)}.{shard_no}"
+        faiss.write_index(shard, os.path.join(os.path.dirname(index_path), file_name))
+        entries.append({"file": file_name, "start": start, "count": shard.ntotal, "categories": categories})
+    with open(_manifest_path(index_path), 'w', encoding='utf-8') as f:
+        json.dump({"shards": entries}, f, ensure_ascii=False, indent=2)
+
+
+def read_index(index_path: str, workers: int = 0, nprobe: int = 16):
+    """manifest가 있으면 샤드 인덱스, .ivfdata가 있으면 온디스크 IVF(읽기 전용 mmap), 없으면 단일 인덱스"""
+    manifest_path = _manifest_path(index_path)
+    if not os.path.exists(manifest_path):
+        if ivfdata_files(index_path):
+            return read_ondisk_index(index_path, nprobe)
+        return faiss.read_index(index_path)
+
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    shards = [faiss.read_index(os.path.join(os.path.dirname(index_path), entry['file'])) for entry in manifest['shards']]
+    return ShardedIndex(shards, [entry.get('categories', []) for entry in manifest['shards']], workers)
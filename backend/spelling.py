@@ -0,0 +1,165 @@
+import re
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from common_parser import extract_brand_name, extract_ingredient_names, normalize_drug_name
+from drug_index import PARTICLES, query_token_spans
+
+# 한글 자모 분해 + symmetric delete 방식 약 이름 오타 교정
+# '타이레놈' → '타이레놀' 같은 오타를 키워드 추출(LLM) 전에 로컬에서 교정
+
+CHOSEONG = 'ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ'
+JUNGSEONG = 'ㅏㅐㅑㅒㅓㅔㅕㅖㅗㅘㅙㅚㅛㅜㅝㅞㅟㅠㅡㅢㅣ'
+JONGSEONG = ' ㄱㄲㄳㄴㄵㄶㄷㄹㄺㄻㄼㄽㄾㄿㅀㅁㅂㅄㅅㅆㅇㅈㅊㅋㅌㅍㅎ'
+
+
+def decompose_jamo(text: str) -> str:
+    """한글 음절을 초성/중성/종성 자모로 분해 ('놀' → 'ㄴㅗㄹ')"""
+    chars = []
+    for ch in text:
+        code = ord(ch) - 0xAC00
+        if 0 <= code < 11172:
+            chars.append(CHOSEONG[code // 588])
+            chars.append(JUNGSEONG[(code % 588) // 28])
+            if code % 28:
+                chars.append(JONGSEONG[code % 28])
+        else:
+            chars.append(ch)
+    return ''.join(chars)
+
+
+def _deletes(word: str, max_distance: int) -> Set[str]:
+    """word에서 최대 max_distance개 문자를 지운 변형 전체"""
+    results = set()
+    frontier = {word}
+    for _ in range(max_distance):
+        next_frontier = set()
+        for item in frontier:
+            for i in range(len(item)):
+                next_frontier.add(item[:i] + item[i + 1:])
+        results |= next_frontier
+        frontier = next_frontier
+    return results
+
+
+def damerau_levenshtein(a: str, b: str, max_distance: int) -> int:
+    """인접 전치를 포함한 편집 거리 (max_distance 초과 시 max_distance + 1)"""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = current[0]
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous_previous is not None and i > 1 and j > 1
+                    and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+            row_min = min(row_min, current[j])
+        if row_min > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+
+    return previous[-1] if previous[-1] <= max_distance else max_distance + 1
+
+
+class SpellingIndex:
+    """제품명/브랜드명/성분명 자모 사전 (symmetric delete)"""
+
+    def __init__(self, documents: List[Dict] = None, max_distance: int = 2, prefix_length: int = 9,
+                 protected_words: Iterable[str] = ()):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length  # 자모 기준, 삭제 변형은 앞부분만 생성
+        self.words: Dict[str, str] = {}     # 자모 → 원래 이름
+        self.frequency: Dict[str, int] = {}  # 이름 → 등장 문서 수
+        self.deletes: Dict[str, Set[str]] = {}
+        # 교정하지 않을 일반 단어 (증상, 필드 키워드 등)
+        self.protected: Set[str] = {normalize_drug_name(word) for word in protected_words}
+        if documents:
+            self.add_documents(documents)
+
+    def __len__(self):
+        return len(self.words)
+
+    def _max_distance_for(self, jamo: str) -> int:
+        # 짧은 이름은 1글자(자모)만 허용해야 엉뚱한 약으로 바뀌지 않음
+        return 1 if len(jamo) <= 8 else self.max_distance
+
+    def add_word(self, word: str):
+        word = normalize_drug_name(word)
+        if len(word) < 2:
+            return
+        self.frequency[word] = self.frequency.get(word, 0) + 1
+        jamo = decompose_jamo(word)
+        if jamo in self.words:
+            return
+        self.words[jamo] = word
+
+        prefix = jamo[:self.prefix_length]
+        for variant in _deletes(prefix, self.max_distance) | {prefix}:
+            self.deletes.setdefault(variant, set()).add(jamo)
+
+    def add_documents(self, documents: List[Dict]):
+        for doc in documents:
+            product_names = [doc.get('product_name', '')]
+            product_names += [member.get('product_name', '') for member in doc.get('member_products', [])]
+            for product_name in product_names:
+                base_name = re.split(r'[\d(\s]', product_name, maxsplit=1)[0]
+                names = {extract_brand_name(product_name), base_name, *extract_ingredient_names(product_name)}
+                for name in names:
+                    self.add_word(name)
+
+    def is_known(self, word: str) -> bool:
+        return decompose_jamo(normalize_drug_name(word)) in self.words
+
+    def lookup(self, word: str) -> Optional[Tuple[str, int]]:
+        """가장 가까운 사전 이름 → (이름, 거리), 없으면 None"""
+        word = normalize_drug_name(word)
+        jamo = decompose_jamo(word)
+        if jamo in self.words:
+            return self.words[jamo], 0
+
+        max_distance = self._max_distance_for(jamo)
+        prefix = jamo[:self.prefix_length]
+        candidates = set()
+        for variant in _deletes(prefix, max_distance) | {prefix}:
+            candidates |= self.deletes.get(variant, set())
+
+        best = None
+        for candidate in candidates:
+            distance = damerau_levenshtein(jamo, candidate, max_distance)
+            if distance > max_distance:
+                continue
+            name = self.words[candidate]
+            # 거리 → 등장 빈도 → 이름 순
+            key = (distance, -self.frequency[name], name)
+            if best is None or key < best[0]:
+                best = (key, name, distance)
+
+        return (best[1], best[2]) if best else None
+
+    def correct_query(self, query: str) -> Tuple[str, Dict[str, str]]:
+        """질문 속 약 이름 오타 교정 → (교정된 질문, {오타: 교정})"""
+        corrections = {}
+        replacements = []  # (시작, 끝, 교정) - 토큰 위치만 교체 (긴 단어 속 같은 글자는 그대로)
+        for token, start, _ in query_token_spans(query):
+            if len(token) < 3 or token in self.protected:
+                continue
+
+            # 조사를 뗀 어간으로 교정 ('타이레놈이랑' → '타이레놈')
+            stems = [token] + [token[:-len(p)] for p in PARTICLES if token.endswith(p) and len(token) - len(p) >= 3]
+            if any(self.is_known(stem) or stem in self.protected for stem in stems):
+                continue
+
+            for stem in stems:
+                found = self.lookup(stem)
+                if found and found[1] > 0:
+                    corrections[stem] = found[0]
+                    replacements.append((start, start + len(stem), found[0]))
+                    break
+
+        corrected = query
+        for start, end, right in reversed(replacements):
+            corrected = corrected[:start] + right + corrected[end:]
+        return corrected, corrections
@@ -0,0 +1,128 @@
+import bisect
+import math
+import re
+from typing import Dict, List, Tuple
+from common_parser import extract_effect_terms
+
+# 증상/질환 용어 → 문서 ID 역색인 (효과 필드 기반)
+# 벡터 검색 결과가 부족할 때 식약처 efcyQesitm API 대신 먼저 조회
+
+# 패턴(~통, ~염 등)으로 잡히지 않는 짧은 증상 용어
+SYMPTOM_TERMS = [
+    '두통', '치통', '복통', '요통', '생리통', '신경통', '발열', '해열', '감기', '기침', '가래', '콧물',
+    '코막힘', '재채기', '오한', '인후통', '몸살', '소화불량', '속쓰림', '위산과다', '체함', '변비',
+    '설사', '구토', '멀미', '가려움', '두드러기', '습진', '무좀', '여드름', '화상', '상처', '벌레물림',
+    '불면', '피로', '빈혈', '알레르기', '비염', '결막염', '구내염', '잇몸', '근육통', '관절통', '타박상',
+]
+
+# 일상 표현 → 색인 용어
+SYMPTOM_SYNONYMS = {
+    '머리아프': '두통', '머리가아프': '두통', '편두통': '두통',
+    '열나': '발열', '열이나': '발열', '열이': '발열',
+    '배아프': '복통', '배가아프': '복통',
+    '이가아프': '치통', '이아프': '치통',
+    '목아프': '인후통', '목이아프': '인후통', '목감기': '감기',
+    '체했': '체함', '소화가안': '소화불량', '소화안': '소화불량', '더부룩': '소화불량',
+    '코감기': '콧물', '가렵': '가려움', '잠이안': '불면', '잠을못': '불면',
+    '허리아프': '요통', '허리가아프': '요통', '생리': '생리통',
+}
+
+# 같은 증상의 다른 표기 (색인 시 함께 등록)
+TERM_ALIASES = {'월경통': '생리통', '생리통': '월경통', '해열': '발열', '객담': '가래'}
+
+_TERM_SPLIT = re.compile(r'[,·/;]\s*')
+
+
+def document_terms(document: Dict) -> List[str]:
+    """문서 효과 필드의 증상 용어 (앞에 나올수록 주 효능)"""
+    effect = document.get('효과', '')
+    if not effect:
+        return []
+
+    terms = extract_effect_terms(effect)
+    terms.extend(part.strip() for part in _TERM_SPLIT.split(effect) if 2 <= len(part.strip()) <= 10)
+    terms.extend(term for term in SYMPTOM_TERMS if term in effect)
+    terms.extend(TERM_ALIASES[term] for term in list(terms) if term in TERM_ALIASES)
+    return list(dict.fromkeys(terms))
+
+
+class SymptomIndex:
+    """증상 용어별 문서 ID 포스팅 (가중치 내림차순 유지, 문서 단위 추가/삭제)"""
+
+    def __init__(self, documents: List[Dict] = None):
+        self.postings: Dict[str, List[Tuple[float, int]]] = {}  # 용어 -> [(-가중치, 문서 ID)]
+        self.doc_terms: Dict[int, List[Tuple[str, float]]] = {}  # 삭제용 역참조
+        self.max_term_length = max(len(t) for t in list(SYMPTOM_TERMS) + list(SYMPTOM_SYNONYMS))
+        if documents:
+            self.add_documents(documents)
+
+    def __len__(self):
+        return len(self.postings)
+
+    def add_documents(self, documents: List[Dict], start_id: int = 0):
+        """문서 추가 (문서 ID는 FAISS 인덱스 순서와 동일)"""
+        for offset, document in enumerate(documents):
+            doc_id = start_id + offset
+            if doc_id in self.doc_terms:
+                self.remove_documents([doc_id])
+
+            entries = []
+            for position, term in enumerate(document_terms(document)):
+                # 효과 첫머리 용어일수록 높은 가중치
+                weight = 1.0 / (1.0 + 0.25 * position)
+                bisect.insort(self.postings.setdefault(term, []), (-weight, doc_id))
+                entries.append((term, weight))
+                self.max_term_length = max(self.max_term_length, len(term))
+            self.doc_terms[doc_id] = entries
+
+    def remove_documents(self, doc_ids: List[int]):
+        """문서 삭제 (해당 문서의 포스팅만 제거)"""
+        for doc_id in doc_ids:
+            for term, weight in self.doc_terms.pop(doc_id, []):
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                position = bisect.bisect_left(postings, (-weight, doc_id))
+                if position < len(postings) and postings[position] == (-weight, doc_id):
+                    postings.pop(position)
+                if not postings:
+                    del self.postings[term]
+
+    def query_terms(self, query: str) -> List[str]:
+        """질문에 등장하는 색인 용어 (일상 표현은 색인 용어로 변환)"""
+        compact = query.replace(" ", "")
+        terms = [term for phrase, term in SYMPTOM_SYNONYMS.items() if phrase in compact]
+
+        # 가장 긴 용어부터 매칭 (근육통 > 통)
+        position = 0
+        while position < len(compact):
+            for length in range(min(self.max_term_length, len(compact) - position), 1, -1):
+                candidate = compact[position:position + length]
+                if candidate in self.postings:
+                    terms.append(candidate)
+                    position += length - 1
+                    break
+            position += 1
+
+        return [term for term in dict.fromkeys(terms) if term in self.postings]
+
+    def lookup(self, query: str, top_k: int = 3, per_term: int = 50) -> List[Tuple[int, float]]:
+        """질문 증상 용어로 문서 순위화 → [(문서 ID, 점수)], 점수는 0~1"""
+        terms = self.query_terms(query)
+        if not terms:
+            return []
+
+        total_docs = max(len(self.doc_terms), 1)
+        scores: Dict[int, float] = {}
+        max_score = 0.0
+        for term in terms:
+            postings = self.postings[term]
+            # 흔한 용어(감기, 통증 등)일수록 낮은 가중치
+            idf = math.log(1 + total_docs / len(postings))
+            max_score += idf
+            for negative_weight, doc_id in postings[:per_term]:
+                scores[doc_id] = scores.get(doc_id, 0.0) - negative_weight * idf
+
+        ranked = sorted(scores.items(), key=lambda x: (-x[1], x[0]))[:top_k]
+        return [(doc_id, score / max_score) for doc_id, score in ranked]
+
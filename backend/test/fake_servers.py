@@ -0,0 +1,315 @@
+"""
+오프라인 벤치마크용 로컬 업스트림 서버
+
+- Upstage 임베딩 서버: 문자 n-gram 해싱 기반 결정적 벡터 반환
+- OpenAI Chat Completions 서버: 지연 시간 설정 가능, 키워드 추출 function_call 지원
+- 식약처 API 서버: fixtures/kfda_items.json 코퍼스로 검색/페이징 응답
+
+각 서버는 별도 스레드의 ThreadingHTTPServer로 동작하며,
+apply_env()로 UPSTAGE_BASE_URL / OPENAI_BASE_URL / KFDA_BASE_URL 을 지정한다.
+"""
+import os
+import json
+import math
+import time
+import random
+import zlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from typing import List, Dict
+
+FIXTURE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "kfda_items.json")
+
+# 키워드 추출 흉내용 증상 사전
+SYMPTOM_VOCAB = [
+    "두통", "치통", "생리통", "근육통", "관절통", "요통", "발열", "감기", "기침", "가래", "콧물",
+    "인후통", "소화불량", "속쓰림", "변비", "설사", "가려움", "비염", "불면", "화상", "상처", "임신",
+]
+
+
+def load_fixture_items(scale: int = 1) -> List[Dict]:
+    """픽스처 아이템 로드 (scale > 1 이면 제품명을 변형해 코퍼스 확장)"""
+    with open(FIXTURE_PATH, 'r', encoding='utf-8') as f:
+        items = json.load(f)["items"]
+
+    if scale <= 1:
+        return items
+
+    scaled = list(items)
+    for copy_no in range(1, scale):
+        for item in items:
+            clone = dict(item)
+            name = item["itemName"]
+            # "타이레놀정500밀리그람(아세트아미노펜)" -> "타이레놀정500밀리그람 제2호(아세트아미노펜)"
+            if "(" in name:
+                head, tail = name.split("(", 1)
+                clone["itemName"] = f"{head} 제{copy_no + 1}호({tail}"
+            else:
+                clone["itemName"] = f"{name} 제{copy_no + 1}호"
+            clone["entpName"] = f"{item['entpName']} {copy_no + 1}공장"
+            clone["itemSeq"] = f"{item.get('itemSeq', '')}{copy_no:03d}"
+            scaled.append(clone)
+    return scaled
+
+
+def deterministic_vector(text: str, dim: int) -> List[float]:
+    """문자 1-gram/2-gram 해싱으로 만든 결정적 단위 벡터"""
+    vector = [0.0] * dim
+    compact = "".join(text.split())
+    grams = list(compact) + [compact[i:i + 2] for i in range(len(compact) - 1)]
+    for gram in grams:
+        h = zlib.crc32(gram.encode('utf-8'))
+        vector[h % dim] += 1.0 if (h >> 31) & 1 else -1.0
+
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+def _brand_names(items: List[Dict]) -> List[str]:
+    """픽스처 제품명에서 괄호/함량을 뗀 브랜드명 목록"""
+    names = set()
+    for item in items:
+        name = item["itemName"].split("(")[0].strip()
+        base = name.split(" ")[0]
+        for i, ch in enumerate(base):
+            if ch.isdigit():
+                base = base[:i]
+                break
+        for suffix in ["연질캡슐", "캡슐", "정", "액", "연고", "시럽", "현탁액"]:
+            if base.endswith(suffix) and len(base) > len(suffix) + 1:
+                base = base[:-len(suffix)]
+                break
+        if len(base) >= 2:
+            names.add(base)
+    return sorted(names, key=len, reverse=True)
+
+
+class _QuietHandler(BaseHTTPRequestHandler):
+    """로그 출력 없는 기본 핸들러"""
+
+    server_version = "MediMateFake/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_json(self) -> Dict:
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length) if length else b"{}"
+        return json.loads(body.decode('utf-8'))
+
+    def _send_json(self, payload: Dict, status: int = 200):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def _make_embedding_handler(upstreams: "FakeUpstreams"):
+    class EmbeddingHandler(_QuietHandler):
+        def do_POST(self):
+            payload = self._read_json()
+            texts = payload.get("input", [])
+            if isinstance(texts, str):
+                texts = [texts]
+
+            upstreams.sleep("embedding")
+            if upstreams.should_fail("embedding"):
+                return self._send_json({"error": {"message": "injected failure"}}, status=503)
+            upstreams.record("embedding", len(texts))
+
+            data = [
+                {"object": "embedding", "index": i, "embedding": deterministic_vector(text, upstreams.embed_dim)}
+                for i, text in enumerate(texts)
+            ]
+            tokens = sum(len(t) for t in texts)
+            self._send_json({
+                "object": "list",
+                "data": data,
+                "model": payload.get("model", "fake-embedding"),
+                "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+            })
+
+    return EmbeddingHandler
+
+
+def _make_chat_handler(upstreams: "FakeUpstreams"):
+    class ChatHandler(_QuietHandler):
+        def do_POST(self):
+            payload = self._read_json()
+            messages = payload.get("messages", [])
+            user_text = messages[-1]["content"] if messages else ""
+
+            upstreams.sleep("chat")
+            if upstreams.should_fail("chat"):
+                return self._send_json({"error": {"message": "injected failure"}}, status=503)
+            upstreams.record("chat", 1)
+
+            message = {"role": "assistant", "content": None}
+            if payload.get("functions") or payload.get("tools"):
+                message["function_call"] = {
+                    "name": "extract_medical_keywords",
+                    "arguments": json.dumps(upstreams.extract_keywords(user_text), ensure_ascii=False),
+                }
+                finish_reason = "function_call"
+            else:
+                first_doc = ""
+                for line in user_text.splitlines():
+                    if line.startswith("[1]"):
+                        first_doc = line[:200]
+                        break
+                message["content"] = (
+                    f"💊 참고 문서 요약: {first_doc or '관련 문서 없음'}\n\n"
+                    "⚠️ 이 정보는 의료진 상담을 대체할 수 없습니다."
+                )
+                finish_reason = "stop"
+
+            prompt_tokens = sum(len(m.get("content") or "") for m in messages) // 2
+            self._send_json({
+                "id": "chatcmpl-fake",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": payload.get("model", "gpt-4o-mini"),
+                "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": 60,
+                          "total_tokens": prompt_tokens + 60},
+            })
+
+    return ChatHandler
+
+
+def _make_kfda_handler(upstreams: "FakeUpstreams"):
+    class KFDAHandler(_QuietHandler):
+        def do_GET(self):
+            params = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+
+            upstreams.sleep("kfda")
+            if upstreams.should_fail("kfda"):
+                return self._send_json({"header": {"resultCode": "99", "resultMsg": "injected failure"}}, status=503)
+            upstreams.record("kfda", 1)
+
+            items = upstreams.items
+            if params.get("itemName"):
+                items = [it for it in items if params["itemName"] in it["itemName"]]
+            if params.get("efcyQesitm"):
+                items = [it for it in items if params["efcyQesitm"] in it["efcyQesitm"]]
+
+            page_no = int(params.get("pageNo", 1))
+            num_rows = int(params.get("numOfRows", 10))
+            page_items = items[(page_no - 1) * num_rows: page_no * num_rows]
+
+            self._send_json({
+                "header": {"resultCode": "00", "resultMsg": "NORMAL SERVICE."},
+                "body": {
+                    "pageNo": page_no,
+                    "totalCount": len(items),
+                    "numOfRows": num_rows,
+                    # 실제 API처럼 결과가 없으면 빈 문자열
+                    "items": page_items if page_items else "",
+                },
+            })
+
+    return KFDAHandler
+
+
+class FakeUpstreams:
+    """Upstage / OpenAI / 식약처 로컬 대역 서버 묶음"""
+
+    def __init__(self, items: List[Dict] = None, embed_dim: int = 256,
+                 embed_latency: float = 0.0, llm_latency: float = 0.0, kfda_latency: float = 0.0,
+                 fail_rates: Dict[str, float] = None):
+        self.items = items if items is not None else load_fixture_items()
+        self.embed_dim = embed_dim
+        self.latency = {"embedding": embed_latency, "chat": llm_latency, "kfda": kfda_latency}
+        # 장애 주입: 종류별 503 응답 비율 (서킷 브레이커 확인용)
+        self.fail_rates = {"embedding": 0.0, "chat": 0.0, "kfda": 0.0, **(fail_rates or {})}
+        self.calls = {"embedding": 0, "chat": 0, "kfda": 0}
+        self.embedded_texts = 0
+        self._brands = _brand_names(self.items)
+        self._lock = threading.Lock()
+        self._servers = {}
+        self._threads = []
+
+    # 서버 공용 유틸
+    def sleep(self, kind: str):
+        if self.latency[kind] > 0:
+            time.sleep(self.latency[kind])
+
+    def should_fail(self, kind: str) -> bool:
+        return self.fail_rates[kind] > 0 and random.random() < self.fail_rates[kind]
+
+    def record(self, kind: str, amount: int):
+        with self._lock:
+            self.calls[kind] += 1
+            if kind == "embedding":
+                self.embedded_texts += amount
+
+    def extract_keywords(self, text: str) -> Dict:
+        """간단한 사전 매칭으로 키워드 추출 응답 생성"""
+        drug_names = [name for name in self._brands if name in text]
+        symptoms = [s for s in SYMPTOM_VOCAB if s in text]
+        if any(word in text for word in ["같이", "함께", "병용"]):
+            intent = "drug_interaction"
+        elif drug_names:
+            intent = "drug_info"
+        elif symptoms:
+            intent = "symptom_treatment"
+        else:
+            intent = "general"
+        return {"drug_names": drug_names[:3], "symptoms": symptoms[:3], "search_intent": intent}
+
+    # 수명 주기
+    def start(self) -> "FakeUpstreams":
+        factories = {
+            "embedding": _make_embedding_handler(self),
+            "chat": _make_chat_handler(self),
+            "kfda": _make_kfda_handler(self),
+        }
+        for kind, handler in factories.items():
+            server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+            server.daemon_threads = True
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            self._servers[kind] = server
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        for server in self._servers.values():
+            server.shutdown()
+            server.server_close()
+        self._servers = {}
+
+    def _base(self, kind: str) -> str:
+        host, port = self._servers[kind].server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def upstage_base_url(self) -> str:
+        return self._base("embedding") + "/v1"
+
+    @property
+    def openai_base_url(self) -> str:
+        return self._base("chat") + "/v1"
+
+    @property
+    def kfda_base_url(self) -> str:
+        return self._base("kfda") + "/getDrbEasyDrugList"
+
+    def apply_env(self):
+        """백엔드 모듈이 로컬 서버를 바라보도록 환경변수 설정"""
+        os.environ["UPSTAGE_API_KEY"] = "offline-upstage-key"
+        os.environ["OPENAI_API_KEY"] = "offline-openai-key"
+        os.environ["KFDA_API_KEY"] = "offline-kfda-key"
+        os.environ["UPSTAGE_BASE_URL"] = self.upstage_base_url
+        os.environ["OPENAI_BASE_URL"] = self.openai_base_url
+        os.environ["KFDA_BASE_URL"] = self.kfda_base_url
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
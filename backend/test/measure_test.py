@@ -1,6 +1,18 @@
 import time
 from rag_system import get_rag_system
 
+# 파이프라인이 기록하는 search_path → 표시 이름
+SEARCH_PATH_LABELS = {
+    "exact": "이름 인덱스",
+    "vector": "벡터만",
+    "vector+symptom": "벡터 + 증상 인덱스",
+    "vector+api": "벡터 + API",
+    "interaction_graph": "상호작용 그래프",
+}
+
+# 실행되면 식약처 API를 쓴 것으로 보는 단계 (투기적 검색 포함)
+API_STAGES = ("kfda_call", "keyword_extraction")
+
 def measure_system_performance():
     """실제 시스템 성능 측정"""
     rag = get_rag_system()
@@ -17,8 +29,9 @@ def measure_system_performance():
     print("=" * 50)
     
     total_time = 0
-    vector_only_count = 0
     api_needed_count = 0
+    path_counts = {}
+    stage_totals = {}
     
     print("📊 실제 성능 측정 결과")
     print("=" * 50)
@@ -33,20 +46,27 @@ def measure_system_performance():
             
             total_time += response_time
             
-            # 검색 방식 확인
+            # 검색 방식 확인 (파이프라인이 기록한 실제 경로)
             sources = result.get('sources', [])
-            has_api_results = any('api' in str(source) for source in sources)
+            timings = result.get('timings', {})
             
-            if has_api_results:
+            search_path = result.get('search_path', '')
+            search_type = SEARCH_PATH_LABELS.get(search_path, search_path or "알 수 없음")
+            if result.get('model_used') == "template_fastpath":
+                search_type += " (템플릿 응답)"
+            path_counts[search_type] = path_counts.get(search_type, 0) + 1
+
+            api_used = search_path == "vector+api" or any(stage in timings for stage in API_STAGES)
+            if api_used:
                 api_needed_count += 1
-                search_type = "벡터 + API"
-            else:
-                vector_only_count += 1
-                search_type = "벡터만"
             
             print(f"   응답 시간: {response_time:.2f}초")
             print(f"   검색 방식: {search_type}")
+            print(f"   API 사용: {'예' if api_used else '아니오'}")
             print(f"   소스 수: {len(sources)}개")
+            for stage, seconds in timings.items():
+                stage_totals[stage] = stage_totals.get(stage, 0) + seconds
+                print(f"   ⏱️ {stage}: {seconds * 1000:.1f}ms")
 
             # 응답 일부 출력
             response_preview = result.get('response', '')[:100] + "..."
@@ -60,8 +80,12 @@ def measure_system_performance():
         avg_time = total_time / len(test_queries)
         print(f"\n📈 종합 결과:")
         print(f"   평균 응답시간: {avg_time:.2f}초")
-        print(f"   벡터 검색만: {vector_only_count}/{len(test_queries)}개")
-        print(f"   API 보완 필요: {api_needed_count}/{len(test_queries)}개")
+        for search_type, count in path_counts.items():
+            print(f"   {search_type}: {count}/{len(test_queries)}개")
+        print(f"   API 사용: {api_needed_count}/{len(test_queries)}개")
+        print(f"\n⏱️ 단계별 평균 소요 시간:")
+        for stage, seconds in sorted(stage_totals.items(), key=lambda x: x[1], reverse=True):
+            print(f"   {stage}: {seconds / len(test_queries) * 1000:.1f}ms")
 
 # 실행
 measure_system_performance()
\ No newline at end of file
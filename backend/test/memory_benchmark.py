@@ -0,0 +1,75 @@
+"""
+문서 메모리 벤치마크 (dict vs DocumentRecord)
+
+픽스처 코퍼스를 원하는 문서 수로 늘린 뒤 documents.json 로드와 같은 방식(json.loads)으로
+문서를 만들고, 일반 dict 리스트와 DocumentRecord 리스트가 차지하는 메모리를 tracemalloc으로 비교한다.
+DocumentRecord 쪽은 미리 만든 LLM 컨텍스트 한 줄(snippet)을 포함한 크기.
+
+실행 (backend 디렉토리에서):
+    python test/memory_benchmark.py --sizes 5000,50000
+"""
+import os
+import sys
+import gc
+import json
+import time
+import argparse
+import tracemalloc
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_servers import load_fixture_items
+from common_parser import item_to_documents
+from document_record import DocumentRecord
+
+
+def build_documents_json(size: int) -> str:
+    """문서 size개를 documents.json 형식 문자열로"""
+    items = load_fixture_items(1)
+    scale = -(-size // len(items))
+    documents = [doc for item in load_fixture_items(scale) for doc in item_to_documents(item)]
+    while len(documents) < size:
+        scale += 1
+        documents = [doc for item in load_fixture_items(scale) for doc in item_to_documents(item)]
+    return json.dumps({"documents": documents[:size]}, ensure_ascii=False)
+
+
+def measure(build):
+    """build()가 만든 객체가 차지하는 메모리(바이트)와 소요 시간"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="문서 메모리 벤치마크")
+    parser.add_argument("--sizes", default="5000,50000", help="문서 수 (쉼표 구분)")
+    args = parser.parse_args()
+
+    print(f"{'문서 수':>8} {'dict(MB)':>10} {'record(MB)':>11} {'절감':>7} {'변환(ms)':>9}")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        text = build_documents_json(size)
+
+        documents, dict_bytes, _ = measure(lambda: json.loads(text)["documents"])
+        del documents
+
+        records, record_bytes, elapsed = measure(
+            lambda: [DocumentRecord(doc) for doc in json.loads(text)["documents"]]
+        )
+        assert dict(records[0]) == json.loads(text)["documents"][0]
+        del records
+
+        print(f"{size:>8} {dict_bytes / 1e6:>10.1f} {record_bytes / 1e6:>11.1f} "
+              f"{1 - record_bytes / dict_bytes:>7.0%} {elapsed * 1000:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
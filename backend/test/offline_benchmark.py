@@ -0,0 +1,251 @@
+"""
+오프라인 E2E 벤치마크
+
+로컬 대역 서버(fake_servers.py)를 띄우고 실제 MedicalDataBuilder로 인덱스를 만든 뒤
+process_query 와 /api/chat 을 여러 동시성 수준에서 호출해 처리량과 p50/p95/p99 지연을 측정한다.
+API 키나 네트워크 없이 CI에서도 반복 가능한 수치를 얻기 위한 도구.
+
+실행 (backend 디렉토리에서):
+    python test/offline_benchmark.py --requests 60 --concurrency 1,4,16 --llm-latency 0.3
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_servers import FakeUpstreams, load_fixture_items
+
+BENCHMARK_QUERIES = [
+    "타이레놀 복용법 알려줘",
+    "타이레놀 보관법",
+    "애드빌 부작용 있어?",
+    "낙센 하루에 몇 번 먹어?",
+    "임신 중 머리 아픈데 뭐 먹을까?",
+    "감기약과 두통약 같이 먹어도 돼?",
+    "소화불량에 좋은 약 추천해줘",
+    "변비약 복용법",
+    "후시딘 하루에 몇 번 발라?",
+    "지르텍 먹으면 졸려?",
+]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """선형 보간 백분위수"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    pos = (len(ordered) - 1) * pct / 100
+    lower = int(pos)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (pos - lower)
+
+
+def run_load(call: Callable[[str], None], queries: List[str], total: int, concurrency: int) -> Dict:
+    """동시성 수준별 부하 실행"""
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def worker(i):
+        nonlocal errors
+        query = queries[i % len(queries)]
+        start = time.perf_counter()
+        try:
+            call(query)
+            ok = True
+        except Exception as e:
+            print(f"   ❌ 요청 실패: {e}")
+            ok = False
+        elapsed = time.perf_counter() - start
+        with lock:
+            if ok:
+                latencies.append(elapsed)
+            else:
+                errors += 1
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, range(total)))
+    wall = time.perf_counter() - wall_start
+
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors,
+        "throughput_rps": len(latencies) / wall if wall > 0 else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_api_server(app):
+    """uvicorn으로 FastAPI 앱을 백그라운드 스레드에서 실행"""
+    import uvicorn
+
+    port = _free_port()
+    config = uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning")
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+
+    deadline = time.time() + 10
+    while not server.started and time.time() < deadline:
+        time.sleep(0.05)
+    return server, f"http://127.0.0.1:{port}"
+
+
+def print_table(title: str, rows: List[Dict]):
+    print(f"\n📊 {title}")
+    print(f"   {'동시성':>6} {'요청':>6} {'오류':>4} {'처리량(rps)':>12} {'p50(ms)':>9} {'p95(ms)':>9} {'p99(ms)':>9}")
+    for row in rows:
+        print(f"   {row['concurrency']:>6} {row['requests']:>6} {row['errors']:>4} "
+              f"{row['throughput_rps']:>12.2f} {row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Medi-Mate 오프라인 E2E 벤치마크")
+    parser.add_argument("--requests", type=int, default=40, help="동시성 수준별 요청 수")
+    parser.add_argument("--concurrency", default="1,4,16", help="쉼표로 구분한 동시성 수준")
+    parser.add_argument("--scale", type=int, default=1, help="픽스처 코퍼스 배수")
+    parser.add_argument("--embed-dim", type=int, default=256)
+    parser.add_argument("--embedding-backend", default="upstage",
+                        help="upstage: 로컬 임베딩 서버 경유 / hashing: 임베딩 왕복 없이 로컬 계산")
+    parser.add_argument("--embed-latency", type=float, default=0.02, help="임베딩 서버 지연(초)")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="Chat Completions 서버 지연(초)")
+    parser.add_argument("--kfda-latency", type=float, default=0.1, help="식약처 API 서버 지연(초)")
+    parser.add_argument("--speculative", action="store_true", help="투기적 식약처 API 검색 사용")
+    parser.add_argument("--kfda-fail-rate", type=float, default=0.0, help="식약처 서버 503 응답 비율")
+    parser.add_argument("--llm-fail-rate", type=float, default=0.0, help="Chat Completions 서버 503 응답 비율")
+    parser.add_argument("--skip-http", action="store_true", help="/api/chat 측정 생략")
+    parser.add_argument("--json", help="결과를 저장할 JSON 경로")
+    args = parser.parse_args()
+
+    levels = [int(c) for c in args.concurrency.split(",") if c.strip()]
+    items = load_fixture_items(args.scale)
+
+    upstreams = FakeUpstreams(
+        items=items,
+        embed_dim=args.embed_dim,
+        embed_latency=args.embed_latency,
+        llm_latency=args.llm_latency,
+        kfda_latency=args.kfda_latency,
+        fail_rates={"kfda": args.kfda_fail_rate, "chat": args.llm_fail_rate},
+    ).start()
+    upstreams.apply_env()
+    os.environ["EMBEDDING_BACKEND"] = args.embedding_backend
+    os.environ["SPECULATIVE_KFDA"] = "true" if args.speculative else "false"
+    # --scale 복제본은 본문이 같아 준중복 묶기를 켜면 코퍼스가 원래 크기로 줄어듦
+    os.environ["NEAR_DUPLICATE_THRESHOLD"] = "0"
+
+    # 환경변수 설정 이후에 백엔드 모듈 import
+    import rag_system as rag_module
+    from metrics import PIPELINE_EVENTS, FASTPATH_SAVED
+    from data_builder import MedicalDataBuilder
+    from rag_system import MedicalRAGSystem
+
+    report = {"corpus_items": len(items), "settings": vars(args), "process_query": [], "api_chat": []}
+
+    with tempfile.TemporaryDirectory(prefix="medimate-bench-") as data_dir:
+        print("🔧 로컬 대역 서버로 벡터 DB 구축 중...")
+        build_start = time.perf_counter()
+        builder = MedicalDataBuilder(data_dir=data_dir, target_documents=len(items))
+        builder.build_full_database()
+        report["build_seconds"] = time.perf_counter() - build_start
+
+        rag = MedicalRAGSystem(data_dir=data_dir)
+        rag_module.rag_system = rag  # main.get_rag_system()이 이 인스턴스를 사용
+        print(f"   문서 수: {len(rag.documents)}개, 구축 {report['build_seconds']:.1f}초")
+
+        # 워밍업
+        rag.process_query(BENCHMARK_QUERIES[0])
+
+        paths = {}
+        paths_lock = threading.Lock()
+
+        def call_pipeline(query):
+            result = rag.process_query(query)
+            path = result.get("search_path", "unknown")
+            with paths_lock:
+                paths[path] = paths.get(path, 0) + 1
+
+        for level in levels:
+            report["process_query"].append(run_load(call_pipeline, BENCHMARK_QUERIES, args.requests, level))
+        report["search_paths"] = paths
+        print_table("process_query", report["process_query"])
+        print(f"   검색 경로 분포: {paths}")
+
+        fast_hits = PIPELINE_EVENTS.value(event="template_fastpath")
+        llm_answers = PIPELINE_EVENTS.value(event="llm_answer")
+        if fast_hits + llm_answers:
+            report["template_fastpath"] = {"hits": fast_hits, "llm_answers": llm_answers,
+                                           "saved_seconds": FASTPATH_SAVED.sum()}
+            print(f"   템플릿 응답: {fast_hits:.0f}/{fast_hits + llm_answers:.0f}회 "
+                  f"({fast_hits / (fast_hits + llm_answers) * 100:.1f}%), 절약 추정 {FASTPATH_SAVED.sum():.1f}초")
+
+        if args.speculative:
+            started = PIPELINE_EVENTS.value(event="speculation_started")
+            wasted = PIPELINE_EVENTS.value(event="speculation_wasted")
+            early = PIPELINE_EVENTS.value(event="speculation_cancelled_before_start")
+            report["speculation"] = {"started": started, "wasted": wasted, "cancelled_before_start": early}
+            if started:
+                print(f"   투기적 검색: 시작 {started:.0f}회, 낭비 {wasted:.0f}회 ({wasted / started * 100:.1f}%), "
+                      f"시작 전 취소 {early:.0f}회")
+
+        if not args.skip_http:
+            import requests
+            from main import app
+
+            server, base_url = start_api_server(app)
+            session_local = threading.local()
+
+            def call_http(query):
+                session = getattr(session_local, "session", None)
+                if session is None:
+                    session = session_local.session = requests.Session()
+                response = session.post(f"{base_url}/api/chat", json={"message": query}, timeout=60)
+                response.raise_for_status()
+
+            for level in levels:
+                report["api_chat"].append(run_load(call_http, BENCHMARK_QUERIES, args.requests, level))
+            print_table("/api/chat", report["api_chat"])
+
+            server.should_exit = True
+
+    report["upstream_calls"] = dict(upstreams.calls)
+    report["embedded_texts"] = upstreams.embedded_texts
+    upstreams.stop()
+
+    print(f"\n📡 업스트림 호출 수: {report['upstream_calls']} (임베딩 텍스트 {report['embedded_texts']}개)")
+
+    from resilience import UPSTREAM_CALLS, BREAKER_TRANSITIONS
+    for provider in ["upstage", "openai", "kfda"]:
+        outcomes = {o: UPSTREAM_CALLS.value(provider=provider, outcome=o)
+                    for o in ["success", "failure", "retry", "rejected", "client_error"]}
+        opened = BREAKER_TRANSITIONS.value(provider=provider, state="open")
+        print(f"   {provider}: {outcomes}, 서킷 열림 {opened:.0f}회")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"💾 결과 저장: {args.json}")
+
+
+if __name__ == "__main__":
+    main()
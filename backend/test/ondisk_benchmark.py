@@ -0,0 +1,159 @@
+"""
+온디스크 IVF 인덱스 벤치마크 (flat vs ivf_ondisk, 콜드/웜 캐시)
+
+군집 구조가 있는 정규화 벡터로 flat 인덱스와 온디스크 IVF 인덱스를 임시 디렉토리에 만든 뒤,
+인덱스마다 별도 프로세스에서 로드해 로드 시간, 상주 메모리(VmRSS), 질문 1개씩 검색 지연을 측정한다.
+콜드: 인덱스 파일을 페이지 캐시에서 내린 직후(posix_fadvise DONTNEED) 첫 검색 / 웜: 같은 질문 재검색.
+recall@3은 flat 검색 결과(정답) 대비.
+
+실행 (backend 디렉토리에서):
+    python test/ondisk_benchmark.py --documents 200000 --dim 256 --nprobe 16
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+from typing import Dict, List, Tuple
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import faiss
+import numpy as np
+from ondisk_index import build_ondisk_ivf, write_ondisk_index, ivfdata_files, read_ondisk_index
+from offline_benchmark import percentile
+
+TOP_K = 3
+
+
+def clustered_vectors(count: int, dim: int, rng: np.random.Generator, clusters: int = 512) -> np.ndarray:
+    """군집 중심 + 잡음 (실제 임베딩처럼 비슷한 문서끼리 모인 분포)"""
+    centers = rng.standard_normal((clusters, dim)).astype('float32')
+    vectors = centers[rng.integers(0, clusters, count)] + 0.6 * rng.standard_normal((count, dim)).astype('float32')
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def rss_mb() -> float:
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def drop_page_cache(paths: List[str]):
+    """파일 페이지를 캐시에서 내림 (더티 페이지는 구축 후 os.sync()로 먼저 기록)"""
+    for path in paths:
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+
+
+def timed_searches(index, queries: np.ndarray) -> Tuple[List[float], np.ndarray]:
+    latencies, labels = [], []
+    for query in queries:
+        start = time.perf_counter()
+        _, found = index.search(query[None, :], TOP_K)
+        latencies.append(time.perf_counter() - start)
+        labels.append(found[0])
+    return latencies, np.array(labels)
+
+
+def measure(kind: str, work_dir: str, nprobe: int) -> Dict:
+    """(별도 프로세스) 인덱스 로드 → 콜드 검색 → 웜 검색"""
+    index_path = os.path.join(work_dir, f"{kind}.index")
+    queries = np.load(os.path.join(work_dir, "queries.npy"))
+    truth = np.load(os.path.join(work_dir, "truth.npy"))
+
+    files = [index_path] + ivfdata_files(index_path)
+    drop_page_cache(files)
+    base_rss = rss_mb()
+
+    start = time.perf_counter()
+    index = read_ondisk_index(index_path, nprobe) if kind == "ivf_ondisk" else faiss.read_index(index_path)
+    load_ms = (time.perf_counter() - start) * 1000
+    loaded_rss = rss_mb()
+
+    cold, labels = timed_searches(index, queries)
+    warm, _ = timed_searches(index, queries)
+    recall = np.mean([len(set(found) & set(expected)) / TOP_K for found, expected in zip(labels, truth)])
+
+    return {
+        "kind": kind,
+        "load_ms": load_ms,
+        "rss_after_load_mb": loaded_rss - base_rss,
+        "rss_after_search_mb": rss_mb() - base_rss,
+        "cold_p50_ms": percentile(cold, 50) * 1000,
+        "cold_p95_ms": percentile(cold, 95) * 1000,
+        "warm_p50_ms": percentile(warm, 50) * 1000,
+        "warm_p95_ms": percentile(warm, 95) * 1000,
+        "recall_at_3": float(recall),
+        "file_mb": sum(os.path.getsize(path) for path in files) / 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="온디스크 IVF 인덱스 벤치마크")
+    parser.add_argument("--documents", type=int, default=200000)
+    parser.add_argument("--dim", type=int, default=256)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--nlist", type=int, default=0, help="0이면 문서 수 기준 자동")
+    parser.add_argument("--nprobe", type=int, default=16)
+    parser.add_argument("--measure", choices=["flat", "ivf_ondisk"], help=argparse.SUPPRESS)
+    parser.add_argument("--work-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.measure, args.work_dir, args.nprobe)))
+        return
+
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as work_dir:
+        print(f"벡터 {args.documents}개 × {args.dim}차원 인덱스 구축 중...")
+        vectors = clustered_vectors(args.documents, args.dim, rng)
+
+        flat = faiss.IndexFlatIP(args.dim)
+        flat.add(vectors)
+        faiss.write_index(flat, os.path.join(work_dir, "flat.index"))
+
+        start = time.perf_counter()
+        ivf = build_ondisk_ivf(vectors, os.path.join(work_dir, "ivf_ondisk.index"), args.nlist)
+        write_ondisk_index(ivf, os.path.join(work_dir, "ivf_ondisk.index"))
+        print(f"온디스크 IVF 구축: 리스트 {ivf.nlist}개, {time.perf_counter() - start:.1f}초")
+
+        # 질문 = 문서 벡터에 잡음을 더한 벡터, 정답 = flat top-3
+        queries = vectors[rng.choice(args.documents, args.queries, replace=False)]
+        queries = queries + 0.3 * rng.standard_normal(queries.shape).astype('float32')
+        faiss.normalize_L2(queries)
+        _, truth = flat.search(queries, TOP_K)
+        np.save(os.path.join(work_dir, "queries.npy"), queries)
+        np.save(os.path.join(work_dir, "truth.npy"), truth)
+        del vectors, flat, ivf
+        os.sync()
+
+        rows = []
+        for kind in ("flat", "ivf_ondisk"):
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--measure", kind, "--work-dir", work_dir,
+                 "--nprobe", str(args.nprobe)],
+                capture_output=True, text=True, check=True,
+            ).stdout
+            rows.append(json.loads(output.strip().splitlines()[-1]))
+
+    print(f"\n{'인덱스':>10} {'파일(MB)':>9} {'로드(ms)':>9} {'RSS 로드(MB)':>12} {'RSS 검색 후(MB)':>15} "
+          f"{'콜드 p50':>9} {'콜드 p95':>9} {'웜 p50':>8} {'웜 p95':>8} {'recall@3':>9}")
+    for row in rows:
+        print(f"{row['kind']:>10} {row['file_mb']:>9.1f} {row['load_ms']:>9.1f} {row['rss_after_load_mb']:>12.1f} "
+              f"{row['rss_after_search_mb']:>15.1f} {row['cold_p50_ms']:>9.2f} {row['cold_p95_ms']:>9.2f} "
+              f"{row['warm_p50_ms']:>8.2f} {row['warm_p95_ms']:>8.2f} {row['recall_at_3']:>9.1%}")
+
+
+if __name__ == "__main__":
+    main()
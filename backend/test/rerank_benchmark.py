@@ -0,0 +1,131 @@
+"""
+과다 조회 + 어휘 재순위화 벤치마크
+
+픽스처 코퍼스를 로컬 해싱 임베더로 색인한 뒤, 정답이 있는 질문 세트로
+FAISS top-3 (기본) 과 top-N 과다 조회 + LexicalReranker 의 정확도(hit@1, hit@3, MRR)와
+추가 소요 시간(마이크로초)을 비교한다. 네트워크/API 키 불필요.
+
+실행 (backend 디렉토리에서):
+    python test/rerank_benchmark.py --candidates 50 --scale 20
+"""
+import os
+import sys
+import time
+import argparse
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import faiss
+from fake_servers import load_fixture_items
+from offline_benchmark import percentile
+from common_parser import item_to_documents, create_embedding_content
+from embedder import create_embedder
+from reranker import LexicalReranker, parse_weights
+
+# (질문, 정답 제품명에 포함되는 브랜드 목록)
+LABELED_QUERIES = [
+    ("타이레놀 복용법 알려줘", ["타이레놀"]),
+    ("애드빌 부작용 있어?", ["애드빌"]),
+    ("낙센 하루에 몇 번 먹어?", ["낙센"]),
+    ("후시딘 하루에 몇 번 발라?", ["후시딘"]),
+    ("지르텍 먹으면 졸려?", ["지르텍"]),
+    ("변비에 먹는 약", ["둘코락스"]),
+    ("소화불량일 때 먹는 약", ["베아제", "훼스탈"]),
+    ("잠이 안 올 때 먹는 약", ["멜라토닌"]),
+    ("화상 상처에 바르는 연고", ["후시딘", "마데카솔"]),
+    ("목 아플 때 인후통 트로키", ["스트렙실"]),
+    ("잇몸 치주염 약", ["인사돌"]),
+    ("무릎 관절통에 붙이는 파스", ["케토톱"]),
+    ("가려움증 피부염 알레르기 약", ["지르텍"]),
+    ("구역 구토 속쓰림 위장약", ["겔포스"]),
+    ("비타민 결핍 피로 회복", ["아로나민"]),
+    ("생리통 진통제 추천", ["게보린", "애드빌", "부루펜", "이지엔6"]),
+    ("기침 가래 감기약 시럽", ["판콜", "판피린", "테라플루"]),
+    ("이부프로펜 성분 약 보관법", ["애드빌", "부루펜", "이지엔6"]),
+    ("나프록센 진통제 주의사항", ["탁센", "낙센"]),
+    ("아세트아미노펜 최대 용량", ["타이레놀", "펜잘", "게보린"]),
+]
+
+
+def rank_of_answer(results, answers):
+    """정답이 처음 등장하는 순위 (1부터, 없으면 None)"""
+    for rank, doc in enumerate(results, 1):
+        if any(answer in doc['product_name'] for answer in answers):
+            return rank
+    return None
+
+
+def summarize(ranks, timings_us):
+    total = len(ranks)
+    return {
+        "hit@1": sum(1 for r in ranks if r == 1) / total,
+        "hit@3": sum(1 for r in ranks if r and r <= 3) / total,
+        "mrr": sum(1 / r for r in ranks if r) / total,
+        "mean_us": sum(timings_us) / len(timings_us),
+        "p95_us": percentile(timings_us, 95),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="과다 조회 + 어휘 재순위화 벤치마크")
+    parser.add_argument("--candidates", type=int, default=50, help="과다 조회 후보 수")
+    parser.add_argument("--scale", type=int, default=1, help="픽스처 코퍼스 배수")
+    parser.add_argument("--dim", type=int, default=1024, help="해싱 임베딩 차원")
+    parser.add_argument("--weights", default="", help="재순위 가중치 (쉼표 구분)")
+    parser.add_argument("--repeat", type=int, default=20, help="시간 측정 반복 횟수")
+    args = parser.parse_args()
+
+    documents = [doc for item in load_fixture_items(args.scale) for doc in item_to_documents(item)]
+    contents = [create_embedding_content(doc) for doc in documents]
+
+    embedder = create_embedder("hashing", dimension=args.dim)
+    embedder.fit(contents)
+    embeddings = embedder.encode(contents)
+    faiss.normalize_L2(embeddings)
+    index = faiss.IndexFlatIP(embeddings.shape[1])
+    index.add(embeddings)
+    reranker = LexicalReranker(parse_weights(args.weights))
+    print(f"📚 문서 {len(documents)}개, 질문 {len(LABELED_QUERIES)}개, 후보 {args.candidates}개")
+
+    def search(query_embedding, k):
+        scores, indices = index.search(query_embedding, k)
+        return [{**documents[i], "similarity_score": float(s)} for s, i in zip(scores[0], indices[0]) if i != -1]
+
+    baseline_ranks, rerank_ranks = [], []
+    baseline_us, rerank_us = [], []
+    for query, answers in LABELED_QUERIES:
+        query_embedding = embedder.encode([query])
+        faiss.normalize_L2(query_embedding)
+
+        # 기본: FAISS top-3
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            baseline = search(query_embedding, 3)
+            baseline_us.append((time.perf_counter() - start) * 1e6)
+        baseline_ranks.append(rank_of_answer(baseline, answers))
+
+        # 과다 조회 + 재순위화
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            reranked = reranker.rerank(query, search(query_embedding, args.candidates), top_k=3)
+            rerank_us.append((time.perf_counter() - start) * 1e6)
+        rerank_ranks.append(rank_of_answer(reranked, answers))
+
+        if rank_of_answer(baseline, answers) != rank_of_answer(reranked, answers):
+            print(f"   {query}: {rank_of_answer(baseline, answers)} → {rank_of_answer(reranked, answers)}")
+
+    base = summarize(baseline_ranks, baseline_us)
+    rerank = summarize(rerank_ranks, rerank_us)
+
+    print(f"\n{'':>18} {'hit@1':>7} {'hit@3':>7} {'MRR':>7} {'평균(us)':>10} {'p95(us)':>10}")
+    for name, row in [("FAISS top-3", base), (f"top-{args.candidates}+rerank", rerank)]:
+        print(f"{name:>18} {row['hit@1']:>7.2f} {row['hit@3']:>7.2f} {row['mrr']:>7.2f} "
+              f"{row['mean_us']:>10.1f} {row['p95_us']:>10.1f}")
+    print(f"\n➕ 정확도 변화: hit@1 {rerank['hit@1'] - base['hit@1']:+.2f}, hit@3 {rerank['hit@3'] - base['hit@3']:+.2f}, "
+          f"추가 시간 {rerank['mean_us'] - base['mean_us']:+.1f}us/질문")
+
+
+if __name__ == "__main__":
+    main()
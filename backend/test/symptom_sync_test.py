@@ -0,0 +1,88 @@
+"""
+동기화 후 증상 인덱스 증분 갱신 확인
+
+로컬 대역 서버(fake_servers.py)로 벡터 DB를 구축하고, 식약처 코퍼스에서 문서 하나의 효능을 바꾸고
+하나를 삭제하고 하나를 추가한 뒤 data_builder sync → MedicalRAGSystem.reload_from_disk 를 실행한다.
+증분 갱신한 증상 인덱스가 새 문서 목록으로 처음부터 만든 인덱스와 같은지, 바뀐 효능으로 조회되는지 확인.
+
+실행 (backend 디렉토리에서):
+    python test/symptom_sync_test.py
+"""
+import os
+import sys
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from fake_servers import FakeUpstreams, load_fixture_items
+
+CHANGED_EFFECT = "<p>이 약은 멀미, 어지러움에 사용합니다.</p>"
+
+
+def changed_corpus(items):
+    """0번 효능 변경, 3번 삭제 (뒤 문서 ID가 당겨짐), 새 제품 1개 추가"""
+    items = [dict(item) for item in items]
+    items[0]["efcyQesitm"] = CHANGED_EFFECT
+    removed = items.pop(3)
+    added = dict(items[1], itemName="동기화테스트정(디멘히드리네이트)", itemSeq="299999",
+                 efcyQesitm="<p>이 약은 멀미에 의한 구역, 구토에 사용합니다.</p>")
+    items.append(added)
+    return items, removed["itemName"], added["itemName"]
+
+
+def main():
+    items = load_fixture_items()
+    upstreams = FakeUpstreams(items=items).start()
+    upstreams.apply_env()
+
+    # 환경변수 설정 이후에 백엔드 모듈 import
+    from data_builder import MedicalDataBuilder
+    from rag_system import MedicalRAGSystem
+    from symptom_index import SymptomIndex
+
+    failures = []
+
+    def check(name, ok, detail=""):
+        print(f"{'✅' if ok else '❌'} {name}{f' ({detail})' if detail else ''}")
+        if not ok:
+            failures.append(name)
+
+    try:
+        with tempfile.TemporaryDirectory(prefix="medimate-sync-") as data_dir:
+            print("🔧 로컬 대역 서버로 벡터 DB 구축 중...")
+            builder = MedicalDataBuilder(data_dir=data_dir, target_documents=len(items))
+            builder.build_full_database()
+            rag = MedicalRAGSystem(data_dir=data_dir)
+            before = len(rag.documents)
+
+            upstreams.items, removed_name, added_name = changed_corpus(items)
+            report = builder.sync_documents()
+            check("동기화 보고서", report is not None and len(report["changed"]) == 1
+                  and report["removed"] == [removed_name] and report["added"] == [added_name],
+                  f"변경 {report and report['changed']}, 삭제 {report and report['removed']}, 추가 {report and report['added']}")
+
+            result = rag.reload_from_disk()
+            check("다시 로드", result["reloaded"] and result["total_documents"] == before,
+                  f"{before} → {result['total_documents']}개")
+
+            # 증분 갱신 결과 = 새 문서 목록으로 새로 만든 인덱스
+            rebuilt = SymptomIndex(rag.documents)
+            check("포스팅 일치", rag.symptom_index.postings == rebuilt.postings)
+            check("문서별 용어 일치", rag.symptom_index.doc_terms == rebuilt.doc_terms)
+
+            hits = [rag.documents[doc_id]['product_name'] for doc_id, _ in rag.symptom_index.lookup("멀미", top_k=5)]
+            check("바뀐 효능으로 조회", items[0]["itemName"] in hits and added_name in hits, ", ".join(hits))
+            check("삭제 문서 제외", all(doc['product_name'] != removed_name for doc in rag.documents))
+    finally:
+        upstreams.stop()
+
+    if failures:
+        print(f"\n실패 {len(failures)}건: {', '.join(failures)}")
+        sys.exit(1)
+    print("\n모든 확인 통과")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+import os
+import numpy as np
+from typing import Optional
+
+# FAISS 인덱스와 같은 순서의 정규화 벡터 사본 (vectors.npy)
+# 읽기 전용 memmap으로 열어 인덱스 종류와 무관하게 문서 ID → 벡터 조회
+
+VECTORS_FILENAME = "vectors.npy"
+
+
+def save_vectors(data_dir: str, vectors: np.ndarray):
+    """정규화된 문서 벡터 저장 (행 = 문서 ID)"""
+    path = os.path.join(data_dir, VECTORS_FILENAME)
+    temp_path = path + ".tmp"
+    with open(temp_path, 'wb') as f:
+        np.save(f, np.ascontiguousarray(vectors, dtype="float32"))
+    os.replace(temp_path, path)
+
+
+def load_vectors(data_dir: str, count: int, dimension: int) -> Optional[np.ndarray]:
+    """저장된 벡터를 memmap으로 열기 (없거나 인덱스와 크기가 다르면 None)"""
+    path = os.path.join(data_dir, VECTORS_FILENAME)
+    if not os.path.exists(path):
+        return None
+
+    try:
+        vectors = np.load(path, mmap_mode='r')
+    except Exception as e:
+        print(f"❌ 벡터 파일 로드 실패: {e}")
+        return None
+
+    if vectors.ndim != 2 or vectors.shape != (count, dimension):
+        print(f"⚠️ 벡터 파일 크기 불일치: {vectors.shape}, 인덱스=({count}, {dimension}) → 인덱스에서 복원")
+        return None
+    return vectors
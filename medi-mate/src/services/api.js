@@ -33,7 +33,8 @@ API.interceptors.response.use(
 )
 
 export const chatAPI = {
-  sendMessage: (message) => API.post('/api/chat', { message }),
+  // 화면에서 쓰지 않는 search_results(문서 전체 필드)는 받지 않음
+  sendMessage: (message) => API.post('/api/chat', { message }, { params: { verbose: false } }),
   getDrugs: () => API.get('/api/drugs'),
   getDrugInfo: (drugName) => API.get(`/api/drugs/${drugName}`),
 